@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark por Etapas del Pipeline de Renderizado
+================================================
+
+Mide de forma reproducible el coste de cada etapa del pipeline para detectar
+regresiones antes de que lleguen a producción:
+
+- Entradas sintéticas generadas en memoria (sin red ni ficheros externos):
+  fondos pequeños y enormes, títulos cortos y muy largos, de 0 a 4 iconos
+  con y sin transparencia
+- Tiempo por etapa (mediana y mínimo de varias repeticiones), thumbnails por
+  segundo y pico de memoria del proceso
+- Cada caso se ejecuta en un proceso nuevo, de modo que la memoria y las
+  cachés de uno no afectan al siguiente
+- Los resultados se guardan como línea base en JSON y se comparan con otra
+  ejecución, marcando las etapas que empeoran más de un umbral
+
+Uso:
+    python3 benchmark.py --guardar base.json
+    python3 benchmark.py --comparar base.json --umbral 10
+
+Autor: Desarrollador Senior Python
+Fecha: Agosto 2025
+"""
+
+import io
+import gc
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import statistics
+import contextlib
+import multiprocessing
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageDraw
+import PIL
+
+import generate_thumbnail as gt
+
+
+# Etapas medidas, en orden de ejecución
+ETAPAS = [
+    'decodificar_fondo',    # abrir_entrada (con reducción al decodificar)
+    'fondo',                # procesar_imagen_base
+    'iconos',               # procesar_iconos (decodificar + redimensionar)
+    'titulo',               # añadir_titulo (incluye el ajuste de tamaño)
+    'capa_iconos',          # añadir_iconos (sombras + composición)
+    'guardar_png',          # codificación PNG de la imagen final
+]
+
+FONDOS = {
+    'pequeño': (1280, 720),
+    'enorme': (6000, 4000),
+}
+
+TITULOS = {
+    'corto': "Novedades de Python",
+    'largo': (
+        "Guía definitiva para optimizar el rendimiento de aplicaciones web "
+        "modernas con Python, cachés distribuidas y procesamiento asíncrono"
+    ),
+}
+
+# (número de iconos, con transparencia)
+ICONOS = {
+    '0': (0, False),
+    '2-opacos': (2, False),
+    '4-alpha': (4, True),
+}
+
+SEMILLA = 2025
+
+
+# === ENTRADAS SINTÉTICAS ===
+
+def crear_fondo(ancho, alto, semilla=SEMILLA):
+    """
+    Fondo sintético determinista: elipses de colores sobre un degradado,
+    codificado como JPEG (como la mayoría de fotos reales).
+
+    Returns:
+        bytes: JPEG
+    """
+    aleatorio = random.Random(semilla)
+    imagen = Image.linear_gradient('L').resize((ancho, alto)).convert('RGB')
+    draw = ImageDraw.Draw(imagen)
+    escala = max(ancho, alto) / 2400
+    for _ in range(300):
+        x, y = aleatorio.randint(0, ancho), aleatorio.randint(0, alto)
+        w, h = (int(aleatorio.randint(20, 300) * escala) for _ in range(2))
+        draw.ellipse((x, y, x + w, y + h), fill=tuple(aleatorio.randint(0, 255) for _ in range(3)))
+
+    buffer = BytesIO()
+    imagen.save(buffer, 'JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def crear_icono(indice, transparente, semilla=SEMILLA):
+    """
+    Icono sintético: círculo con un cuadrado dentro. Con transparencia se
+    codifica como PNG RGBA; sin ella, como PNG RGB con fondo blanco.
+
+    Returns:
+        bytes: PNG
+    """
+    aleatorio = random.Random(semilla + indice)
+    ancho = 400 + 100 * indice
+    color = tuple(aleatorio.randint(0, 255) for _ in range(3))
+
+    modo, fondo = ('RGBA', (0, 0, 0, 0)) if transparente else ('RGB', (255, 255, 255))
+    icono = Image.new(modo, (ancho, 500), fondo)
+    draw = ImageDraw.Draw(icono)
+    draw.ellipse((20, 20, ancho - 20, 480), fill=color + (255,))
+    draw.rectangle((150, 150, ancho - 150, 350), fill=(30, 200, 30, 128))
+
+    buffer = BytesIO()
+    icono.save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def casos_disponibles():
+    """
+    Returns:
+        list: Nombres de caso 'fondo/título/iconos' (producto de las tres dimensiones)
+    """
+    return [
+        f"{fondo}/{titulo}/{iconos}"
+        for fondo in FONDOS for titulo in TITULOS for iconos in ICONOS
+    ]
+
+
+# === MEDICIÓN ===
+
+def _leer_memoria_kb(campo):
+    """Lee un campo (VmRSS, VmHWM...) de /proc/self/status en KB, o None."""
+    try:
+        with open('/proc/self/status') as f:
+            for linea in f:
+                if linea.startswith(campo + ':'):
+                    return int(linea.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _reiniciar_pico_memoria():
+    """
+    Reinicia el pico de memoria residente (VmHWM) del proceso, de modo que
+    el pico medido no incluya la generación de las entradas (Linux ≥ 4.0).
+
+    Returns:
+        bool: False si el sistema no lo permite (se usará ru_maxrss)
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _pico_memoria_mb():
+    pico = _leer_memoria_kb('VmHWM')
+    if pico is None:
+        import resource
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / 1024
+
+
+def ejecutar_caso(nombre, repeticiones=3, calentamiento=1, fondo_rapido=False):
+    """
+    Mide un caso en el proceso actual.
+
+    Las cachés de etapas se vacían antes de cada repetición para medir el
+    trabajo real de cada etapa; solo las fuentes cargadas se conservan, como
+    en un worker ya caliente.
+
+    Args:
+        nombre (str): Caso de casos_disponibles()
+        repeticiones (int): Repeticiones medidas
+        calentamiento (int): Repeticiones previas que no se miden
+        fondo_rapido (bool): Ver procesar_imagen_base
+
+    Returns:
+        dict: Por etapa, mediana y mínimo en ms; total, thumbnails/s, pico de
+            memoria en MB y bytes del PNG final
+    """
+    nombre_fondo, nombre_titulo, nombre_iconos = nombre.split('/')
+    num_iconos, transparentes = ICONOS[nombre_iconos]
+
+    fondo = crear_fondo(*FONDOS[nombre_fondo])
+    iconos = [crear_icono(i, transparentes) for i in range(num_iconos)]
+    titulo = TITULOS[nombre_titulo]
+    factor = gt.FACTOR_FONDO_RAPIDO if fondo_rapido else 1
+
+    tiempos = {etapa: [] for etapa in ETAPAS}
+    tamano_png = 0
+
+    gc.collect()
+    pico_reiniciado = _reiniciar_pico_memoria()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        for repeticion in range(calentamiento + repeticiones):
+            for cache in (gt.CACHE_FONDOS, gt.CACHE_ICONOS, gt.CACHE_SPRITES_ICONOS, gt.CACHE_CAPAS_ICONOS):
+                cache.vaciar()
+            gt._ajustar_tamano_titulo.cache_clear()
+
+            medidas = {}
+
+            inicio = time.perf_counter()
+            img_original = gt.abrir_entrada(fondo, (gt.ANCHO_REFERENCIA // factor, gt.ALTO_REFERENCIA // factor))
+            img_original.load()
+            medidas['decodificar_fondo'] = time.perf_counter() - inicio
+
+            inicio = time.perf_counter()
+            img_fondo = gt.procesar_imagen_base(img_original, rapido=fondo_rapido)
+            medidas['fondo'] = time.perf_counter() - inicio
+
+            inicio = time.perf_counter()
+            iconos_procesados = gt.procesar_iconos(iconos, gt.ANCHO_MAX_ICONO)
+            medidas['iconos'] = time.perf_counter() - inicio
+
+            inicio = time.perf_counter()
+            img_con_titulo = gt.añadir_titulo(img_fondo, titulo)
+            medidas['titulo'] = time.perf_counter() - inicio
+
+            inicio = time.perf_counter()
+            img_final = gt.añadir_iconos(img_con_titulo, iconos_procesados)
+            medidas['capa_iconos'] = time.perf_counter() - inicio
+
+            inicio = time.perf_counter()
+            tamano_png = len(gt.codificar_thumbnail(img_final, 'png'))
+            medidas['guardar_png'] = time.perf_counter() - inicio
+
+            if repeticion >= calentamiento:
+                for etapa, segundos in medidas.items():
+                    tiempos[etapa].append(segundos * 1000)
+
+    resultado = {'etapas': {}}
+    for etapa in ETAPAS:
+        resultado['etapas'][etapa] = {
+            'mediana_ms': round(statistics.median(tiempos[etapa]), 2),
+            'min_ms': round(min(tiempos[etapa]), 2),
+        }
+    total = sum(medidas['mediana_ms'] for medidas in resultado['etapas'].values())
+    resultado['total_ms'] = round(total, 2)
+    resultado['por_segundo'] = round(1000 / total, 3) if total > 0 else 0.0
+    resultado['pico_memoria_mb'] = round(_pico_memoria_mb(), 1)
+    resultado['pico_reiniciado'] = pico_reiniciado
+    resultado['bytes_png'] = tamano_png
+    return resultado
+
+
+def ejecutar_suite(casos=None, repeticiones=3, calentamiento=1, fondo_rapido=False):
+    """
+    Ejecuta varios casos, cada uno en un proceso nuevo.
+
+    Args:
+        casos (list): Nombres de caso (por defecto, todos)
+        repeticiones (int): Ver ejecutar_caso
+        calentamiento (int): Ver ejecutar_caso
+        fondo_rapido (bool): Ver procesar_imagen_base
+
+    Returns:
+        dict: Resultados con metadatos del entorno, listos para guardar en JSON
+    """
+    casos = casos or casos_disponibles()
+    contexto = multiprocessing.get_context('spawn')
+    resultados = {}
+
+    for nombre in casos:
+        print(f"⏱️  {nombre}...", end=' ', flush=True)
+        with ProcessPoolExecutor(max_workers=1, mp_context=contexto) as pool:
+            resultado = pool.submit(ejecutar_caso, nombre, repeticiones, calentamiento, fondo_rapido).result()
+        resultados[nombre] = resultado
+        print(f"{resultado['total_ms']:.0f} ms ({resultado['por_segundo']:.2f}/s, "
+              f"{resultado['pico_memoria_mb']:.0f} MB)")
+
+    return {
+        'entorno': {
+            'fecha': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'python': platform.python_version(),
+            'pillow': PIL.__version__,
+            'sistema': platform.platform(),
+            'cpus': multiprocessing.cpu_count(),
+            'repeticiones': repeticiones,
+            'fondo_rapido': fondo_rapido,
+        },
+        'casos': resultados,
+    }
+
+
+# === INFORMES ===
+
+def mostrar_resultados(resultados):
+    """Imprime una tabla con la mediana de cada etapa por caso."""
+    columnas = ['decod', 'fondo', 'iconos', 'titulo', 'capa', 'png']
+    print()
+    print(f"{'CASO':<28}" + ''.join(f"{c:>8}" for c in columnas) +
+          f"{'TOTAL':>9}{'THUMB/S':>9}{'MB':>7}")
+    print("─" * (28 + 8 * len(columnas) + 25))
+    for nombre, caso in resultados['casos'].items():
+        fila = ''.join(f"{caso['etapas'][etapa]['mediana_ms']:>8.1f}" for etapa in ETAPAS)
+        print(f"{nombre:<28}{fila}{caso['total_ms']:>9.1f}{caso['por_segundo']:>9.2f}"
+              f"{caso['pico_memoria_mb']:>7.0f}")
+    print("(tiempos en ms: mediana de las repeticiones)")
+
+
+def comparar_resultados(base, actual, umbral=10.0, minimo_ms=2.0):
+    """
+    Compara dos ejecuciones etapa a etapa.
+
+    Una etapa empeora si su mediana crece más de umbral % y además más de
+    minimo_ms (para no marcar ruido en etapas muy cortas). La memoria se
+    compara con el mismo umbral.
+
+    Args:
+        base (dict): Resultados de referencia (ejecutar_suite)
+        actual (dict): Resultados nuevos
+        umbral (float): Porcentaje de empeoramiento tolerado
+        minimo_ms (float): Diferencia absoluta mínima para contar
+
+    Returns:
+        list: Regresiones como tuplas (caso, etapa, antes, después)
+    """
+    regresiones = []
+
+    print()
+    print(f"{'CASO':<28}{'ETAPA':<20}{'BASE':>10}{'ACTUAL':>10}{'CAMBIO':>9}")
+    print("─" * 77)
+    for nombre, caso in actual['casos'].items():
+        caso_base = base['casos'].get(nombre)
+        if caso_base is None:
+            print(f"{nombre:<28}(sin línea base)")
+            continue
+
+        comparaciones = [
+            (etapa, caso_base['etapas'][etapa]['mediana_ms'], caso['etapas'][etapa]['mediana_ms'], minimo_ms)
+            for etapa in ETAPAS if etapa in caso_base['etapas']
+        ]
+        comparaciones.append(('total', caso_base['total_ms'], caso['total_ms'], minimo_ms))
+        comparaciones.append(('memoria_mb', caso_base['pico_memoria_mb'], caso['pico_memoria_mb'], 1.0))
+
+        for etapa, antes, despues, minimo in comparaciones:
+            cambio = (despues - antes) / antes * 100 if antes > 0 else 0.0
+            empeora = cambio > umbral and despues - antes > minimo
+            if empeora:
+                regresiones.append((nombre, etapa, antes, despues))
+            marca = "❌" if empeora else ("✅" if cambio < -umbral else "  ")
+            print(f"{nombre:<28}{etapa:<20}{antes:>10.1f}{despues:>10.1f}{cambio:>+8.1f}% {marca}")
+
+    print()
+    if regresiones:
+        print(f"❌ {len(regresiones)} regresión(es) de más del {umbral:.0f}%")
+    else:
+        print(f"✅ Sin regresiones de más del {umbral:.0f}%")
+    return regresiones
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(
+        description='Benchmark por etapas del pipeline de thumbnails (sin red).'
+    )
+    parser.add_argument('--casos', default=None,
+                        help="Filtro: solo los casos que contienen este texto (p. ej. 'enorme' o '4-alpha')")
+    parser.add_argument('--repeticiones', type=int, default=3, help='Repeticiones medidas por caso')
+    parser.add_argument('--calentamiento', type=int, default=1, help='Repeticiones previas sin medir')
+    parser.add_argument('--rapido', action='store_true', help='Medir el fondo en modo rápido')
+    parser.add_argument('--guardar', metavar='JSON', help='Guardar los resultados como línea base')
+    parser.add_argument('--comparar', metavar='JSON', help='Comparar con una línea base guardada')
+    parser.add_argument('--umbral', type=float, default=10.0,
+                        help='Porcentaje de empeoramiento que cuenta como regresión (por defecto 10)')
+    parser.add_argument('--listar', action='store_true', help='Listar los casos y salir')
+    args = parser.parse_args(argumentos)
+
+    casos = casos_disponibles()
+    if args.casos:
+        casos = [caso for caso in casos if args.casos in caso]
+    if args.listar:
+        print('\n'.join(casos))
+        return 0
+    if not casos:
+        print(f"❌ Ningún caso coincide con '{args.casos}'")
+        return 1
+
+    base = None
+    if args.comparar:
+        with open(args.comparar, 'r', encoding='utf-8') as f:
+            base = json.load(f)
+
+    print(f"🧪 {len(casos)} caso(s), {args.repeticiones} repetición(es) cada uno")
+    resultados = ejecutar_suite(casos, args.repeticiones, args.calentamiento, args.rapido)
+    mostrar_resultados(resultados)
+
+    if args.guardar:
+        with open(args.guardar, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Línea base guardada en {args.guardar}")
+
+    if base is not None:
+        if base['entorno'].get('fondo_rapido') != args.rapido:
+            print("\n⚠️  La línea base se midió con otro modo de fondo (--rapido)")
+        if comparar_resultados(base, resultados, args.umbral):
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -16,73 +16,487 @@ Fecha: Julio 2025
 
 import os
 import sys
+import csv
+import json
+import time
+import argparse
+import contextlib
+import functools
+import math
+import hashlib
+import logging
 import requests
+import requests.adapters
 from urllib.parse import urlparse
-from PIL import Image, ImageDraw, ImageFont, ImageFilter
+from PIL import Image, ImageDraw, ImageFont, ImageFilter, ImageChops, PngImagePlugin
 from io import BytesIO
 import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from image_cache import CacheImagenesRemotas
+from output_encoders import codificar, obtener_codificador, validar_opciones, extensiones_conocidas
+from layered_export import crear_openraster
+from render_metrics import METRICAS, medir_etapa, medir_render
 
 
-def descargar_imagen(url_o_ruta):
+# Mensajes de progreso y diagnóstico: silenciosos salvo que se configure
+# logging (la línea de comandos los muestra con nivel INFO)
+logger = logging.getLogger(__name__)
+
+# Presupuesto máximo de píxeles por imagen de entrada (≈ 50 MP). Las imágenes
+# mayores se rechazan tras leer la cabecera, antes de decodificarlas.
+MAX_PIXELES_ENTRADA = 50_000_000
+
+
+def reducir_al_cargar(imagen, tamano_objetivo, ajuste='cubrir', max_pixeles=MAX_PIXELES_ENTRADA):
+    """
+    Valida y reduce una imagen recién abierta antes de decodificarla entera.
+    
+    Para JPEG usa la decodificación escalada por DCT (draft) y después
+    Image.reduce con el mayor factor entero que mantiene la imagen por encima
+    del tamaño final, de modo que el LANCZOS posterior trabaja sobre una
+    imagen ya pequeña.
+    
+    Args:
+        imagen (PIL.Image): Imagen abierta con Image.open (aún sin cargar)
+        tamano_objetivo (tuple): (ancho, alto) al que se redimensionará después,
+            o None para no reducir
+        ajuste (str): 'cubrir' si la imagen debe cubrir el objetivo (fondo) o
+            'contener' si debe caber dentro de él (iconos)
+        max_pixeles (int): Presupuesto máximo de píxeles, o None para no limitar
+        
+    Returns:
+        PIL.Image: Imagen (posiblemente reducida)
+        
+    Raises:
+        ValueError: Si la imagen supera el presupuesto de píxeles
+    """
+    ancho, alto = imagen.size
+    if max_pixeles and ancho * alto > max_pixeles:
+        raise ValueError(
+            f"Imagen demasiado grande: {ancho}x{alto} píxeles (máximo {max_pixeles:,})"
+        )
+    
+    if not tamano_objetivo:
+        return imagen
+    
+    ancho_objetivo, alto_objetivo = tamano_objetivo
+    if ajuste == 'cubrir':
+        escala = max(ancho_objetivo / ancho, alto_objetivo / alto)
+    else:
+        escala = min(ancho_objetivo / ancho, alto_objetivo / alto)
+    
+    if escala > 0.5:  # No hay reducción entera posible
+        return imagen
+    
+    # Tamaño mínimo que debe conservar la imagen reducida
+    ancho_minimo = math.ceil(ancho * escala)
+    alto_minimo = math.ceil(alto * escala)
+    
+    if imagen.format == 'JPEG':
+        imagen.draft(imagen.mode, (ancho_minimo, alto_minimo))
+    
+    factor = min(imagen.width // ancho_minimo, imagen.height // alto_minimo)
+    if factor >= 2:
+        if imagen.mode == 'P':
+            imagen = imagen.convert('RGBA')
+        elif imagen.mode not in ('L', 'LA', 'RGB', 'RGBA', 'CMYK'):
+            imagen = imagen.convert('RGB')
+        imagen = imagen.reduce(factor)
+    
+    return imagen
+
+
+# Descargas HTTP: sesión compartida con pool de conexiones por host
+TIMEOUT_DESCARGA = 30            # Segundos por imagen (y en total para los iconos)
+CONEXIONES_POR_HOST = 4          # Conexiones simultáneas máximas a un mismo host
+MAX_HOSTS_EN_POOL = 16           # Hosts distintos con conexiones reutilizables
+MAX_DESCARGAS_CONCURRENTES = 8   # Hilos para descargar/decodificar en paralelo
+
+# Caché en disco de imágenes remotas (ver image_cache.py)
+DIRECTORIO_CACHE_REMOTO = os.path.join(os.path.expanduser('~'), '.cache', 'auto_thumbnail', 'imagenes')
+
+_sesion_http = None
+_pool_descargas = None
+_cache_remoto = None
+_cache_remoto_configurado = False
+_lock_descargas = threading.Lock()
+
+
+def obtener_sesion_http():
+    """
+    Devuelve la sesión HTTP compartida por el proceso (creándola si no existe).
+    
+    La sesión reutiliza conexiones (keep-alive/TLS) y limita las conexiones
+    simultáneas por host a CONEXIONES_POR_HOST.
+    
+    Returns:
+        requests.Session: Sesión compartida
+    """
+    global _sesion_http
+    with _lock_descargas:
+        if _sesion_http is None:
+            sesion = requests.Session()
+            adaptador = requests.adapters.HTTPAdapter(
+                pool_connections=MAX_HOSTS_EN_POOL,
+                pool_maxsize=CONEXIONES_POR_HOST,
+                pool_block=True,
+            )
+            sesion.mount('http://', adaptador)
+            sesion.mount('https://', adaptador)
+            _sesion_http = sesion
+        return _sesion_http
+
+
+def configurar_sesion_http(sesion):
+    """
+    Sustituye la sesión HTTP compartida (p. ej. por una apuntando a un
+    servidor local de pruebas o con cabeceras/proxies propios).
+    
+    Args:
+        sesion (requests.Session): Sesión a usar en las descargas
+    """
+    global _sesion_http
+    with _lock_descargas:
+        _sesion_http = sesion
+
+
+def configurar_cache_remoto(cache):
+    """
+    Sustituye la caché de imágenes remotas.
+    
+    Args:
+        cache (CacheImagenesRemotas): Caché a usar, o None para desactivarla
+    """
+    global _cache_remoto, _cache_remoto_configurado
+    with _lock_descargas:
+        _cache_remoto = cache
+        _cache_remoto_configurado = True
+
+
+def obtener_cache_remoto():
+    """
+    Devuelve la caché de imágenes remotas (por defecto en DIRECTORIO_CACHE_REMOTO).
+    
+    Returns:
+        CacheImagenesRemotas: Caché compartida, o None si está desactivada
+    """
+    global _cache_remoto, _cache_remoto_configurado
+    with _lock_descargas:
+        if not _cache_remoto_configurado:
+            _cache_remoto_configurado = True
+            try:
+                _cache_remoto = CacheImagenesRemotas(DIRECTORIO_CACHE_REMOTO)
+            except OSError as e:
+                logger.warning(f"⚠️  Caché de imágenes desactivada: {e}")
+                _cache_remoto = None
+        return _cache_remoto
+
+
+def descargar_bytes(url, timeout=TIMEOUT_DESCARGA):
+    """
+    Descarga el contenido de una URL pasando por la caché de imágenes remotas.
+    
+    Args:
+        url (str): URL de la imagen
+        timeout (float): Timeout de la petición en segundos
+        
+    Returns:
+        bytes: Contenido descargado
+    """
+    cache = obtener_cache_remoto()
+    with medir_etapa('download'):
+        if cache is not None:
+            return cache.obtener(url, obtener_sesion_http(), timeout=timeout)
+        
+        response = obtener_sesion_http().get(url, timeout=timeout)
+        response.raise_for_status()
+        return response.content
+
+
+def obtener_pool_descargas():
+    """
+    Devuelve el pool de hilos acotado usado para descargar imágenes en paralelo.
+    
+    Returns:
+        concurrent.futures.ThreadPoolExecutor: Pool compartido
+    """
+    global _pool_descargas
+    with _lock_descargas:
+        if _pool_descargas is None:
+            _pool_descargas = ThreadPoolExecutor(
+                max_workers=MAX_DESCARGAS_CONCURRENTES, thread_name_prefix='descarga'
+            )
+        return _pool_descargas
+
+
+def cargar_imagen(url_o_ruta, tamano_objetivo=None, ajuste='cubrir',
+                  max_pixeles=MAX_PIXELES_ENTRADA, timeout=TIMEOUT_DESCARGA):
+    """
+    Descarga una imagen desde URL o la carga desde ruta local, lanzando
+    excepciones en lugar de terminar el proceso.
+    
+    Args:
+        url_o_ruta (str): URL o ruta local de la imagen
+        tamano_objetivo (tuple): Tamaño final aproximado para reducir al cargar
+            (ver reducir_al_cargar)
+        ajuste (str): 'cubrir' o 'contener' respecto a tamano_objetivo
+        max_pixeles (int): Presupuesto máximo de píxeles de la imagen
+        timeout (float): Timeout de la descarga en segundos
+        
+    Returns:
+        PIL.Image: Imagen cargada
+        
+    Raises:
+        requests.exceptions.RequestException: Si falla la descarga
+        FileNotFoundError: Si la ruta local no existe
+        ValueError: Si la imagen supera el presupuesto de píxeles
+    """
+    datos = leer_bytes_imagen(url_o_ruta, timeout=timeout)
+    return decodificar_imagen(datos, tamano_objetivo, ajuste, max_pixeles)
+
+
+def leer_bytes_imagen(url_o_ruta, timeout=TIMEOUT_DESCARGA):
+    """
+    Obtiene el contenido sin decodificar de una imagen (URL o ruta local).
+    
+    Args:
+        url_o_ruta (str): URL o ruta local de la imagen
+        timeout (float): Timeout de la descarga en segundos
+        
+    Returns:
+        bytes: Contenido del fichero
+    """
+    if url_o_ruta.startswith(('http://', 'https://')):
+        datos = descargar_bytes(url_o_ruta, timeout=timeout)
+        
+        # Advertir si es muy grande
+        tamaño_mb = len(datos) / (1024 * 1024)
+        if tamaño_mb > 10:
+            logger.warning(f"⚠️  Imagen grande detectada: {tamaño_mb:.1f} MB")
+    else:
+        if not os.path.exists(url_o_ruta):
+            raise FileNotFoundError(f"Archivo no encontrado: {url_o_ruta}")
+        
+        # Verificar tamaño del archivo local
+        tamaño_mb = os.path.getsize(url_o_ruta) / (1024 * 1024)
+        if tamaño_mb > 20:
+            logger.warning(f"⚠️  Archivo grande: {tamaño_mb:.1f} MB")
+        
+        with open(url_o_ruta, 'rb') as f:
+            datos = f.read()
+    
+    return datos
+
+
+def decodificar_imagen(datos, tamano_objetivo=None, ajuste='cubrir', max_pixeles=MAX_PIXELES_ENTRADA):
+    """
+    Abre una imagen desde sus bytes aplicando la reducción al cargar.
+    
+    Args:
+        datos (bytes): Contenido del fichero de imagen
+        tamano_objetivo (tuple): Ver reducir_al_cargar
+        ajuste (str): 'cubrir' o 'contener' respecto a tamano_objetivo
+        max_pixeles (int): Presupuesto máximo de píxeles de la imagen
+        
+    Returns:
+        PIL.Image: Imagen abierta (y reducida si procede)
+    """
+    return reducir_al_cargar(Image.open(BytesIO(datos)), tamano_objetivo, ajuste, max_pixeles)
+
+
+def leer_entrada(entrada, timeout=TIMEOUT_DESCARGA):
+    """
+    Obtiene el contenido de una entrada del render y su hash, sin decodificarla.
+    
+    Args:
+        entrada (str | bytes | PIL.Image): URL, ruta local, contenido del
+            fichero o imagen ya abierta en memoria
+        timeout (float): Timeout de la descarga en segundos
+        
+    Returns:
+        tuple: (hash del contenido, bytes o PIL.Image)
+    """
+    if isinstance(entrada, Image.Image):
+        h = hashlib.sha256(f"{entrada.mode}:{entrada.size}:".encode())
+        h.update(entrada.tobytes())
+        return h.hexdigest(), entrada
+    
+    if isinstance(entrada, (bytes, bytearray, memoryview)):
+        datos = bytes(entrada)
+    else:
+        datos = leer_bytes_imagen(entrada, timeout=timeout)
+    METRICAS.incrementar('thumbnail_input_bytes_total', len(datos))
+    return hashlib.sha256(datos).hexdigest(), datos
+
+
+def abrir_entrada(contenido, tamano_objetivo=None, ajuste='cubrir', max_pixeles=MAX_PIXELES_ENTRADA):
+    """
+    Abre el contenido devuelto por leer_entrada aplicando la reducción al cargar.
+    
+    Args:
+        contenido (bytes | PIL.Image): Contenido de la entrada
+        tamano_objetivo (tuple): Ver reducir_al_cargar
+        ajuste (str): 'cubrir' o 'contener' respecto a tamano_objetivo
+        max_pixeles (int): Presupuesto máximo de píxeles de la imagen
+        
+    Returns:
+        PIL.Image: Imagen abierta (y reducida si procede), ya decodificada
+    """
+    with medir_etapa('decode'):
+        if isinstance(contenido, Image.Image):
+            imagen = reducir_al_cargar(contenido, tamano_objetivo, ajuste, max_pixeles)
+        else:
+            imagen = decodificar_imagen(contenido, tamano_objetivo, ajuste, max_pixeles)
+        imagen.load()
+    return imagen
+
+
+def describir_entrada(entrada):
+    """Texto corto para identificar una entrada en los mensajes."""
+    if isinstance(entrada, Image.Image):
+        return f"<imagen {entrada.mode} {entrada.width}x{entrada.height}>"
+    if isinstance(entrada, (bytes, bytearray, memoryview)):
+        return f"<{len(entrada)} bytes>"
+    return str(entrada)
+
+
+def descargar_imagen(url_o_ruta, tamano_objetivo=None, ajuste='cubrir', max_pixeles=MAX_PIXELES_ENTRADA):
     """
     Descarga una imagen desde URL o carga desde ruta local.
     
     Args:
         url_o_ruta (str): URL o ruta local de la imagen
+        tamano_objetivo (tuple): Tamaño final aproximado para reducir al cargar
+            (ver reducir_al_cargar)
+        ajuste (str): 'cubrir' o 'contener' respecto a tamano_objetivo
+        max_pixeles (int): Presupuesto máximo de píxeles de la imagen
         
     Returns:
         PIL.Image: Imagen cargada
     """
     if url_o_ruta.startswith(('http://', 'https://')):
         try:
-            response = requests.get(url_o_ruta, timeout=30, stream=True)
-            response.raise_for_status()
-            
-            # Obtener tamaño si está disponible
-            tamaño = response.headers.get('content-length')
-            if tamaño:
-                tamaño_mb = int(tamaño) / (1024 * 1024)
-                if tamaño_mb > 10:  # Advertir si es muy grande
-                    print(f"⚠️  Imagen grande detectada: {tamaño_mb:.1f} MB")
-            
-            return Image.open(BytesIO(response.content))
+            return cargar_imagen(url_o_ruta, tamano_objetivo, ajuste, max_pixeles)
         except requests.exceptions.Timeout:
-            print(f"❌ Timeout al descargar: {url_o_ruta}")
+            logger.error(f"❌ Timeout al descargar: {url_o_ruta}")
             sys.exit(1)
         except requests.exceptions.RequestException as e:
-            print(f"❌ Error de conexión: {e}")
+            logger.error(f"❌ Error de conexión: {e}")
             sys.exit(1)
         except Exception as e:
-            print(f"❌ Error procesando imagen remota: {e}")
+            logger.error(f"❌ Error procesando imagen remota: {e}")
             sys.exit(1)
     else:
         try:
-            if not os.path.exists(url_o_ruta):
-                print(f"❌ Archivo no encontrado: {url_o_ruta}")
-                sys.exit(1)
-            
-            # Verificar tamaño del archivo local
-            tamaño_mb = os.path.getsize(url_o_ruta) / (1024 * 1024)
-            if tamaño_mb > 20:
-                print(f"⚠️  Archivo grande: {tamaño_mb:.1f} MB")
-            
-            return Image.open(url_o_ruta)
+            return cargar_imagen(url_o_ruta, tamano_objetivo, ajuste, max_pixeles)
+        except FileNotFoundError:
+            logger.error(f"❌ Archivo no encontrado: {url_o_ruta}")
+            sys.exit(1)
         except Exception as e:
-            print(f"❌ Error cargando imagen local: {e}")
+            logger.error(f"❌ Error cargando imagen local: {e}")
             sys.exit(1)
 
 
-def procesar_imagen_base(imagen_base, ancho=1920, alto=1080):
+class CacheLRU:
+    """Caché en memoria, acotada por número de entradas y segura entre hilos."""
+    
+    def __init__(self, max_entradas, nombre=None):
+        """
+        Args:
+            max_entradas (int): Entradas máximas
+            nombre (str): Si se indica, los aciertos y fallos se cuentan en
+                las métricas con la etiqueta cache=nombre
+        """
+        self.max_entradas = max_entradas
+        self.nombre = nombre
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def obtener(self, clave):
+        """Devuelve el valor de la clave (marcándolo como usado) o None."""
+        with self._lock:
+            valor = self._entradas.get(clave)
+            if valor is not None:
+                self._entradas.move_to_end(clave)
+        if self.nombre is not None:
+            metrica = 'thumbnail_cache_misses_total' if valor is None else 'thumbnail_cache_hits_total'
+            METRICAS.incrementar(metrica, cache=self.nombre)
+        return valor
+    
+    def guardar(self, clave, valor):
+        """Guarda el valor y expulsa las entradas menos usadas si sobran."""
+        with self._lock:
+            self._entradas[clave] = valor
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+    
+    def vaciar(self):
+        with self._lock:
+            self._entradas.clear()
+
+
+# Cachés de etapas del pipeline, por hash del contenido de las entradas. Los
+# valores cacheados se comparten entre renders y no deben modificarse.
+CACHE_FONDOS = CacheLRU(16, 'fondos')               # Fondo redimensionado y desenfocado
+CACHE_ICONOS = CacheLRU(64, 'iconos')               # Icono decodificado y en RGBA (reducido al decodificar)
+CACHE_SPRITES_ICONOS = CacheLRU(64, 'sprites_iconos')  # Icono a su tamaño final y su sombra desenfocada
+CACHE_CAPAS_ICONOS = CacheLRU(16, 'capas_iconos')   # Fila de iconos con sus sombras ya compuesta
+
+
+# Lienzo de referencia: las medidas de la composición (tamaño de letra,
+# sombras, márgenes, tamaño de iconos...) están definidas para 1920x1080 y se
+# escalan al lienzo de cada render con escala_lienzo
+ANCHO_REFERENCIA = 1920
+ALTO_REFERENCIA = 1080
+
+# Tamaños con nombre que acepta renderizar_variantes
+VARIANTES = OrderedDict([
+    ('1080p', (1920, 1080)),
+    ('720p', (1280, 720)),
+    ('360p', (640, 360)),
+    ('social', (1200, 630)),    # Tarjeta para redes sociales (Open Graph)
+])
+
+
+def escala_lienzo(ancho, alto):
     """
-    Redimensiona la imagen base y aplica desenfoque gaussiano.
+    Factor por el que se multiplican las medidas de referencia en un lienzo.
+    
+    Se usa el menor de los dos ejes para que la composición quepa también en
+    lienzos con otra proporción (p. ej. 1200x630).
+    
+    Returns:
+        float: 1.0 para el lienzo de referencia
+    """
+    return min(ancho / ANCHO_REFERENCIA, alto / ALTO_REFERENCIA)
+
+
+# Factor de reducción del modo rápido de fondo: el blur se calcula a 1/4 de
+# resolución con radio 20/4 y se reescala. Diferencia medida frente al modo
+# completo (fondos de 2400x1600 a 6000x4000): error medio < 0.4/255 por canal,
+# máximo < 20/255 en bordes muy contrastados; entre 4 y 7 veces más rápido.
+# tests/test_fondo_rapido.py comprueba el umbral con ruido y degradados. Quedan
+# fuera las tramas periódicas de 1-3 px, con moiré en el modo rápido, y el
+# texto negro sobre blanco, que el LANCZOS del modo completo oscurece ~4/255
+# al recortar su ringing.
+FACTOR_FONDO_RAPIDO = 4
+
+
+def ajustar_fondo(imagen_base, ancho=ANCHO_REFERENCIA, alto=ALTO_REFERENCIA, rapido=False):
+    """
+    Redimensiona la imagen para cubrir el lienzo y la recorta centrada.
     
     Args:
         imagen_base (PIL.Image): Imagen base original
         ancho (int): Ancho objetivo en píxeles
         alto (int): Alto objetivo en píxeles
+        rapido (bool): Usar un filtro bilineal (con reducing_gap) en lugar de LANCZOS
         
     Returns:
-        PIL.Image: Imagen procesada
+        PIL.Image: Imagen RGB de ancho x alto
     """
     # Convertir a RGB si es necesario
     if imagen_base.mode != 'RGB':
@@ -102,95 +516,268 @@ def procesar_imagen_base(imagen_base, ancho=1920, alto=1080):
         nuevo_alto = int(ancho / ratio_original)
     
     # Redimensionar
-    imagen_redimensionada = imagen_base.resize((nuevo_ancho, nuevo_alto), Image.Resampling.LANCZOS)
+    if rapido:
+        # reducing_gap reduce primero con reduce() (promedio por bloques) y
+        # termina con un bilineal sobre una imagen ya pequeña
+        imagen_redimensionada = imagen_base.resize(
+            (nuevo_ancho, nuevo_alto), Image.Resampling.BILINEAR, reducing_gap=2.0
+        )
+    else:
+        imagen_redimensionada = imagen_base.resize((nuevo_ancho, nuevo_alto), Image.Resampling.LANCZOS)
     
     # Crear canvas final y centrar imagen
     canvas = Image.new('RGB', (ancho, alto), (0, 0, 0))
     x_offset = (ancho - nuevo_ancho) // 2
     y_offset = (alto - nuevo_alto) // 2
     canvas.paste(imagen_redimensionada, (x_offset, y_offset))
+    return canvas
+
+
+@medir_etapa('background')
+def procesar_imagen_base(imagen_base, ancho=ANCHO_REFERENCIA, alto=ALTO_REFERENCIA, rapido=False):
+    """
+    Redimensiona la imagen base y aplica desenfoque gaussiano.
+    
+    Args:
+        imagen_base (PIL.Image): Imagen base original
+        ancho (int): Ancho objetivo en píxeles
+        alto (int): Alto objetivo en píxeles
+        rapido (bool): Si es True, redimensiona con un filtro más barato y
+            desenfoca a resolución reducida (FACTOR_FONDO_RAPIDO) antes de
+            reescalar al tamaño final. El resultado es visualmente equivalente
+            porque la imagen queda muy desenfocada igualmente.
+        
+    Returns:
+        PIL.Image: Imagen procesada
+    """
+    # Radio de 20px en el lienzo de referencia, proporcional en los demás
+    radio_blur = 20 * escala_lienzo(ancho, alto)
+    
+    # En modo rápido todo el trabajo se hace sobre un canvas reducido
+    ancho_final, alto_final = ancho, alto
+    if rapido:
+        ancho = max(1, round(ancho / FACTOR_FONDO_RAPIDO))
+        alto = max(1, round(alto / FACTOR_FONDO_RAPIDO))
+        radio_blur = radio_blur / FACTOR_FONDO_RAPIDO
+    
+    canvas = ajustar_fondo(imagen_base, ancho, alto, rapido=rapido)
     
     # Aplicar desenfoque gaussiano
-    imagen_desenfocada = canvas.filter(ImageFilter.GaussianBlur(radius=20))
+    imagen_desenfocada = canvas.filter(ImageFilter.GaussianBlur(radius=radio_blur))
+    
+    if rapido:
+        imagen_desenfocada = imagen_desenfocada.resize((ancho_final, alto_final), Image.Resampling.BICUBIC)
     
     return imagen_desenfocada
 
 
+def obtener_fondo_procesado(imagen_base, ancho=ANCHO_REFERENCIA, alto=ALTO_REFERENCIA, rapido=False):
+    """
+    Carga y procesa la imagen de fondo reutilizando el resultado si el mismo
+    contenido ya se procesó con los mismos parámetros.
+    
+    Args:
+        imagen_base (str | bytes | PIL.Image): Ruta, URL, contenido o imagen
+            en memoria del fondo
+        ancho (int): Ancho objetivo en píxeles
+        alto (int): Alto objetivo en píxeles
+        rapido (bool): Ver procesar_imagen_base
+        
+    Returns:
+        PIL.Image: Fondo procesado (compartido: no modificar)
+    """
+    hash_fondo, contenido = leer_entrada(imagen_base)
+    clave = (hash_fondo, ancho, alto, rapido)
+    
+    img_fondo = CACHE_FONDOS.obtener(clave)
+    if img_fondo is None:
+        factor = FACTOR_FONDO_RAPIDO if rapido else 1
+        img_original = abrir_entrada(contenido, (ancho // factor, alto // factor))
+        img_fondo = procesar_imagen_base(img_original, ancho, alto, rapido=rapido)
+        CACHE_FONDOS.guardar(clave, img_fondo)
+    
+    return img_fondo
+
+
+def obtener_fondos_variantes(imagen_base, tamanos, rapido=False):
+    """
+    Procesa el fondo para varios lienzos decodificando la imagen una sola vez.
+    
+    Los lienzos se procesan de mayor a menor. Si ya se desenfocó uno mayor con
+    la misma proporción, el fondo se obtiene reduciéndolo en lugar de repetir
+    el desenfoque: el radio escala con el lienzo, así que el resultado es
+    equivalente.
+    
+    Args:
+        imagen_base (str | bytes | PIL.Image): Ruta, URL, contenido o imagen del fondo
+        tamanos (list): Tamaños (ancho, alto) de los lienzos
+        rapido (bool): Ver procesar_imagen_base
+        
+    Returns:
+        dict: (ancho, alto) → fondo procesado (compartido: no modificar)
+    """
+    hash_fondo, contenido = leer_entrada(imagen_base)
+    factor = FACTOR_FONDO_RAPIDO if rapido else 1
+    img_original = None
+    fondos = {}
+    
+    for ancho, alto in sorted(set(tamanos), key=lambda tamano: tamano[0] * tamano[1], reverse=True):
+        clave = (hash_fondo, ancho, alto, rapido)
+        img_fondo = CACHE_FONDOS.obtener(clave)
+        
+        if img_fondo is None:
+            mayor = next(
+                (fondo for (a, h), fondo in fondos.items() if a * alto == h * ancho), None
+            )
+            if mayor is not None:
+                img_fondo = mayor.resize((ancho, alto), Image.Resampling.BICUBIC, reducing_gap=2.0)
+            else:
+                if img_original is None:
+                    # Reducida al decodificar lo justo para cubrir todos los lienzos
+                    img_original = abrir_entrada(contenido, (
+                        max(a for a, _ in tamanos) // factor, max(h for _, h in tamanos) // factor
+                    ))
+                img_fondo = procesar_imagen_base(img_original, ancho, alto, rapido=rapido)
+            CACHE_FONDOS.guardar(clave, img_fondo)
+        
+        fondos[(ancho, alto)] = img_fondo
+    
+    return fondos
+
+
+def normalizar_fondo(imagen_base, ancho=ANCHO_REFERENCIA, alto=ALTO_REFERENCIA):
+    """
+    Versión normalizada de un fondo para guardarla junto al original: ya
+    recortada al lienzo y sin desenfocar, de modo que los renders posteriores
+    no tengan que decodificar ni redimensionar la imagen original.
+    
+    Se guarda como JPEG de calidad 95 sin submuestreo de color: decodifica
+    más rápido que un PNG del mismo tamaño (también con draft en modo rápido)
+    y, tras el desenfoque, la diferencia media es de ~0.1/255 por canal.
+    
+    Args:
+        imagen_base (str | bytes | PIL.Image): Ruta, URL, contenido o imagen del fondo
+        ancho (int): Ancho del lienzo
+        alto (int): Alto del lienzo
+        
+    Returns:
+        bytes: JPEG de ancho x alto
+    """
+    contenido = leer_entrada(imagen_base)[1]
+    fondo = ajustar_fondo(abrir_entrada(contenido, (ancho, alto)), ancho, alto)
+    buffer = BytesIO()
+    fondo.save(buffer, 'JPEG', quality=95, subsampling=0)
+    return buffer.getvalue()
+
+
+# Intentar cargar Alliance No.2 Bold Italic primero, luego alternativas EN CURSIVA
+FUENTES_POSIBLES = [
+    # Alliance No.2 Bold Italic (preferida)
+    "Alliance-No2-BoldItalic.ttf",
+    "AllianceNo2-BoldItalic.ttf",
+    "Alliance No.2 Bold Italic.ttf",
+    "/usr/share/fonts/truetype/alliance/Alliance-No2-BoldItalic.ttf",
+    "/System/Library/Fonts/Alliance No.2 Bold Italic.ttf",  # macOS
+    "C:/Windows/Fonts/Alliance-No2-BoldItalic.ttf",  # Windows
+    
+    # Mejores alternativas Bold Italic disponibles en Linux
+    "/usr/share/fonts/truetype/liberation/LiberationSans-BoldItalic.ttf",  # Liberation Sans Bold Italic
+    "/usr/share/fonts/truetype/noto/NotoSerifDisplay-BoldItalic.ttf",      # Noto Serif Display Bold Italic
+    "/usr/share/fonts/opentype/urw-base35/NimbusMonoPS-BoldItalic.otf",    # Nimbus Mono PS Bold Italic
+    "/usr/share/fonts/truetype/liberation/LiberationMono-BoldItalic.ttf",  # Liberation Mono Bold Italic
+    "/usr/share/fonts/truetype/ubuntu/UbuntuSans-Italic[wdth,wght].ttf",   # Ubuntu Sans Bold Italic
+    "/usr/share/fonts/truetype/dejavu/DejaVuSerifCondensed-BoldItalic.ttf", # DejaVu Serif Bold Italic
+    
+    # Fallbacks Windows/macOS
+    "times-bold-italic.ttf",
+    "Times-BoldItalic.ttf",
+    "/System/Library/Fonts/Times Bold Italic.ttf",  # macOS
+    "C:/Windows/Fonts/timesbi.ttf",  # Windows Times Bold Italic
+    
+    # Más alternativas cursivas
+    "arial-italic.ttf",
+    "Arial-Italic.ttf",
+    "ariali.ttf",  # Arial Italic en Windows
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans-BoldOblique.ttf",  # DejaVu Bold Oblique
+    "/usr/share/fonts/truetype/liberation/LiberationSans-Italic.ttf",
+    "/usr/share/fonts/truetype/ubuntu/Ubuntu-BoldItalic.ttf",
+    "/System/Library/Fonts/Arial Italic.ttf",  # macOS
+    "C:/Windows/Fonts/ariali.ttf",  # Windows Arial Italic
+    
+    # Si no hay cursivas específicas, usar regulares
+    "arial.ttf",
+    "Arial.ttf", 
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+    "/usr/share/fonts/TTF/arial.ttf",
+    "/System/Library/Fonts/Arial.ttf",  # macOS
+    "C:/Windows/Fonts/arial.ttf"  # Windows
+]
+
+# Número máximo de tamaños de fuente cargados que se mantienen en memoria
+# (cada tamaño de lienzo de renderizar_variantes usa los suyos)
+MAX_FUENTES_EN_CACHE = 64
+
+
+@functools.lru_cache(maxsize=None)
+def resolver_ruta_fuente():
+    """
+    Busca una sola vez por proceso la primera fuente disponible de FUENTES_POSIBLES.
+    
+    Returns:
+        str: Ruta/nombre de la fuente encontrada, o None si no hay ninguna
+    """
+    for fuente in FUENTES_POSIBLES:
+        try:
+            ImageFont.truetype(fuente, 10)
+        except Exception:
+            continue
+        
+        # Mostrar solo el nombre del archivo para que sea más claro
+        nombre_fuente = fuente.split('/')[-1] if '/' in fuente else fuente
+        logger.info(f"✅ Fuente CURSIVA cargada: {nombre_fuente}")
+        return fuente
+    
+    logger.warning("⚠️ Advertencia: No se pudo cargar ninguna fuente cursiva, usando fuente por defecto")
+    return None
+
+
+@functools.lru_cache(maxsize=MAX_FUENTES_EN_CACHE)
 def obtener_fuente(tamano):
     """
     Obtiene la fuente Alliance No.2 Bold Italic o una alternativa en CURSIVA del sistema.
     
+    La ruta se resuelve una vez por proceso (resolver_ruta_fuente) y las fuentes
+    cargadas se cachean por tamaño con expulsión LRU.
+    
     Args:
         tamano (int): Tamaño de la fuente
         
     Returns:
         PIL.ImageFont: Objeto de fuente en cursiva
     """
-    # Intentar cargar Alliance No.2 Bold Italic primero, luego alternativas EN CURSIVA
-    fuentes_posibles = [
-        # Alliance No.2 Bold Italic (preferida)
-        "Alliance-No2-BoldItalic.ttf",
-        "AllianceNo2-BoldItalic.ttf",
-        "Alliance No.2 Bold Italic.ttf",
-        "/usr/share/fonts/truetype/alliance/Alliance-No2-BoldItalic.ttf",
-        "/System/Library/Fonts/Alliance No.2 Bold Italic.ttf",  # macOS
-        "C:/Windows/Fonts/Alliance-No2-BoldItalic.ttf",  # Windows
-        
-        # Mejores alternativas Bold Italic disponibles en Linux
-        "/usr/share/fonts/truetype/liberation/LiberationSans-BoldItalic.ttf",  # Liberation Sans Bold Italic
-        "/usr/share/fonts/truetype/noto/NotoSerifDisplay-BoldItalic.ttf",      # Noto Serif Display Bold Italic
-        "/usr/share/fonts/opentype/urw-base35/NimbusMonoPS-BoldItalic.otf",    # Nimbus Mono PS Bold Italic
-        "/usr/share/fonts/truetype/liberation/LiberationMono-BoldItalic.ttf",  # Liberation Mono Bold Italic
-        "/usr/share/fonts/truetype/ubuntu/UbuntuSans-Italic[wdth,wght].ttf",   # Ubuntu Sans Bold Italic
-        "/usr/share/fonts/truetype/dejavu/DejaVuSerifCondensed-BoldItalic.ttf", # DejaVu Serif Bold Italic
-        
-        # Fallbacks Windows/macOS
-        "times-bold-italic.ttf",
-        "Times-BoldItalic.ttf",
-        "/System/Library/Fonts/Times Bold Italic.ttf",  # macOS
-        "C:/Windows/Fonts/timesbi.ttf",  # Windows Times Bold Italic
-        
-        # Más alternativas cursivas
-        "arial-italic.ttf",
-        "Arial-Italic.ttf",
-        "ariali.ttf",  # Arial Italic en Windows
-        "/usr/share/fonts/truetype/dejavu/DejaVuSans-BoldOblique.ttf",  # DejaVu Bold Oblique
-        "/usr/share/fonts/truetype/liberation/LiberationSans-Italic.ttf",
-        "/usr/share/fonts/truetype/ubuntu/Ubuntu-BoldItalic.ttf",
-        "/System/Library/Fonts/Arial Italic.ttf",  # macOS
-        "C:/Windows/Fonts/ariali.ttf",  # Windows Arial Italic
-        
-        # Si no hay cursivas específicas, usar regulares
-        "arial.ttf",
-        "Arial.ttf", 
-        "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
-        "/usr/share/fonts/TTF/arial.ttf",
-        "/System/Library/Fonts/Arial.ttf",  # macOS
-        "C:/Windows/Fonts/arial.ttf"  # Windows
-    ]
+    ruta_fuente = resolver_ruta_fuente()
     
-    fuente_encontrada = None
-    fuente_usada = "Por defecto"
+    # Si no encuentra ninguna, usar fuente por defecto
+    if ruta_fuente is None:
+        return ImageFont.load_default()
     
-    for fuente in fuentes_posibles:
-        try:
-            fuente_encontrada = ImageFont.truetype(fuente, tamano)
-            fuente_usada = fuente
-            break
-        except:
-            continue
+    return ImageFont.truetype(ruta_fuente, tamano)
+
+
+def precargar_fuentes(tamanos=None):
+    """
+    Calienta el registro de fuentes (p. ej. al arrancar un worker).
     
-    # Si no encuentra ninguna, usar fuente por defecto
-    if fuente_encontrada is None:
-        print("⚠️ Advertencia: No se pudo cargar ninguna fuente cursiva, usando fuente por defecto")
-        fuente_encontrada = ImageFont.load_default()
-        fuente_usada = "Sistema por defecto"
-    else:
-        # Mostrar solo el nombre del archivo para que sea más claro
-        nombre_fuente = fuente_usada.split('/')[-1] if '/' in fuente_usada else fuente_usada
-        print(f"✅ Fuente CURSIVA cargada: {nombre_fuente}")
+    Args:
+        tamanos (list): Tamaños en píxeles a cargar. Por defecto, el tamaño
+            inicial del ajuste de título y el del resumen de estadísticas.
+    """
+    if tamanos is None:
+        tamanos = [int(158.52 * 96 / 72), 130]
     
-    return fuente_encontrada
+    resolver_ruta_fuente()
+    for tamano in tamanos:
+        obtener_fuente(tamano)
 
 
 def crear_sombra_texto(draw, texto, posicion, fuente, color_sombra, blur, offset):
@@ -213,10 +800,69 @@ def crear_sombra_texto(draw, texto, posicion, fuente, color_sombra, blur, offset
     draw.text((x + offset_x, y + offset_y), texto, font=fuente, fill=color_sombra)
 
 
+def mascara_texto(fuente, texto):
+    """
+    Rasteriza el texto una sola vez como máscara de cobertura (modo L).
+    
+    Rellenar una capa a través de la máscara, con
+    capa.paste(color, posición + desplazamiento, máscara), es la misma
+    operación que hace ImageDraw.text tras rasterizar el texto, así que cada
+    sombra se obtiene desplazando la máscara y cambiando el alfa del color
+    sin volver a rasterizar los glifos.
+    
+    Args:
+        fuente (PIL.ImageFont): Fuente a usar
+        texto (str): Texto a rasterizar
+        
+    Returns:
+        tuple: (máscara L, (dx, dy) desde la posición del texto hasta la
+            esquina superior izquierda de la máscara)
+    """
+    izq, arriba, der, abajo = fuente.getbbox(texto)
+    mascara = Image.new('L', (der - izq, abajo - arriba), 0)
+    ImageDraw.Draw(mascara).text((-izq, -arriba), texto, font=fuente, fill=255)
+    return mascara, (izq, arriba)
+
+
+def region_efecto_texto(fuente, texto, posiciones, radio_blur, ancho, alto):
+    """
+    Calcula la región del canvas afectada por un efecto de texto.
+    
+    Une las cajas del texto dibujado en cada posición y las amplía con el
+    alcance del GaussianBlur (3 pasadas de box blur ≈ 3 × radio), de modo que
+    fuera de la región la capa es totalmente transparente y puede componerse
+    solo sobre ese recorte en lugar de sobre el frame completo.
+    
+    Args:
+        fuente (PIL.ImageFont): Fuente a usar
+        texto (str): Texto a dibujar
+        posiciones (list): Posiciones (x, y) donde se dibuja el texto
+        radio_blur (int): Radio del desenfoque que se aplicará a la capa
+        ancho (int): Ancho del canvas
+        alto (int): Alto del canvas
+        
+    Returns:
+        tuple: Caja (x0, y0, x1, y1) recortada a los límites del canvas
+    """
+    izq, arriba, der, abajo = fuente.getbbox(texto)
+    margen = math.ceil(3 * radio_blur) + 4
+    
+    x0 = min(x for x, _ in posiciones) + izq - margen
+    y0 = min(y for _, y in posiciones) + arriba - margen
+    x1 = max(x for x, _ in posiciones) + der + margen
+    y1 = max(y for _, y in posiciones) + abajo + margen
+    
+    return max(0, x0), max(0, y0), min(ancho, x1), min(alto, y1)
+
+
 def dividir_texto_en_lineas(texto, fuente, ancho_max):
     """
     Divide el texto en múltiples líneas si es necesario para que quepa en el ancho máximo.
     
+    Cada palabra distinta (y el espacio) se mide una sola vez; el ancho de una
+    línea candidata se obtiene sumando avances en lugar de volver a medir el
+    prefijo completo con getbbox en cada palabra.
+    
     Args:
         texto (str): Texto a dividir
         fuente (PIL.ImageFont): Fuente a usar
@@ -226,90 +872,117 @@ def dividir_texto_en_lineas(texto, fuente, ancho_max):
         list: Lista de líneas de texto
     """
     palabras = texto.split()
+    
+    # Medidas por palabra: (avance, borde izquierdo, borde derecho) de la tinta
+    medidas = {}
+    for palabra in palabras:
+        if palabra not in medidas:
+            izq, _, der, _ = fuente.getbbox(palabra)
+            medidas[palabra] = (fuente.getlength(palabra), izq, der)
+    avance_espacio = fuente.getlength(" ")
+    
     lineas = []
-    linea_actual = ""
+    linea_actual = []
+    izq_linea = 0       # Borde izquierdo de la primera palabra de la línea
+    avance_linea = 0    # Avance acumulado hasta el final de la última palabra
     
     for palabra in palabras:
-        linea_prueba = f"{linea_actual} {palabra}".strip()
-        bbox = fuente.getbbox(linea_prueba)
-        ancho_linea = bbox[2] - bbox[0]
+        avance, izq, der = medidas[palabra]
+        
+        if linea_actual:
+            inicio_palabra = avance_linea + avance_espacio
+            ancho_linea = round(inicio_palabra + der - izq_linea)
+        else:
+            inicio_palabra = 0
+            ancho_linea = der - izq
         
         if ancho_linea <= ancho_max:
-            linea_actual = linea_prueba
+            if not linea_actual:
+                izq_linea = izq
+            linea_actual.append(palabra)
+            avance_linea = inicio_palabra + avance
         else:
             if linea_actual:
-                lineas.append(linea_actual)
-                linea_actual = palabra
+                lineas.append(" ".join(linea_actual))
+                linea_actual = [palabra]
+                izq_linea = izq
+                avance_linea = avance
             else:
                 # Si una sola palabra es muy larga, la forzamos
                 lineas.append(palabra)
-                linea_actual = ""
+                linea_actual = []
+                avance_linea = 0
     
     if linea_actual:
-        lineas.append(linea_actual)
+        lineas.append(" ".join(linea_actual))
     
     return lineas
 
 
-def añadir_titulo(imagen, titulo, ancho=1920, alto=1080):
+def ajustar_tamano_titulo(titulo, ancho_max_texto):
     """
-    Añade el título centrado con efectos de sombra profesionales según especificaciones MEJORADAS.
-    - Cursiva (Alliance No.2 Bold Italic o fuente cursiva del sistema)
-    - Sombra paralela: 85% opacidad (más opaca), 9px distancia, 24% extensión, 40px tamaño
-    - Sombra interior: 45% opacidad (más opaca), 30° ángulo, 8% tamaño, 0px distancia
-    - Sin contorno
-    - AJUSTE DINÁMICO: Reduce automáticamente el tamaño para evitar más de 2 líneas
+    Calcula el tamaño de fuente y la división en líneas del título.
+    
+    Busca de forma binaria, entre 158.52pt y 60pt en pasos de 6pt, el mayor
+    tamaño con el que el título cabe en máximo 2 líneas. El resultado se
+    memoriza por (título, fuente, ancho).
     
     Args:
-        imagen (PIL.Image): Imagen base
         titulo (str): Texto del título
-        ancho (int): Ancho de la imagen
-        alto (int): Alto de la imagen
+        ancho_max_texto (int): Ancho máximo disponible para cada línea
         
     Returns:
-        PIL.Image: Imagen con título añadido
+        tuple: (tamaño en pt, tamaño en px, tupla de líneas)
     """
-    import math
-    
-    # Crear copia para no modificar original
-    img_con_titulo = imagen.copy().convert('RGBA')
-    
-    # Ancho máximo para el texto (85% del ancho total)
-    ancho_max_texto = int(ancho * 0.85)
-    
-    # === ALGORITMO DE AJUSTE DINÁMICO DE TAMAÑO ===
+    return _ajustar_tamano_titulo(titulo, ancho_max_texto, resolver_ruta_fuente())
+
+
+@functools.lru_cache(maxsize=256)
+def _ajustar_tamano_titulo(titulo, ancho_max_texto, ruta_fuente):
     # Comenzar con el tamaño ideal de 158.52pt y reducir hasta máximo 2 líneas
     tamano_pt_inicial = 158.52
     tamano_pt_minimo = 60.0   # Reducir tamaño mínimo para ser más agresivo
     paso_reduccion = 6.0      # Reducir de a 6pt cada vez para más precisión
     
+    tamanos_pt = []
     tamano_pt_actual = tamano_pt_inicial
-    lineas = []
-    fuente = None
+    while tamano_pt_actual >= tamano_pt_minimo:
+        tamanos_pt.append(tamano_pt_actual)
+        tamano_pt_actual -= paso_reduccion
     
-    print(f"🔍 Ajustando tamaño de fuente para título: '{titulo[:50]}{'...' if len(titulo) > 50 else ''}'")
+    logger.info(f"🔍 Ajustando tamaño de fuente para título: '{titulo[:50]}{'...' if len(titulo) > 50 else ''}'")
     
-    while tamano_pt_actual >= tamano_pt_minimo:
+    def dividir_con_tamano(tamano_pt):
         # Convertir puntos a píxeles (1 punto = 1/72 pulgadas, 1 pulgada = 96 píxeles)
-        tamano_fuente_px = int(tamano_pt_actual * 96 / 72)
-        fuente = obtener_fuente(tamano_fuente_px)
-        
-        # Dividir texto en líneas con el tamaño actual
+        tamano_px = int(tamano_pt * 96 / 72)
+        fuente = obtener_fuente(tamano_px)
         lineas = dividir_texto_en_lineas(titulo, fuente, ancho_max_texto)
-        
-        print(f"   • {tamano_pt_actual:.1f}pt ({tamano_fuente_px}px) → {len(lineas)} línea(s)")
-        
-        # Si conseguimos máximo 2 líneas, usar este tamaño
-        if len(lineas) <= 2:
-            print(f"✅ Tamaño óptimo encontrado: {tamano_pt_actual:.1f}pt con {len(lineas)} línea(s)")
-            break
-        
-        # Reducir tamaño y probar de nuevo
-        tamano_pt_actual -= paso_reduccion
+        logger.debug(f"   • {tamano_pt:.1f}pt ({tamano_px}px) → {len(lineas)} línea(s)")
+        return tamano_px, fuente, lineas
+    
+    # Búsqueda binaria del primer tamaño (el mayor) que deja máximo 2 líneas;
+    # el número de líneas solo puede bajar al reducir la fuente
+    resultados = {}
+    bajo, alto = 0, len(tamanos_pt) - 1
+    while bajo < alto:
+        medio = (bajo + alto) // 2
+        resultados[medio] = dividir_con_tamano(tamanos_pt[medio])
+        if len(resultados[medio][2]) <= 2:
+            alto = medio
+        else:
+            bajo = medio + 1
     
-    # Si llegamos al mínimo y aún son más de 2 líneas, forzar a máximo 2 líneas
-    if len(lineas) > 2:
-        print(f"⚠️ Título muy largo - forzando a máximo 2 líneas con {tamano_pt_actual:.1f}pt")
+    if bajo not in resultados:
+        resultados[bajo] = dividir_con_tamano(tamanos_pt[bajo])
+    
+    tamano_pt_actual = tamanos_pt[bajo]
+    tamano_fuente_px, fuente, lineas = resultados[bajo]
+    
+    if len(lineas) <= 2:
+        logger.info(f"✅ Tamaño óptimo encontrado: {tamano_pt_actual:.1f}pt con {len(lineas)} línea(s)")
+    else:
+        # Si llegamos al mínimo y aún son más de 2 líneas, forzar a máximo 2 líneas
+        logger.warning(f"⚠️ Título muy largo - forzando a máximo 2 líneas con {tamano_pt_actual:.1f}pt")
         
         # Estrategia de emergencia: dividir por la mitad aproximadamente
         palabras = titulo.split()
@@ -333,20 +1006,75 @@ def añadir_titulo(imagen, titulo, ancho=1920, alto=1080):
         
         if ancho1 <= ancho_max_texto and ancho2 <= ancho_max_texto:
             lineas = [linea1, linea2]
-            print(f"✅ División optimizada en 2 líneas: '{linea1}' | '{linea2}'")
+            logger.info(f"✅ División optimizada en 2 líneas: '{linea1}' | '{linea2}'")
         else:
             # Si aún no cabe, usar división automática básica
-            lineas = dividir_texto_en_lineas(titulo, fuente, ancho_max_texto)[:2]  # Forzar máximo 2
-            print(f"⚠️ Usando división básica con {len(lineas)} líneas")
+            lineas = lineas[:2]  # Forzar máximo 2
+            logger.warning(f"⚠️ Usando división básica con {len(lineas)} líneas")
     
-    # === VERIFICACIÓN FINAL DEL TAMAÑO DE FUENTE ===
-    if fuente is None:  # Fallback de seguridad
-        tamano_fuente_px = int(tamano_pt_minimo * 96 / 72)
-        fuente = obtener_fuente(tamano_fuente_px)
-        lineas = dividir_texto_en_lineas(titulo, fuente, ancho_max_texto)
-    else:
-        # Guardar el tamaño final en píxeles para usar más adelante
-        tamano_fuente_px = int(tamano_pt_actual * 96 / 72)
+    return tamano_pt_actual, tamano_fuente_px, tuple(lineas)
+
+
+@medir_etapa('title')
+def añadir_titulo(imagen, titulo, ancho=ANCHO_REFERENCIA, alto=ALTO_REFERENCIA):
+    """
+    Añade el título centrado con efectos de sombra profesionales según especificaciones MEJORADAS.
+    - Cursiva (Alliance No.2 Bold Italic o fuente cursiva del sistema)
+    - Sombra paralela: 85% opacidad (más opaca), 9px distancia, 24% extensión, 40px tamaño
+    - Sombra interior: 45% opacidad (más opaca), 30° ángulo, 8% tamaño, 0px distancia
+    - Sin contorno
+    - AJUSTE DINÁMICO: Reduce automáticamente el tamaño para evitar más de 2 líneas
+    
+    Args:
+        imagen (PIL.Image): Imagen base
+        titulo (str): Texto del título
+        ancho (int): Ancho de la imagen
+        alto (int): Alto de la imagen
+        
+    Returns:
+        PIL.Image: Imagen con título añadido
+    """
+    # Crear copia para no modificar original (opaca: las sombras se aplican
+    # pegando negro a través de su máscara, equivalente a alpha_composite)
+    img_con_titulo = imagen.convert('RGB')
+    
+    dibujar_titulo(
+        titulo, ancho, alto,
+        sombrear=lambda posicion, mascara: img_con_titulo.paste((0, 0, 0), posicion, mascara),
+        rellenar=lambda posicion, mascara: img_con_titulo.paste((255, 255, 255), posicion, mascara),
+    )
+    
+    return img_con_titulo
+
+
+def dibujar_titulo(titulo, ancho, alto, sombrear, rellenar):
+    """
+    Calcula la composición del título y la entrega como máscaras (modo L)
+    posicionadas, en el orden en que deben aplicarse: primero las sombras
+    (negras) y después el texto (blanco).
+    
+    Args:
+        titulo (str): Texto del título
+        ancho (int): Ancho del lienzo
+        alto (int): Alto del lienzo
+        sombrear (callable): (posición, máscara) → None, para cada capa de sombra
+        rellenar (callable): (posición, máscara) → None, para cada línea de texto
+    """
+    # Ancho máximo para el texto (85% del ancho del lienzo de referencia)
+    ancho_max_texto = int(ANCHO_REFERENCIA * 0.85)
+    
+    # Tamaños, distancias y desenfoques están en píxeles del lienzo de referencia
+    escala = escala_lienzo(ancho, alto)
+    
+    # === ALGORITMO DE AJUSTE DINÁMICO DE TAMAÑO ===
+    # Mayor tamaño (desde 158.52pt) que deja el título en máximo 2 líneas. Se
+    # decide en el lienzo de referencia para que todos los tamaños de un
+    # mismo thumbnail partan el título igual; en cada lienzo solo se escala
+    # la fuente (y con ella las posiciones)
+    tamano_pt_actual, _, lineas = ajustar_tamano_titulo(titulo, ancho_max_texto)
+    lineas = list(lineas)
+    tamano_fuente_px = int(tamano_pt_actual * escala * 96 / 72)
+    fuente = obtener_fuente(tamano_fuente_px)
     
     # Calcular altura total del bloque de texto
     bbox_linea = fuente.getbbox("Ay")
@@ -360,46 +1088,51 @@ def añadir_titulo(imagen, titulo, ancho=1920, alto=1080):
     else:
         y_inicial = int((alto - alto_total_texto) * 0.32)  # Dos líneas: más arriba para iconos
     
-    # === CREAR MÚLTIPLES CAPAS DE SOMBRAS PROFESIONALES ===
-    
-    # === SOMBRA PARALELA MEJORADA ===
+    # === RASTERIZAR CADA LÍNEA UNA SOLA VEZ ===
+    # Todas las capas (sombras y texto) se estampan a partir de esta máscara
+    lineas_colocadas = []
     y_actual = y_inicial
     for linea in lineas:
         bbox_actual = fuente.getbbox(linea)
         ancho_linea = bbox_actual[2] - bbox_actual[0]
         x = (ancho - ancho_linea) // 2
-        
+        mascara, (dx_mascara, dy_mascara) = mascara_texto(fuente, linea)
+        lineas_colocadas.append((linea, x, y_actual, mascara, dx_mascara, dy_mascara))
+        y_actual += alto_linea + espaciado_lineas
+    
+    # === CREAR MÚLTIPLES CAPAS DE SOMBRAS PROFESIONALES ===
+    
+    # === SOMBRA PARALELA MEJORADA ===
+    for linea, x, y_actual, mascara, dx_mascara, dy_mascara in lineas_colocadas:
         # Especificaciones MEJORADAS: 85% opacidad (más opaca), 9px distancia, 40px blur
         opacidad_paralela = int(255 * 0.85)  # ≈ 217 (más opaca que antes)
         
         # Crear múltiples capas de sombra para mayor profundidad
         for desplazamiento in [12, 9, 6]:  # Múltiples sombras con diferentes desplazamientos
-            temp_sombra = Image.new('RGBA', (ancho, alto), (0, 0, 0, 0))
-            draw_sombra = ImageDraw.Draw(temp_sombra)
-            
             # Opacidad decreciente para cada capa
             opacidad_capa = int(opacidad_paralela * (desplazamiento / 12))
             
-            # Dibujar sombra con desplazamiento
-            draw_sombra.text((x + desplazamiento, y_actual + desplazamiento), linea, 
-                           font=fuente, fill=(0, 0, 0, opacidad_capa))
+            # Blur más intenso para capas más lejanas
+            blur_nivel = int(40 * (desplazamiento / 12) * escala)
             
-            # Aplicar diferentes niveles de blur
-            blur_nivel = int(40 * (desplazamiento / 12))  # Blur más intenso para capas más lejanas
+            # Capa (solo alpha) limitada a la caja de la línea + margen del blur
+            distancia = round(desplazamiento * escala)
+            posicion_sombra = (x + distancia, y_actual + distancia)
+            x0, y0, x1, y1 = region_efecto_texto(fuente, linea, [posicion_sombra], blur_nivel, ancho, alto)
+            temp_sombra = Image.new('L', (x1 - x0, y1 - y0), 0)
+            
+            # Estampar la máscara con desplazamiento
+            temp_sombra.paste(opacidad_capa,
+                              (posicion_sombra[0] - x0 + dx_mascara, posicion_sombra[1] - y0 + dy_mascara), mascara)
+            
+            # Aplicar diferentes niveles de blur (una banda en lugar de cuatro)
             temp_sombra = temp_sombra.filter(ImageFilter.GaussianBlur(radius=blur_nivel))
             
-            # Combinar con la imagen
-            img_con_titulo = Image.alpha_composite(img_con_titulo, temp_sombra)
-        
-        y_actual += alto_linea + espaciado_lineas
+            # Combinar (negro a través del alpha) solo en la región afectada
+            sombrear((x0, y0), temp_sombra)
     
     # === SOMBRA INTERIOR IMPLEMENTADA CORRECTAMENTE ===
-    y_actual = y_inicial
-    for linea in lineas:
-        bbox_actual = fuente.getbbox(linea)
-        ancho_linea = bbox_actual[2] - bbox_actual[0]
-        x = (ancho - ancho_linea) // 2
-        
+    for linea, x, y_actual, mascara, dx_mascara, dy_mascara in lineas_colocadas:
         # Especificaciones MEJORADAS: 45% opacidad (más opaca), 30° ángulo, 8% tamaño
         opacidad_interior = int(255 * 0.45)  # ≈ 115 (más opaca que antes)
         
@@ -412,99 +1145,363 @@ def añadir_titulo(imagen, titulo, ancho=1920, alto=1080):
         dy_interior = -int(tamano_sombra_interior * math.sin(angulo_rad))  # Negativo para ir hacia arriba
         
         # CREAR SOMBRA INTERIOR REALISTA
-        # La sombra interior se simula dibujando una versión más oscura del texto
+        # La sombra interior se simula estampando una versión más oscura del texto
         # ligeramente desplazada DENTRO del contorno del texto principal
         
-        # Crear máscara del texto principal
-        temp_mascara = Image.new('RGBA', (ancho, alto), (0, 0, 0, 0))
-        draw_mascara = ImageDraw.Draw(temp_mascara)
-        draw_mascara.text((x, y_actual), linea, font=fuente, fill=(255, 255, 255, 255))
-        
-        # Crear sombra interior
-        temp_sombra_interior = Image.new('RGBA', (ancho, alto), (0, 0, 0, 0))
-        draw_interior = ImageDraw.Draw(temp_sombra_interior)
-        
-        # Dibujar múltiples capas de sombra interior para mayor realismo
+        # Posiciones de las capas de sombra interior (intensidad decreciente)
+        capas_interiores = []
         for intensidad in [1.0, 0.7, 0.4]:
             alpha_interior = int(opacidad_interior * intensidad)
             desplaz_x = int(dx_interior * intensidad)
             desplaz_y = int(dy_interior * intensidad)
-            
-            draw_interior.text((x + desplaz_x, y_actual + desplaz_y), linea, 
-                             font=fuente, fill=(0, 0, 0, alpha_interior))
+            capas_interiores.append(((x + desplaz_x, y_actual + desplaz_y), alpha_interior))
         
-        # Aplicar ligero blur para suavizar la sombra interior
-        temp_sombra_interior = temp_sombra_interior.filter(ImageFilter.GaussianBlur(radius=2))
+        # Región del texto y de la sombra interior (blur de radio 2)
+        radio_interior = 2 * escala
+        x0, y0, x1, y1 = region_efecto_texto(
+            fuente, linea, [(x, y_actual)] + [pos for pos, _ in capas_interiores], radio_interior, ancho, alto
+        )
         
-        # Combinar sombra interior
-        img_con_titulo = Image.alpha_composite(img_con_titulo, temp_sombra_interior)
+        # Crear sombra interior (solo alpha)
+        temp_sombra_interior = Image.new('L', (x1 - x0, y1 - y0), 0)
         
-        y_actual += alto_linea + espaciado_lineas
+        # Estampar múltiples capas de sombra interior para mayor realismo
+        for (pos_x, pos_y), alpha_interior in capas_interiores:
+            temp_sombra_interior.paste(alpha_interior,
+                                       (pos_x - x0 + dx_mascara, pos_y - y0 + dy_mascara), mascara)
+        
+        # Aplicar ligero blur para suavizar la sombra interior
+        temp_sombra_interior = temp_sombra_interior.filter(ImageFilter.GaussianBlur(radius=radio_interior))
+        
+        # Combinar sombra interior solo en la región afectada
+        sombrear((x0, y0), temp_sombra_interior)
     
     # === TEXTO PRINCIPAL EN CURSIVA ===
-    draw_final = ImageDraw.Draw(img_con_titulo)
-    y_actual = y_inicial
+    for linea, x, y_actual, mascara, dx_mascara, dy_mascara in lineas_colocadas:
+        # Blanco puro sin contorno, en cursiva (la fuente ya debe ser cursiva)
+        rellenar((x + dx_mascara, y_actual + dy_mascara), mascara)
+
+
+def crear_capa_titulo(titulo, ancho=ANCHO_REFERENCIA, alto=ALTO_REFERENCIA):
+    """
+    Título con sus sombras sobre una capa transparente (para la exportación
+    por capas), con la misma composición que añadir_titulo.
+    
+    Las sombras negras se acumulan como fracción de luz que dejan pasar
+    (igual que en la fila de iconos) y el texto blanco se compone encima.
+    
+    Args:
+        titulo (str): Texto del título
+        ancho (int): Ancho del lienzo
+        alto (int): Alto del lienzo
+        
+    Returns:
+        tuple: (capa RGBA recortada a su contenido, posición (x, y)), o None
+            si no hay nada que dibujar
+    """
+    transmision = Image.new('L', (ancho, alto), 255)
+    texto = Image.new('L', (ancho, alto), 0)
+    dibujar_titulo(
+        titulo, ancho, alto,
+        sombrear=lambda posicion, mascara: transmision.paste(0, posicion, mascara),
+        rellenar=lambda posicion, mascara: texto.paste(255, posicion, mascara),
+    )
+    
+    capa = Image.new('RGBA', (ancho, alto), (0, 0, 0, 0))
+    capa.putalpha(ImageChops.invert(transmision))
+    relleno = Image.new('RGBA', (ancho, alto), (255, 255, 255, 0))
+    relleno.putalpha(texto)
+    capa.alpha_composite(relleno)
+    
+    caja = capa.getbbox()
+    if caja is None:
+        return None
+    return capa.crop(caja), caja[:2]
+
+
+# Ancho máximo de cada icono: 20% del ancho del lienzo de referencia
+ANCHO_MAX_ICONO = int(ANCHO_REFERENCIA * 0.20)
+
+# Clave de texto PNG con la que normalizar_icono marca sus derivados (su
+# valor es el ancho de preparación para el que se redujeron, no su tamaño)
+MARCA_ICONO_NORMALIZADO = 'auto_thumbnail_icono'
+
+
+def ancho_preparacion_iconos(ancho):
+    """
+    Ancho al que se preparan los iconos para un lienzo: el 20% de su ancho,
+    pero nunca menos que ANCHO_MAX_ICONO. Así todos los lienzos hasta el de
+    referencia comparten la misma versión preparada (y el derivado
+    normalizado de las subidas), que cada uno reduce a su tamaño.
+    
+    Args:
+        ancho (int): Ancho del lienzo
+        
+    Returns:
+        int: Ancho máximo por icono
+    """
+    return max(ANCHO_MAX_ICONO, int(ancho * 0.20))
+
+
+def preparar_icono(icono, ancho_max_por_icono):
+    """
+    Descarga/carga un icono y lo convierte a RGBA, reducido al decodificar
+    (el redimensionado fino a su tamaño final lo hace obtener_sprite_icono).
+    
+    Args:
+        icono (str | bytes | PIL.Image): URL, ruta, contenido o imagen del icono
+        ancho_max_por_icono (int): Ancho máximo por icono
+        
+    Returns:
+        PIL.Image: Icono procesado
+    """
+    return preparar_icono_con_hash(icono, ancho_max_por_icono)[1]
+
+
+def preparar_icono_con_hash(icono, ancho_max_por_icono):
+    """
+    Prepara un icono a partir de su contenido, reutilizando la versión ya
+    procesada si el mismo contenido se preparó antes con el mismo tamaño.
+    
+    Args:
+        icono (str | bytes | PIL.Image): URL, ruta, contenido o imagen del icono
+        ancho_max_por_icono (int): Ancho máximo por icono
+        
+    Returns:
+        tuple: (hash del contenido, icono procesado compartido)
+    """
+    hash_icono, contenido = leer_entrada(icono)
+    clave = (hash_icono, ancho_max_por_icono)
+    
+    icono_redimensionado = CACHE_ICONOS.obtener(clave)
+    if icono_redimensionado is None:
+        icono_redimensionado = _preparar_icono(contenido, ancho_max_por_icono)
+        CACHE_ICONOS.guardar(clave, icono_redimensionado)
+    
+    return hash_icono, icono_redimensionado
+
+
+def normalizar_icono(icono, ancho_max_por_icono=ANCHO_MAX_ICONO):
+    """
+    Versión normalizada de un icono para guardarla junto al original: RGBA
+    y reducida al decodificar para ancho_max_por_icono, igual que la
+    prepara _preparar_icono. La reducción al decodificar es entera, así que
+    puede quedar hasta ~2× mayor que ese ancho: el tamaño final lo fija cada
+    sprite, con un único redimensionado.
+    
+    Args:
+        icono (str | bytes | PIL.Image): URL, ruta, contenido o imagen del icono
+        ancho_max_por_icono (int): Ancho máximo por icono
+        
+    Returns:
+        bytes: PNG RGBA
+    """
+    # Se marca con el ancho de preparación para que _preparar_icono la use
+    # tal cual cuando se prepare para ese mismo ancho
+    metadatos = PngImagePlugin.PngInfo()
+    metadatos.add_text(MARCA_ICONO_NORMALIZADO, str(ancho_max_por_icono))
+    
+    buffer = BytesIO()
+    icono_normalizado = _preparar_icono(leer_entrada(icono)[1], ancho_max_por_icono)
+    icono_normalizado.save(buffer, 'PNG', compress_level=1, pnginfo=metadatos)
+    return buffer.getvalue()
+
+
+def _preparar_icono(contenido, ancho_max_por_icono):
+    # Sin medir_etapa propia: la decodificación ya se mide como 'decode' y la
+    # etapa 'icons' es preparar_capa_iconos (una muestra por render)
+    # Decodificar icono (reducido ya al decodificar si es enorme)
+    icono = abrir_entrada(
+        contenido, (ancho_max_por_icono, ancho_max_por_icono), ajuste='contener'
+    )
+    
+    # Derivado de normalizar_icono para el mismo ancho: ya está preparado
+    if icono.info.get(MARCA_ICONO_NORMALIZADO) == str(ancho_max_por_icono):
+        return icono.convert('RGBA') if icono.mode not in ('RGBA', 'LA') else icono.copy()
+    
+    # Convertir a RGBA para preservar transparencia
+    if icono.mode not in ['RGBA', 'LA']:
+        if icono.mode == 'P' and 'transparency' in icono.info:
+            icono = icono.convert('RGBA')
+        else:
+            icono = icono.convert('RGBA')
+    
+    # Sin LANCZOS aquí: la reducción entera al decodificar ya lo deja cerca
+    # del tamaño máximo, y el sprite lo redimensiona una sola vez al tamaño
+    # de cada lienzo
+    return icono
+
+
+def iniciar_descarga_iconos(lista_iconos, ancho_max_por_icono):
+    """
+    Lanza en el pool de descargas la preparación de todos los iconos.
+    
+    Args:
+        lista_iconos (list): Lista de URLs/rutas de iconos (o bytes / PIL.Image)
+        ancho_max_por_icono (int): Ancho máximo por icono
+        
+    Returns:
+        list: Lista de pares (descripción, future) en el orden original
+    """
+    pool = obtener_pool_descargas()
+    return [
+        (describir_entrada(icono), pool.submit(preparar_icono_con_hash, icono, ancho_max_por_icono))
+        for icono in lista_iconos
+    ]
+
+
+def recoger_iconos(descargas, timeout=TIMEOUT_DESCARGA):
+    """
+    Espera a las descargas de iconos y descarta las que fallen.
+    
+    Args:
+        descargas (list): Pares (descripción, future) de iniciar_descarga_iconos
+        timeout (float): Espera máxima en segundos para todos los iconos a la
+            vez (se descargan en paralelo, así que no se acumula por icono)
+        
+    Returns:
+        list: Lista de pares (hash del contenido, icono procesado)
+    """
+    iconos_procesados = []
+    limite = time.monotonic() + timeout
+    
+    for i, (icono_path, futuro) in enumerate(descargas, 1):
+        try:
+            iconos_procesados.append(futuro.result(timeout=max(0, limite - time.monotonic())))
+        except Exception as e:
+            futuro.cancel()
+            logger.warning(f"\n⚠️  Error procesando icono {i}: {icono_path}\n"
+                           f"   Error: {e or type(e).__name__}\n"
+                           "   Continuando sin este icono...")
+            continue
+    
+    return iconos_procesados
+
+
+def procesar_iconos(lista_iconos, ancho_max_por_icono):
+    """
+    Descarga y procesa los iconos redimensionándolos.
+    
+    Los iconos se descargan y decodifican en paralelo; un icono que falla
+    se omite sin abortar el resto.
+    
+    Args:
+        lista_iconos (list): Lista de URLs/rutas de iconos
+        ancho_max_por_icono (int): Ancho máximo por icono
+        
+    Returns:
+        list: Lista de imágenes PIL procesadas
+    """
+    descargas = iniciar_descarga_iconos(lista_iconos, ancho_max_por_icono)
+    return [icono for _, icono in recoger_iconos(descargas)]
+
+
+def crear_sombra_icono(icono, opacidad):
+    """
+    Crea la silueta de sombra de un icono a partir de su canal alpha.
+
+    La opacidad se aplica en una única operación sobre la banda alpha
+    (tabla de 256 entradas) en lugar de recorrer el icono píxel a píxel.
+    La sombra es negra, así que basta con su alpha: el color se aplica al
+    componerla.
+
+    Args:
+        icono (PIL.Image): Icono en modo RGBA
+        opacidad (float): Opacidad máxima de la sombra (0-255)
+
+    Returns:
+        PIL.Image: Alpha de la sombra (modo L) del mismo tamaño que el icono
+    """
+    return icono.getchannel('A').point(lambda a: int(opacidad * (a / 255)))
+
+
+def parametros_sombra_icono(escala=1.0):
+    """
+    Capas de la sombra paralela de los iconos para un lienzo.
+    Especificaciones MEJORADAS: 85% opacidad (más opaca), 9px distancia, 40px blur
     
-    for linea in lineas:
-        bbox_actual = fuente.getbbox(linea)
-        ancho_linea = bbox_actual[2] - bbox_actual[0]
-        x = (ancho - ancho_linea) // 2
-        
-        # Blanco puro sin contorno, en cursiva (la fuente ya debe ser cursiva)
-        draw_final.text((x, y_actual), linea, font=fuente, fill=(255, 255, 255, 255))
+    Args:
+        escala (float): Escala del lienzo respecto al de referencia
         
-        y_actual += alto_linea + espaciado_lineas
-    
-    return img_con_titulo.convert('RGB')
+    Returns:
+        tuple: Capas (distancia, radio de blur, opacidad), de la más lejana a
+            la más cercana
+    """
+    opacidad_sombra = int(255 * 0.85)  # ≈ 217 (más opaca que antes)
+    
+    # Múltiples sombras con diferentes desplazamientos para mayor profundidad;
+    # blur más intenso para capas más lejanas
+    return tuple(
+        (round(desplazamiento * escala),
+         int(40 * (desplazamiento / 12) * escala),
+         opacidad_sombra * (desplazamiento / 12))
+        for desplazamiento in (12, 9, 6)
+    )
 
 
-def procesar_iconos(lista_iconos, ancho_max_por_icono):
+def crear_sprite_icono(icono, tamano, sombras):
     """
-    Descarga y procesa los iconos redimensionándolos.
+    Redimensiona el icono a su tamaño final y desenfoca su sombra compuesta
+    sobre un lienzo propio, con margen suficiente para que el blur no llegue
+    a los bordes.
     
     Args:
-        lista_iconos (list): Lista de URLs/rutas de iconos
-        ancho_max_por_icono (int): Ancho máximo por icono
+        icono (PIL.Image): Icono preparado (RGBA o LA)
+        tamano (tuple): (ancho, alto) final del icono
+        sombras (tuple): Capas de parametros_sombra_icono
         
     Returns:
-        list: Lista de imágenes PIL procesadas
+        tuple: (icono RGBA, alpha de la sombra (modo L), posición (dx, dy) de
+            la sombra respecto al icono)
     """
-    iconos_procesados = []
-    
-    for i, icono_path in enumerate(lista_iconos, 1):
-        try:
-            # Descargar/cargar icono
-            icono = descargar_imagen(icono_path)
-            
-            # Convertir a RGBA para preservar transparencia
-            if icono.mode not in ['RGBA', 'LA']:
-                if icono.mode == 'P' and 'transparency' in icono.info:
-                    icono = icono.convert('RGBA')
-                else:
-                    icono = icono.convert('RGBA')
-            
-            # Redimensionar manteniendo aspecto
-            ratio = icono.width / icono.height
-            if icono.width > icono.height:
-                nuevo_ancho = min(ancho_max_por_icono, icono.width)
-                nuevo_alto = int(nuevo_ancho / ratio)
-            else:
-                nuevo_alto = min(ancho_max_por_icono, icono.height)
-                nuevo_ancho = int(nuevo_alto * ratio)
-            
-            icono_redimensionado = icono.resize((nuevo_ancho, nuevo_alto), Image.Resampling.LANCZOS)
-            iconos_procesados.append(icono_redimensionado)
-            
-        except Exception as e:
-            print(f"\n⚠️  Error procesando icono {i}: {icono_path}")
-            print(f"   Error: {e}")
-            print("   Continuando sin este icono...")
-            continue
+    icono = icono.convert('RGBA') if icono.mode != 'RGBA' else icono
+    if icono.size != tamano:
+        icono = icono.resize(tamano, Image.Resampling.LANCZOS)
+    
+    margen = max(math.ceil(3 * blur) + 2 for _, blur, _ in sombras)
+    distancia_max = max(distancia for distancia, _, _ in sombras)
+    tamano_sombra = (icono.width + distancia_max + 2 * margen,
+                     icono.height + distancia_max + 2 * margen)
+    
+    # Igual que en la fila: se acumula la luz que deja pasar cada capa
+    transmision = Image.new('L', tamano_sombra, 255)
+    for distancia, blur, opacidad in sombras:
+        capa_sombra = Image.new('L', tamano_sombra, 0)
+        capa_sombra.paste(crear_sombra_icono(icono, opacidad), (margen + distancia, margen + distancia))
+        capa_sombra = capa_sombra.filter(ImageFilter.GaussianBlur(radius=blur))
+        transmision.paste(0, (0, 0), capa_sombra)
+    
+    return icono, ImageChops.invert(transmision), (-margen, -margen)
+
+
+def obtener_sprite_icono(hash_icono, icono, tamano, sombras, ancho_max_por_icono=None):
+    """
+    Sprite de un icono (ver crear_sprite_icono), reutilizado entre renders
+    con el mismo contenido, preparación, tamaño y sombra.
     
-    return iconos_procesados
+    Args:
+        hash_icono (str): Hash del contenido del icono, o None para no cachear
+        icono (PIL.Image): Icono preparado
+        tamano (tuple): (ancho, alto) final del icono
+        sombras (tuple): Capas de parametros_sombra_icono
+        ancho_max_por_icono (int): Ancho con el que se preparó el icono (el
+            mismo contenido preparado para otro ancho da otros píxeles)
+        
+    Returns:
+        tuple: Ver crear_sprite_icono (compartido, no debe modificarse)
+    """
+    if hash_icono is None:
+        return crear_sprite_icono(icono, tamano, sombras)
+    
+    clave = (hash_icono, ancho_max_por_icono, tamano, sombras)
+    sprite = CACHE_SPRITES_ICONOS.obtener(clave)
+    if sprite is None:
+        sprite = crear_sprite_icono(icono, tamano, sombras)
+        CACHE_SPRITES_ICONOS.guardar(clave, sprite)
+    return sprite
 
 
-def añadir_iconos(imagen, iconos, ancho=1920, alto=1080):
+def añadir_iconos(imagen, iconos, ancho=ANCHO_REFERENCIA, alto=ALTO_REFERENCIA):
     """
     Añade los iconos en fila horizontal centrada con sombra paralela profesional MEJORADA.
     - Sombra paralela: 85% opacidad (más opaca), 9px distancia, 24% extensión, 40px tamaño
@@ -521,7 +1518,57 @@ def añadir_iconos(imagen, iconos, ancho=1920, alto=1080):
     if not iconos:
         return imagen
     
-    img_final = imagen.copy().convert('RGBA')
+    return componer_capa_iconos(imagen, preparar_capa_iconos(iconos, ancho, alto))
+
+
+def componer_capa_iconos(imagen, capa_iconos):
+    """
+    Compone sobre la imagen una capa de iconos creada con preparar_capa_iconos.
+    
+    Args:
+        imagen (PIL.Image): Imagen con título
+        capa_iconos (tuple): Ver preparar_capa_iconos (None si no hay iconos)
+        
+    Returns:
+        PIL.Image: Imagen final con iconos
+    """
+    if capa_iconos is None:
+        return imagen
+    
+    capa, posicion = capa_iconos[:2]
+    img_final = imagen.convert('RGBA')
+    img_final.alpha_composite(capa, dest=posicion)
+    
+    return img_final.convert('RGB')
+
+
+@medir_etapa('icons')
+def preparar_capa_iconos(iconos, ancho=ANCHO_REFERENCIA, alto=ALTO_REFERENCIA, hashes=None,
+                         ancho_max_por_icono=None):
+    """
+    Crea la fila de iconos con sus sombras sobre una capa transparente,
+    independiente del fondo y del título para poder reutilizarla entre renders.
+    
+    Args:
+        iconos (list): Lista de imágenes PIL de iconos
+        ancho (int): Ancho de la imagen
+        alto (int): Alto de la imagen
+        hashes (list): Hash del contenido de cada icono; si se indica, los
+            sprites (icono redimensionado y sombra) se reutilizan entre renders
+        ancho_max_por_icono (int): Ancho con el que se prepararon los iconos
+            (forma parte de la clave de los sprites)
+        
+    Returns:
+        tuple: (capa RGBA recortada a su contenido, posición (x, y) en el
+            canvas, iconos colocados), o None si no hay nada que dibujar.
+            Cada icono colocado es (icono RGBA, (x, y), alpha de su sombra,
+            (x, y) de la sombra), para exportarlos por separado.
+    """
+    if not iconos:
+        return None
+    
+    # Límites, márgenes y sombras están en píxeles del lienzo de referencia
+    escala = escala_lienzo(ancho, alto)
     
     # Calcular tamaño óptimo para iconos basado en la cantidad - ICONOS MÁS GRANDES
     if len(iconos) == 1:
@@ -532,27 +1579,26 @@ def añadir_iconos(imagen, iconos, ancho=1920, alto=1080):
         tamano_max_icono = int(ancho * 0.10)  # 4+ iconos también más grandes
     
     # Asegurar tamaño mínimo y máximo - rangos más amplios
-    tamano_max_icono = max(100, min(tamano_max_icono, 250))
+    tamano_max_icono = max(int(100 * escala), min(tamano_max_icono, int(250 * escala)))
     
-    # Redimensionar iconos a tamaño consistente
-    iconos_redimensionados = []
-    for icono in iconos:
+    # Sprites: icono a tamaño consistente y su sombra ya desenfocada
+    sombras = parametros_sombra_icono(escala)
+    sprites = []
+    for hash_icono, icono in zip(hashes or [None] * len(iconos), iconos):
         # Calcular nuevo tamaño manteniendo aspecto
         ratio = min(tamano_max_icono / icono.width, tamano_max_icono / icono.height)
-        nuevo_ancho = int(icono.width * ratio)
-        nuevo_alto = int(icono.height * ratio)
-        
-        icono_redim = icono.resize((nuevo_ancho, nuevo_alto), Image.Resampling.LANCZOS)
-        iconos_redimensionados.append(icono_redim)
+        tamano = (max(1, int(icono.width * ratio)), max(1, int(icono.height * ratio)))
+        sprites.append(obtener_sprite_icono(hash_icono, icono, tamano, sombras, ancho_max_por_icono))
+    iconos_redimensionados = [icono for icono, _, _ in sprites]
     
     # Calcular espaciado dinámico
-    espaciado_base = max(15, int(ancho * 0.015))
+    espaciado_base = max(round(15 * escala), int(ancho * 0.015))
     ancho_total_iconos = sum(icono.width for icono in iconos_redimensionados)
     ancho_total_con_espacios = ancho_total_iconos + (espaciado_base * (len(iconos_redimensionados) - 1))
     
     # Si no caben todos, reducir espaciado
     if ancho_total_con_espacios > ancho * 0.9:
-        espaciado = max(10, int((ancho * 0.9 - ancho_total_iconos) / (len(iconos_redimensionados) - 1)))
+        espaciado = max(round(10 * escala), int((ancho * 0.9 - ancho_total_iconos) / (len(iconos_redimensionados) - 1)))
         ancho_total_con_espacios = ancho_total_iconos + (espaciado * (len(iconos_redimensionados) - 1))
     else:
         espaciado = espaciado_base
@@ -563,174 +1609,783 @@ def añadir_iconos(imagen, iconos, ancho=1920, alto=1080):
     # Posición Y: 68% de la altura (ajustado para mejor proporción con texto dinámico)
     # Asegurar que los iconos quepan dentro del canvas
     alto_max_icono = max(icono.height for icono in iconos_redimensionados)
-    y_iconos = min(int(alto * 0.68), alto - alto_max_icono - 20)  # 20px de margen inferior
+    y_iconos = min(int(alto * 0.68), alto - alto_max_icono - round(20 * escala))  # 20px de margen inferior
     
-    # === CREAR SOMBRAS PARALELAS MEJORADAS PARA TODOS LOS ICONOS ===
+    # Posición de cada icono que cabe completamente dentro del canvas
+    colocados = []
     x_actual = x_inicial
-    for icono in iconos_redimensionados:
+    for icono, sombra, posicion_sombra in sprites:
         # Centrar verticalmente cada icono en la línea base
         y_centrado = y_iconos + (alto_max_icono - icono.height) // 2
         
-        # Verificar que el icono esté completamente dentro del canvas
         if x_actual + icono.width <= ancho and y_centrado + icono.height <= alto:
-            
-            # === SOMBRA PARALELA PROFESIONAL MEJORADA ===
-            # Especificaciones MEJORADAS: 85% opacidad (más opaca), 9px distancia, 40px blur
-            opacidad_sombra = int(255 * 0.85)  # ≈ 217 (más opaca que antes)
-            
-            # Crear múltiples capas de sombra para mayor profundidad
-            for desplazamiento in [12, 9, 6]:  # Múltiples sombras con diferentes desplazamientos
-                temp_sombra_icono = Image.new('RGBA', (ancho, alto), (0, 0, 0, 0))
-                
-                # Crear máscara de sombra usando el alpha del icono original
-                for y in range(icono.height):
-                    for x in range(icono.width):
-                        r, g, b, a = icono.getpixel((x, y))
-                        if a > 0:  # Solo donde hay contenido del icono
-                            # Posición con desplazamiento variable
-                            sombra_x = x_actual + x + desplazamiento
-                            sombra_y = y_centrado + y + desplazamiento
-                            
-                            # Verificar límites
-                            if 0 <= sombra_x < ancho and 0 <= sombra_y < alto:
-                                # Aplicar opacidad proporcional decreciente por capa
-                                alpha_capa = int(opacidad_sombra * (desplazamiento / 12) * (a / 255))
-                                temp_sombra_icono.putpixel((sombra_x, sombra_y), (0, 0, 0, alpha_capa))
-                
-                # Aplicar blur variable según la capa
-                blur_nivel = int(40 * (desplazamiento / 12))  # Blur más intenso para capas más lejanas
-                temp_sombra_icono = temp_sombra_icono.filter(ImageFilter.GaussianBlur(radius=blur_nivel))
-                
-                # Combinar con la imagen final
-                img_final = Image.alpha_composite(img_final, temp_sombra_icono)
+            colocados.append((icono, sombra, posicion_sombra, x_actual, y_centrado))
         
         # Avanzar posición X
         x_actual += icono.width + espaciado
     
+    # === SOMBRAS PARALELAS MEJORADAS PARA TODOS LOS ICONOS ===
+    # Las sombras son negras: se acumula solo la fracción de luz que dejan
+    # pasar (255 - alpha), pegando negro a través de cada sombra ya
+    # desenfocada (paste recorta fuera del canvas)
+    transmision = Image.new('L', (ancho, alto), 255)
+    for icono, sombra, (dx, dy), x, y in colocados:
+        transmision.paste(0, (x + dx, y + dy), sombra)
+    
+    # Color de las sombras aplicado una única vez
+    capa = Image.new('RGBA', (ancho, alto), (0, 0, 0, 0))
+    capa.putalpha(ImageChops.invert(transmision))
+    
     # === PEGAR ICONOS PRINCIPALES ===
-    x_actual = x_inicial
-    for icono in iconos_redimensionados:
-        # Centrar verticalmente cada icono en la línea base
-        y_centrado = y_iconos + (alto_max_icono - icono.height) // 2
+    for icono, sombra, posicion_sombra, x, y in colocados:
+        # Componer icono principal sobre su sombra
+        capa.alpha_composite(icono, dest=(x, y))
+    
+    # Recortar al área con contenido para componer solo esa región
+    caja = capa.getbbox()
+    if caja is None:
+        return None
+    
+    iconos_colocados = tuple(
+        (icono, (x, y), sombra, (x + dx, y + dy)) for icono, sombra, (dx, dy), x, y in colocados
+    )
+    return capa.crop(caja), caja[:2], iconos_colocados
+
+
+def capas_thumbnail(img_fondo, titulo, capa_iconos):
+    """
+    Separa el render en capas posicionadas para la exportación por capas.
+    
+    El título (con sus sombras) y las sombras de los iconos van en capas
+    transparentes, y cada icono en la suya, de modo que pueden ocultarse o
+    moverse por separado. Superponer las capas en orden reproduce la imagen
+    final (salvo redondeos de pocos niveles por canal en las sombras del
+    título).
+    
+    Args:
+        img_fondo (PIL.Image): Fondo desenfocado
+        titulo (str): Texto del título
+        capa_iconos (tuple): Ver preparar_capa_iconos, o None
         
-        # Verificar que el icono esté completamente dentro del canvas
-        if x_actual + icono.width <= ancho and y_centrado + icono.height <= alto:
-            # Pegar icono principal
-            img_final.paste(icono, (x_actual, y_centrado), icono)
+    Returns:
+        list: Tuplas (nombre, imagen, (x, y)) de abajo arriba
+    """
+    ancho, alto = img_fondo.size
+    capas = [('Fondo', img_fondo, (0, 0))]
+    
+    capa_titulo = crear_capa_titulo(titulo, ancho, alto)
+    if capa_titulo is not None:
+        capas.append(('Título', *capa_titulo))
+    
+    if capa_iconos is not None:
+        iconos_colocados = capa_iconos[2]
         
-        # Avanzar posición X
-        x_actual += icono.width + espaciado
+        # Sombras de todos los iconos (se solapan entre sí) en una sola capa
+        transmision = Image.new('L', (ancho, alto), 255)
+        for _, _, sombra, posicion_sombra in iconos_colocados:
+            transmision.paste(0, posicion_sombra, sombra)
+        sombras = Image.new('RGBA', (ancho, alto), (0, 0, 0, 0))
+        sombras.putalpha(ImageChops.invert(transmision))
+        caja = sombras.getbbox()
+        if caja is not None:
+            capas.append(('Sombras de iconos', sombras.crop(caja), caja[:2]))
+        
+        for numero, (icono, posicion, _, _) in enumerate(iconos_colocados, 1):
+            capas.append((f'Icono {numero}', icono, posicion))
     
-    return img_final.convert('RGB')
+    return capas
+
+
+def escribir_atomico(ruta, datos):
+    """Escribe un fichero de forma atómica: nunca queda un fichero a medias."""
+    ruta_temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(ruta_temporal, 'wb') as f:
+        f.write(datos)
+    os.replace(ruta_temporal, ruta)
+
 
+_pool_exportacion = None
+_exportaciones_pendientes = set()
+_lock_exportacion = threading.Lock()
 
-def guardar_como_psd_simulado(imagen_fondo, imagen_con_titulo, iconos, titulo, ruta_salida):
+
+def obtener_pool_exportacion():
+    """Hilo compartido para las exportaciones por capas diferidas."""
+    global _pool_exportacion
+    with _lock_exportacion:
+        if _pool_exportacion is None:
+            _pool_exportacion = ThreadPoolExecutor(max_workers=1, thread_name_prefix='capas')
+        return _pool_exportacion
+
+
+def exportar_capas_en_segundo_plano(ruta_ora, capas, img_final):
     """
-    Simula guardado PSD creando capas separadas como PNG individuales.
-    Nota: psd-tools es principalmente para lectura. Para escritura real de PSD
-    se necesitarían librerías comerciales como Photoshop scripting.
+    Escribe el fichero OpenRaster en segundo plano, después de haber
+    guardado la imagen principal.
     
     Args:
-        imagen_fondo (PIL.Image): Capa de fondo
-        imagen_con_titulo (PIL.Image): Imagen con título
-        iconos (list): Lista de iconos
-        titulo (str): Texto del título
-        ruta_salida (str): Ruta base para guardar archivos
+        ruta_ora (str): Ruta del fichero .ora
+        capas (list | callable): Ver capas_thumbnail, o función sin
+            argumentos que las calcula (también en segundo plano)
+        img_final (PIL.Image): Imagen compuesta
+        
+    Returns:
+        concurrent.futures.Future: Se resuelve con la ruta escrita
+    """
+    def exportar():
+        lista_capas = capas() if callable(capas) else capas
+        escribir_atomico(ruta_ora, crear_openraster(lista_capas, img_final))
+        return ruta_ora
+    
+    futuro = obtener_pool_exportacion().submit(exportar)
+    with _lock_exportacion:
+        _exportaciones_pendientes.add(futuro)
+    futuro.add_done_callback(_exportacion_terminada)
+    return futuro
+
+
+def _exportacion_terminada(futuro):
+    with _lock_exportacion:
+        _exportaciones_pendientes.discard(futuro)
+    if futuro.exception() is not None:
+        logger.warning(f"\n⚠️  Error exportando capas: {futuro.exception()}")
+
+
+def esperar_exportaciones():
+    """Espera a que terminen las exportaciones por capas pendientes."""
+    with _lock_exportacion:
+        pendientes = list(_exportaciones_pendientes)
+    for futuro in pendientes:
+        try:
+            futuro.result()
+        except Exception:
+            pass  # Ya se informa en _exportacion_terminada
+
+
+def exportar_capas(imagen_base, titulo, iconos, fondo_rapido=False):
+    """
+    Renderiza en memoria y devuelve las capas como fichero OpenRaster.
+    
+    Tras un render con las mismas entradas, las cachés de etapas hacen que
+    solo se repita la composición del título.
+    
+    Args:
+        imagen_base (str | bytes | PIL.Image): Ruta, URL, contenido o imagen del fondo
+        titulo (str): Título a mostrar
+        iconos (list): Iconos como rutas, URLs, bytes o imágenes PIL
+        fondo_rapido (bool): Ver procesar_imagen_base
+        
+    Returns:
+        bytes: Contenido del fichero .ora
+    """
+    img_fondo, img_con_titulo, capa_iconos, img_final = renderizar_capas(
+        imagen_base, titulo, iconos, fondo_rapido
+    )
+    return crear_openraster(capas_thumbnail(img_fondo, titulo, capa_iconos), img_final)
+
+
+def obtener_capa_iconos(iconos_con_hash, ancho_max_por_icono, ancho=ANCHO_REFERENCIA, alto=ALTO_REFERENCIA):
+    """
+    Fila de iconos con sombras para un lienzo, reutilizada si los mismos
+    iconos, preparados para el mismo ancho, ya se compusieron para ese tamaño.
+    
+    Args:
+        iconos_con_hash (list): Pares (hash, icono preparado) de recoger_iconos
+        ancho_max_por_icono (int): Ancho con el que se prepararon los iconos
+            (el pasado a iniciar_descarga_iconos)
+        ancho (int): Ancho del lienzo
+        alto (int): Alto del lienzo
+        
+    Returns:
+        tuple: Ver preparar_capa_iconos (None si no hay iconos)
+    """
+    if not iconos_con_hash:
+        return None
+    
+    hashes = [hash_icono for hash_icono, _ in iconos_con_hash]
+    clave_capa = (tuple(hashes), ancho_max_por_icono, ancho, alto)
+    capa_iconos = CACHE_CAPAS_ICONOS.obtener(clave_capa)
+    if capa_iconos is None:
+        capa_iconos = preparar_capa_iconos(
+            [icono for _, icono in iconos_con_hash], ancho, alto, hashes, ancho_max_por_icono
+        )
+        CACHE_CAPAS_ICONOS.guardar(clave_capa, capa_iconos)
+    
+    return capa_iconos
+
+
+def renderizar_capas(imagen_base, titulo, iconos, fondo_rapido=False, progreso=None,
+                     ancho=ANCHO_REFERENCIA, alto=ALTO_REFERENCIA):
+    """
+    Ejecuta el pipeline completo en memoria y devuelve también las capas
+    intermedias (para la exportación por capas).
+    
+    Args:
+        imagen_base (str | bytes | PIL.Image): Ruta, URL, contenido o imagen del fondo
+        titulo (str): Título a mostrar
+        iconos (list): Iconos como rutas, URLs, bytes o imágenes PIL
+        fondo_rapido (bool): Ver procesar_imagen_base
+        progreso (callable): Función opcional (paso, descripción) que se
+            llama al empezar cada uno de los 4 pasos
+        ancho (int): Ancho del lienzo
+        alto (int): Alto del lienzo
+        
+    Returns:
+        tuple: (fondo, fondo con título, capa de iconos o None, imagen final)
+    """
+    if progreso is None:
+        progreso = lambda paso, descripcion: None
+    
+    # 1. Cargar y procesar imagen base (los iconos se descargan en paralelo)
+    progreso(1, "Descargando y procesando imagen base...")
+    ancho_iconos = ancho_preparacion_iconos(ancho)
+    descargas_iconos = iniciar_descarga_iconos(iconos, ancho_iconos)
+    img_fondo = obtener_fondo_procesado(imagen_base, ancho, alto, rapido=fondo_rapido)
+    
+    # 2. Añadir título con sombras
+    progreso(2, "Añadiendo título con efectos...")
+    img_con_titulo = añadir_titulo(img_fondo, titulo, ancho, alto)
+    
+    # 3. Procesar iconos (la fila con sombras se reutiliza si los iconos no cambian)
+    progreso(3, "Procesando iconos...")
+    capa_iconos = obtener_capa_iconos(recoger_iconos(descargas_iconos), ancho_iconos, ancho, alto)
+    
+    # 4. Añadir iconos
+    progreso(4, "Integrando iconos...")
+    img_final = componer_capa_iconos(img_con_titulo, capa_iconos)
+    
+    return img_fondo, img_con_titulo, capa_iconos, img_final
+
+
+def resolver_tamanos(tamanos=None):
     """
-    # Crear directorio para capas
-    directorio_capas = ruta_salida.replace('.psd', '_capas')
-    os.makedirs(directorio_capas, exist_ok=True)
+    Normaliza una lista de tamaños de lienzo.
     
-    print(f"Guardando capas simuladas en: {directorio_capas}")
+    Args:
+        tamanos (list | str): Nombres de VARIANTES ('720p', 'social'...),
+            cadenas 'ANCHOxALTO' o tuplas (ancho, alto); también una cadena
+            separada por comas. Por defecto, todas las VARIANTES.
+        
+    Returns:
+        list: Tamaños (ancho, alto) sin repetir, en el orden indicado
+        
+    Raises:
+        ValueError: Si algún tamaño no es válido
+    """
+    if tamanos is None:
+        return list(VARIANTES.values())
+    if isinstance(tamanos, str):
+        tamanos = [t.strip() for t in tamanos.split(',') if t.strip()]
+    
+    resultado = []
+    for original in tamanos:
+        tamano = original
+        if isinstance(tamano, str):
+            if tamano.lower() in VARIANTES:
+                tamano = VARIANTES[tamano.lower()]
+            else:
+                try:
+                    tamano = tuple(int(v) for v in tamano.lower().split('x'))
+                except ValueError:
+                    tamano = ()
+        if len(tamano) != 2 or not all(0 < v <= 8192 for v in tamano):
+            raise ValueError(
+                f"Tamaño no válido: {original} (usa ANCHOxALTO o uno de: {', '.join(VARIANTES)})"
+            )
+        tamano = (int(tamano[0]), int(tamano[1]))
+        if tamano not in resultado:
+            resultado.append(tamano)
+    
+    if not resultado:
+        raise ValueError("No se ha indicado ningún tamaño")
+    return resultado
+
+
+def renderizar_variantes(imagen_base, titulo, iconos, tamanos=None, fondo_rapido=False, formato=None,
+                         calidad=None, max_bytes=None, progreso=None):
+    """
+    Renderiza el mismo thumbnail en varios tamaños de lienzo.
     
-    # Guardar capa de fondo
-    imagen_fondo.save(os.path.join(directorio_capas, "01_fondo_desenfocado.png"))
+    Cada tamaño se rasteriza a su resolución nativa (el texto y las sombras
+    no se reescalan desde el de 1920x1080), pero el trabajo común se hace una
+    sola vez: las entradas se leen y decodifican una vez, los iconos se
+    preparan una vez para todos los lienzos y el desenfoque del fondo se
+    reutiliza entre lienzos con la misma proporción.
     
-    # Crear capa solo con texto (transparente)
-    capa_texto = Image.new('RGBA', imagen_fondo.size, (0, 0, 0, 0))
-    # Aquí se podría recrear solo el texto, por simplicidad guardamos referencia
-    with open(os.path.join(directorio_capas, "02_texto_info.txt"), 'w', encoding='utf-8') as f:
-        f.write(f"Título: {titulo}\n")
-        f.write("Posición: Centrado\n")
-        f.write("Color: #FFFFFF\n")
-        f.write("Sombras: Interior (negro 35%) y Exterior (negro 50%)\n")
+    Args:
+        imagen_base (str | bytes | PIL.Image): Ruta, URL, contenido o imagen del fondo
+        titulo (str): Título a mostrar
+        iconos (list): Iconos como rutas, URLs, bytes o imágenes PIL
+        tamanos (list): Ver resolver_tamanos (por defecto, todas las VARIANTES)
+        fondo_rapido (bool): Ver procesar_imagen_base
+        formato (str): Si se indica, cada variante se devuelve codificada
+        calidad (int): Ver codificar_thumbnail
+        max_bytes (int): Presupuesto de bytes de cada variante
+        progreso (callable): Función opcional (paso, descripción) que se
+            llama al empezar cada uno de los 3 pasos
+        
+    Returns:
+        OrderedDict: (ancho, alto) → imagen PIL (o bytes si hay formato),
+            en el orden de tamanos
+    """
+    if progreso is None:
+        progreso = lambda paso, descripcion: None
+    
+    tamanos = resolver_tamanos(tamanos)
+    if formato:
+        obtener_codificador(formato)  # Formato inválido → error antes de renderizar
+    
+    with medir_render(len(tamanos)):
+        # 1. Fondo: una decodificación y un desenfoque por proporción
+        progreso(1, "Descargando y procesando imagen base...")
+        ancho_iconos = ancho_preparacion_iconos(max(ancho for ancho, _ in tamanos))
+        descargas_iconos = iniciar_descarga_iconos(iconos, ancho_iconos)
+        fondos = obtener_fondos_variantes(imagen_base, tamanos, rapido=fondo_rapido)
+        
+        # 2. Iconos: preparados una vez, cada lienzo los reduce a su tamaño
+        progreso(2, "Procesando iconos...")
+        iconos_con_hash = recoger_iconos(descargas_iconos)
+        
+        # 3. Título e iconos a la resolución de cada lienzo
+        progreso(3, f"Componiendo {len(tamanos)} tamaño(s)...")
+        variantes = OrderedDict()
+        for ancho, alto in tamanos:
+            img_con_titulo = añadir_titulo(fondos[(ancho, alto)], titulo, ancho, alto)
+            img_final = componer_capa_iconos(img_con_titulo, obtener_capa_iconos(iconos_con_hash, ancho_iconos, ancho, alto))
+            if formato:
+                img_final = codificar_thumbnail(img_final, formato, calidad, max_bytes)
+            variantes[(ancho, alto)] = img_final
+    
+    return variantes
+
+
+def codificar_thumbnail(imagen, formato='png', calidad=None, max_bytes=None):
+    """
+    Codifica el thumbnail en memoria.
     
-    # Guardar iconos individuales
-    for i, icono in enumerate(iconos, 1):
-        icono.save(os.path.join(directorio_capas, f"03_icono_{i:02d}.png"))
+    Args:
+        imagen (PIL.Image): Thumbnail renderizado
+        formato (str): Codificador de output_encoders ('png', 'png-paleta',
+            'jpeg', 'webp')
+        calidad (int): Calidad 1-100 (formatos con pérdida / nº de colores)
+        max_bytes (int): Presupuesto de bytes: se busca la mayor calidad que
+            quepa (ver codificar_con_limite)
+        
+    Returns:
+        bytes: Imagen codificada
+    """
+    with medir_etapa('encode'):
+        datos = codificar(imagen, formato, calidad=calidad, max_bytes=max_bytes)
+    METRICAS.incrementar('thumbnail_output_bytes_total', len(datos), format=obtener_codificador(formato).nombre)
+    return datos
+
+
+def renderizar_thumbnail(imagen_base, titulo, iconos, fondo_rapido=False, formato=None,
+                         calidad=None, max_bytes=None, ancho=ANCHO_REFERENCIA, alto=ALTO_REFERENCIA):
+    """
+    Punto de entrada en memoria: no escribe nada en disco ni imprime progreso,
+    y los errores se propagan como excepciones.
     
-    print(f"Capas PSD simuladas guardadas en: {directorio_capas}")
+    Args:
+        imagen_base (str | bytes | PIL.Image): Ruta, URL, contenido o imagen del fondo
+        titulo (str): Título a mostrar
+        iconos (list): Iconos como rutas, URLs, bytes o imágenes PIL (los que
+            fallen se omiten)
+        fondo_rapido (bool): Ver procesar_imagen_base
+        formato (str): Si se indica ('png', 'jpeg', 'webp'...), devuelve los
+            bytes codificados en lugar de la imagen
+        calidad (int): Ver codificar_thumbnail
+        max_bytes (int): Ver codificar_thumbnail
+        ancho (int): Ancho del lienzo (para varios tamaños a la vez, ver
+            renderizar_variantes)
+        alto (int): Alto del lienzo
+        
+    Returns:
+        PIL.Image | bytes: Thumbnail de ancho x alto (o sus bytes codificados)
+    """
+    if formato:
+        obtener_codificador(formato)  # Formato inválido → error antes de renderizar
+    with medir_render():
+        img_final = renderizar_capas(imagen_base, titulo, iconos, fondo_rapido, ancho=ancho, alto=alto)[3]
+        if formato:
+            img_final = codificar_thumbnail(img_final, formato, calidad, max_bytes)
+    return img_final
 
 
-def generar_thumbnail(imagen_base, titulo, iconos, ruta_salida="thumbnail"):
+def generar_thumbnail(imagen_base, titulo, iconos, ruta_salida="thumbnail", fondo_rapido=False,
+                      formato='png', calidad=None, max_bytes=None, capas=False):
     """
     Función principal que genera el thumbnail completo.
     
     Args:
-        imagen_base (str): Ruta o URL de la imagen base
+        imagen_base (str | bytes | PIL.Image): Ruta o URL de la imagen base
+            (o su contenido en memoria)
         titulo (str): Título a mostrar
         iconos (list): Lista de rutas/URLs de iconos
-        ruta_salida (str): Nombre base para archivos de salida
+        ruta_salida (str): Nombre base para archivos de salida, o None para
+            no escribir nada en disco
+        fondo_rapido (bool): Desenfocar el fondo a resolución reducida
+            (ver procesar_imagen_base)
+        formato (str): Formato de salida ('png', 'png-paleta', 'jpeg', 'webp')
+        calidad (int): Calidad 1-100 de los formatos que la admiten
+        max_bytes (int): Presupuesto de bytes del fichero final (tamaño objetivo)
+        capas (bool): Exportar además <ruta_salida>.ora (OpenRaster) con las
+            capas separadas. Se escribe en segundo plano tras la imagen
+            principal (ver esperar_exportaciones).
+        
+    Returns:
+        PIL.Image: Thumbnail final, o None si falla (el error se registra y
+            no se propaga; renderizar_thumbnail sí lanza las excepciones)
+    """
+    try:
+        return _generar_thumbnail(imagen_base, titulo, iconos, ruta_salida, fondo_rapido,
+                                  formato, calidad, max_bytes, capas)
+    except Exception as e:
+        logger.error(f"\n❌ ERROR DURANTE LA GENERACIÓN:\n"
+                     f"   {str(e)}\n"
+                     "\n💡 CONSEJOS:\n"
+                     "   • Verifica que la imagen base sea válida\n"
+                     "   • Comprueba tu conexión a internet para URLs\n"
+                     "   • Asegúrate de tener permisos de escritura")
+        return None
+
+
+@medir_render()
+def _generar_thumbnail(imagen_base, titulo, iconos, ruta_salida, fondo_rapido, formato, calidad, max_bytes, capas):
+    # generar_thumbnail propagando los errores (para el modo por lotes)
+    codificador = obtener_codificador(formato)
+    logger.info("\n🚀 INICIANDO GENERACIÓN DE THUMBNAIL")
+    logger.info("═" * 60)
+    
+    pasos_totales = 4 if ruta_salida is None else 5
+    
+    # 1-4. Fondo, título e iconos
+    img_fondo, img_con_titulo, capa_iconos, img_final = renderizar_capas(
+        imagen_base, titulo, iconos, fondo_rapido,
+        progreso=lambda paso, descripcion: mostrar_progreso(paso, pasos_totales, descripcion)
+    )
+    
+    if ruta_salida is None:
+        logger.info("")
+        logger.info("✅ GENERACIÓN COMPLETADA CON ÉXITO (en memoria)")
+        return img_final
+    
+    # 5. Guardar resultados
+    mostrar_progreso(5, pasos_totales, "Guardando archivos...")
+    
+    # Guardar imagen final (escritura atómica: nunca queda un fichero a medias)
+    ruta_imagen = f"{ruta_salida}.{codificador.extension}"
+    datos = codificar_thumbnail(img_final, formato, calidad, max_bytes)
+    escribir_atomico(ruta_imagen, datos)
+    if max_bytes and len(datos) > max_bytes:
+        logger.warning(f"\n⚠️  No se alcanzó el tamaño objetivo: {len(datos) // 1024} KB > {max_bytes // 1024} KB")
+    
+    # Exportación por capas (opcional y diferida)
+    if capas:
+        exportar_capas_en_segundo_plano(
+            f"{ruta_salida}.ora",
+            functools.partial(capas_thumbnail, img_fondo, titulo, capa_iconos), img_final
+        )
+    
+    logger.info("")
+    logger.info("✅ GENERACIÓN COMPLETADA CON ÉXITO")
+    logger.info("╔" + "═" * 58 + "╗")
+    logger.info("║" + "📁 ARCHIVOS GENERADOS:".ljust(58) + "║")
+    logger.info("║" + f"   🖼️  {ruta_imagen}".ljust(58) + "║")
+    if capas:
+        logger.info("║" + f"   📂 {ruta_salida}.ora (capas, en segundo plano)".ljust(58) + "║")
+    logger.info("║" + " " * 58 + "║")
+    logger.info("║" + f"📊 ESTADÍSTICAS:".ljust(58) + "║")
+    logger.info("║" + f"   • Resolución: {ANCHO_REFERENCIA}x{ALTO_REFERENCIA} píxeles".ljust(58) + "║")
+    logger.info("║" + f"   • Líneas de texto: {len(dividir_texto_en_lineas(titulo, obtener_fuente(130), int(ANCHO_REFERENCIA * 0.85)))}".ljust(58) + "║")
+    logger.info("║" + f"   • Iconos: {len(iconos)}".ljust(58) + "║")
+    logger.info("║" + f"   • Tamaño archivo: ~{len(datos) // 1024} KB ({codificador.nombre})".ljust(58) + "║")
+    logger.info("╚" + "═" * 58 + "╝")
+    logger.info("")
+    logger.info("🎉 ¡Tu thumbnail está listo para usar!")
+    
+    return img_final
+
+
+def generar_variantes(imagen_base, titulo, iconos, ruta_salida="thumbnail", tamanos=None, fondo_rapido=False,
+                      formato='png', calidad=None, max_bytes=None):
     """
-    print("\n🚀 INICIANDO GENERACIÓN DE THUMBNAIL")
-    print("═" * 60)
+    Genera el thumbnail en varios tamaños (ver renderizar_variantes) y
+    guarda cada uno como <ruta_salida>_<ancho>x<alto>.<extensión>.
     
-    pasos_totales = 5
+    Args:
+        imagen_base (str | bytes | PIL.Image): Ruta o URL de la imagen base
+            (o su contenido en memoria)
+        titulo (str): Título a mostrar
+        iconos (list): Lista de rutas/URLs de iconos
+        ruta_salida (str): Nombre base para archivos de salida
+        tamanos (list): Ver resolver_tamanos (por defecto, todas las VARIANTES)
+        fondo_rapido (bool): Ver procesar_imagen_base
+        formato (str): Formato de salida ('png', 'png-paleta', 'jpeg', 'webp')
+        calidad (int): Calidad 1-100 de los formatos que la admiten
+        max_bytes (int): Presupuesto de bytes de cada fichero
+        
+    Returns:
+        OrderedDict: (ancho, alto) → ruta del fichero escrito
+    """
+    codificador = obtener_codificador(formato)
+    tamanos = resolver_tamanos(tamanos)
+    logger.info("\n🚀 INICIANDO GENERACIÓN DE VARIANTES")
+    logger.info("═" * 60)
     
     try:
-        # 1. Cargar y procesar imagen base
-        mostrar_progreso(1, pasos_totales, "Descargando y procesando imagen base...")
-        img_original = descargar_imagen(imagen_base)
-        img_fondo = procesar_imagen_base(img_original)
+        # 1-3. Fondo, iconos y composición de cada tamaño
+        variantes = renderizar_variantes(
+            imagen_base, titulo, iconos, tamanos, fondo_rapido, formato, calidad, max_bytes,
+            progreso=lambda paso, descripcion: mostrar_progreso(paso, 4, descripcion)
+        )
         
-        # 2. Añadir título con sombras
-        mostrar_progreso(2, pasos_totales, "Añadiendo título con efectos...")
-        img_con_titulo = añadir_titulo(img_fondo, titulo)
+        # 4. Guardar resultados
+        mostrar_progreso(4, 4, "Guardando archivos...")
+        rutas = OrderedDict()
+        for (ancho, alto), datos in variantes.items():
+            ruta_imagen = f"{ruta_salida}_{ancho}x{alto}.{codificador.extension}"
+            escribir_atomico(ruta_imagen, datos)
+            rutas[(ancho, alto)] = ruta_imagen
+            if max_bytes and len(datos) > max_bytes:
+                logger.warning(f"\n⚠️  {ruta_imagen}: no se alcanzó el tamaño objetivo "
+                      f"({len(datos) // 1024} KB > {max_bytes // 1024} KB)")
         
-        # 3. Procesar iconos
-        mostrar_progreso(3, pasos_totales, "Procesando iconos...")
-        ancho_max_icono = int(1920 * 0.20)  # 20% del ancho para iconos más grandes
-        iconos_procesados = procesar_iconos(iconos, ancho_max_icono)
+        logger.info("")
+        logger.info("✅ GENERACIÓN COMPLETADA CON ÉXITO")
+        logger.info("╔" + "═" * 58 + "╗")
+        logger.info("║" + "📁 ARCHIVOS GENERADOS:".ljust(58) + "║")
+        for (ancho, alto), ruta_imagen in rutas.items():
+            tamano_kb = len(variantes[(ancho, alto)]) // 1024
+            logger.info("║" + f"   🖼️  {ruta_imagen} (~{tamano_kb} KB)".ljust(58) + "║")
+        logger.info("╚" + "═" * 58 + "╝")
         
-        # 4. Añadir iconos
-        mostrar_progreso(4, pasos_totales, "Integrando iconos...")
-        img_final = añadir_iconos(img_con_titulo, iconos_procesados)
+        return rutas
         
-        # 5. Guardar resultados
-        mostrar_progreso(5, pasos_totales, "Guardando archivos...")
+    except Exception as e:
+        logger.error(f"\n❌ ERROR DURANTE LA GENERACIÓN:\n   {str(e)}")
+        raise
+
+
+# === MODO LOTE ===
+
+def cargar_manifiesto(ruta_manifiesto):
+    """
+    Lee un manifiesto de lote en CSV o JSONL.
+    
+    - CSV con cabecera: background,title,icons,output (iconos separados por '|')
+    - JSONL: {"background": ..., "title": ..., "icons": [...], "output": ...}
+    
+    Si la salida termina en la extensión de un formato conocido (.png, .jpg,
+    .webp...), se quita: la pone el formato elegido para el lote.
+    
+    Args:
+        ruta_manifiesto (str): Ruta del fichero .csv o .jsonl
         
-        # Guardar PNG final
-        ruta_png = f"{ruta_salida}.png"
-        img_final.save(ruta_png, "PNG", optimize=False, compress_level=1)
+    Returns:
+        list: Lista de dicts con las claves background, title, icons y output
+    """
+    filas = []
+    
+    with open(ruta_manifiesto, 'r', encoding='utf-8', newline='') as f:
+        if ruta_manifiesto.lower().endswith(('.jsonl', '.json')):
+            registros = [json.loads(linea) for linea in f if linea.strip()]
+        else:
+            registros = list(csv.DictReader(f))
+    
+    for i, registro in enumerate(registros, 1):
+        iconos = registro.get('icons') or []
+        if isinstance(iconos, str):
+            iconos = [icono.strip() for icono in iconos.split('|') if icono.strip()]
         
-        # Guardar PSD simulado
-        ruta_psd = f"{ruta_salida}.psd"
-        guardar_como_psd_simulado(img_fondo, img_con_titulo, iconos_procesados, titulo, ruta_psd)
+        salida = registro.get('output') or f"thumbnail_{i:05d}"
+        base, extension = os.path.splitext(salida)
+        if extension[1:].lower() in extensiones_conocidas():
+            salida = base
         
-        print()
-        print("✅ GENERACIÓN COMPLETADA CON ÉXITO")
-        print("╔" + "═" * 58 + "╗")
-        print("║" + "📁 ARCHIVOS GENERADOS:".ljust(58) + "║")
-        print("║" + f"   🖼️  {ruta_png}".ljust(58) + "║")
-        print("║" + f"   📂 {ruta_salida}_capas/ (capas separadas)".ljust(58) + "║")
-        print("║" + " " * 58 + "║")
-        print("║" + f"📊 ESTADÍSTICAS:".ljust(58) + "║")
-        print("║" + f"   • Resolución: 1920x1080 píxeles".ljust(58) + "║")
-        print("║" + f"   • Líneas de texto: {len(dividir_texto_en_lineas(titulo, obtener_fuente(130), 1536))}".ljust(58) + "║")
-        print("║" + f"   • Iconos: {len(iconos)}".ljust(58) + "║")
-        print("║" + f"   • Tamaño archivo: ~{os.path.getsize(ruta_png) // 1024} KB".ljust(58) + "║")
-        print("╚" + "═" * 58 + "╝")
-        print()
-        print("🎉 ¡Tu thumbnail está listo para usar!")
+        filas.append({
+            'background': registro['background'],
+            'title': registro['title'],
+            'icons': iconos,
+            'output': salida,
+        })
+    
+    return filas
+
+
+@contextlib.contextmanager
+def registro_silenciado():
+    """Silencia temporalmente los mensajes del pipeline (p. ej. en los workers de un lote)."""
+    nivel = logger.level
+    logger.setLevel(logging.CRITICAL + 1)
+    try:
+        yield
+    finally:
+        logger.setLevel(nivel)
+
+
+def _renderizar_lote(filas, fondo_rapido, salida):
+    """
+    Renderiza en un proceso worker un grupo de filas que comparten fondo.
+    
+    Las cachés de etapas del proceso hacen que el fondo (y los iconos
+    repetidos) se decodifiquen y desenfoquen una sola vez por grupo.
+    
+    Args:
+        filas (list): Filas de cargar_manifiesto
+        fondo_rapido (bool): Ver procesar_imagen_base
+        salida (dict): Opciones de salida (formato, calidad, max_bytes, capas)
+    
+    Returns:
+        list: Tuplas (salida, error o None, segundos)
+    """
+    resultados = []
+    
+    for fila in filas:
+        inicio = time.time()
+        try:
+            with registro_silenciado():
+                _generar_thumbnail(fila['background'], fila['title'], fila['icons'], fila['output'],
+                                   fondo_rapido, salida['formato'], salida['calidad'],
+                                   salida['max_bytes'], salida['capas'])
+            error = None
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        resultados.append((fila['output'], error, time.time() - inicio))
+    
+    # Los .ora se escriben en segundo plano: terminar antes de devolver el grupo
+    esperar_exportaciones()
+    return resultados
+
+
+def generar_lote(filas, procesos=None, fondo_rapido=False, formato='png', calidad=None, max_bytes=None,
+                 capas=False):
+    """
+    Renderiza un manifiesto completo en un pool de procesos.
+    
+    Las filas cuyos ficheros de salida ya existen todos (la imagen y, con
+    capas, el .ora) se omiten, de modo que un lote interrumpido puede
+    reanudarse relanzando el mismo comando.
+    
+    Args:
+        filas (list): Filas de cargar_manifiesto
+        procesos (int): Procesos worker (por defecto, uno por núcleo)
+        fondo_rapido (bool): Ver procesar_imagen_base
+        formato (str): Formato de salida (ver generar_thumbnail)
+        calidad (int): Calidad de los formatos que la admiten
+        max_bytes (int): Presupuesto de bytes por thumbnail
+        capas (bool): Exportar también el .ora de cada thumbnail
         
-    except Exception as e:
-        print(f"\n❌ ERROR DURANTE LA GENERACIÓN:")
-        print(f"   {str(e)}")
-        print("\n💡 CONSEJOS:")
-        print("   • Verifica que la imagen base sea válida")
-        print("   • Comprueba tu conexión a internet para URLs")
-        print("   • Asegúrate de tener permisos de escritura")
-        raise
+    Returns:
+        dict: Resumen con generados, omitidos, fallos, segundos y thumbnails/s
+    """
+    procesos = procesos or os.cpu_count() or 1
+    extension = obtener_codificador(formato).extension
+    salida = {'formato': formato, 'calidad': calidad, 'max_bytes': max_bytes, 'capas': capas}
+    
+    extensiones = [extension, 'ora'] if capas else [extension]
+    pendientes = [
+        fila for fila in filas
+        if not all(os.path.exists(f"{fila['output']}.{ext}") for ext in extensiones)
+    ]
+    omitidos = len(filas) - len(pendientes)
+    
+    # Agrupar por fondo y repartir los grupos grandes para usar todos los procesos
+    por_fondo = OrderedDict()
+    for fila in pendientes:
+        por_fondo.setdefault(fila['background'], []).append(fila)
+    
+    tamano_grupo = max(1, math.ceil(len(pendientes) / procesos))
+    grupos = []
+    for filas_fondo in por_fondo.values():
+        for i in range(0, len(filas_fondo), tamano_grupo):
+            grupos.append(filas_fondo[i:i + tamano_grupo])
+    
+    generados = 0
+    fallos = []
+    inicio = time.time()
+    
+    with ProcessPoolExecutor(max_workers=procesos, initializer=precargar_fuentes) as pool:
+        futuros = [pool.submit(_renderizar_lote, grupo, fondo_rapido, salida) for grupo in grupos]
+        for futuro in as_completed(futuros):
+            for ruta, error, segundos in futuro.result():
+                if error is None:
+                    generados += 1
+                    logger.info(f"✅ {ruta}.{extension} ({segundos:.2f}s)")
+                else:
+                    fallos.append((ruta, error))
+                    logger.error(f"❌ {ruta}: {error}")
+    
+    segundos = time.time() - inicio
+    return {
+        'generados': generados,
+        'omitidos': omitidos,
+        'fallos': fallos,
+        'segundos': segundos,
+        'por_segundo': generados / segundos if segundos > 0 else 0.0,
+    }
+
+
+def añadir_opciones_salida(parser):
+    """Añade al parser las opciones de formato de salida."""
+    parser.add_argument('--formato', default='png',
+                        help="Formato de salida: png, png-paleta, jpeg o webp (por defecto png)")
+    parser.add_argument('--calidad', type=int, default=None,
+                        help='Calidad 1-100 de jpeg/webp (o nº de colores relativo en png-paleta)')
+    parser.add_argument('--max-kb', type=int, default=None,
+                        help='Tamaño objetivo: mayor calidad cuyo fichero ocupe como mucho N KB')
+    parser.add_argument('--capas', action='store_true',
+                        help='Exportar también las capas separadas en un fichero OpenRaster (.ora)')
+
+
+def opciones_salida(args):
+    """
+    Convierte las opciones de añadir_opciones_salida en argumentos de
+    generar_thumbnail, validándolas antes de renderizar nada.
+    
+    Raises:
+        ValueError: Si alguna opción no es válida (ver validar_opciones)
+    """
+    salida = validar_opciones(args.formato, args.calidad, args.max_kb)
+    salida['capas'] = args.capas
+    return salida
+
+
+def ejecutar_lote(argumentos):
+    """Punto de entrada del subcomando `batch` de la línea de comandos."""
+    parser = argparse.ArgumentParser(
+        prog='generate_thumbnail.py batch',
+        description='Genera thumbnails en paralelo a partir de un manifiesto CSV/JSONL.'
+    )
+    parser.add_argument('manifiesto', help='Fichero .csv (background,title,icons,output) o .jsonl')
+    parser.add_argument('--procesos', type=int, default=None, help='Procesos worker (por defecto, uno por núcleo)')
+    parser.add_argument('--rapido', action='store_true', help='Desenfocar el fondo a resolución reducida')
+    añadir_opciones_salida(parser)
+    args = parser.parse_args(argumentos)
+    
+    try:
+        salida = opciones_salida(args)
+    except ValueError as e:
+        parser.error(str(e))
+    
+    filas = cargar_manifiesto(args.manifiesto)
+    print(f"📋 Manifiesto: {len(filas)} thumbnail(s)")
+    
+    resumen = generar_lote(filas, procesos=args.procesos, fondo_rapido=args.rapido, **salida)
+    
+    print()
+    print("╔" + "═" * 58 + "╗")
+    print("║" + "📊 RESUMEN DEL LOTE:".ljust(58) + "║")
+    print("║" + f"   • Generados: {resumen['generados']}".ljust(58) + "║")
+    print("║" + f"   • Omitidos (ya existían): {resumen['omitidos']}".ljust(58) + "║")
+    print("║" + f"   • Fallos: {len(resumen['fallos'])}".ljust(58) + "║")
+    print("║" + f"   • Tiempo: {resumen['segundos']:.1f}s ({resumen['por_segundo']:.2f} thumbnails/s)".ljust(58) + "║")
+    print("╚" + "═" * 58 + "╝")
+    
+    for salida, error in resumen['fallos']:
+        print(f"   ❌ {salida}: {error}")
+    
+    return 1 if resumen['fallos'] else 0
 
 
 def mostrar_banner():
@@ -745,16 +2400,13 @@ def mostrar_banner():
 
 
 def mostrar_progreso(paso, total, descripcion):
-    """Muestra una barra de progreso visual."""
+    """Registra (nivel INFO) una barra de progreso visual."""
     porcentaje = (paso / total) * 100
     barra_llena = int(porcentaje // 5)
     barra_vacia = 20 - barra_llena
     
     barra = "█" * barra_llena + "░" * barra_vacia
-    print(f"\r🔄 [{barra}] {porcentaje:6.1f}% - {descripcion}", end="", flush=True)
-    
-    if paso == total:
-        print("  ✅")
+    logger.info(f"🔄 [{barra}] {porcentaje:6.1f}% - {descripcion}{'  ✅' if paso == total else ''}")
 
 
 def solicitar_datos_usuario():
@@ -888,12 +2540,41 @@ def solicitar_datos_usuario():
 
 
 if __name__ == "__main__":
+    # Los mensajes de progreso van por logging; en la línea de comandos se
+    # muestran salvo con --silencioso
+    silencioso = '--silencioso' in sys.argv
+    if silencioso:
+        sys.argv.remove('--silencioso')
+    logging.basicConfig(level=logging.WARNING if silencioso else logging.INFO,
+                        format='%(message)s', stream=sys.stdout)
+    
+    # Subcomando de lote: generate_thumbnail.py batch manifiesto.csv [--procesos N]
+    if len(sys.argv) >= 2 and sys.argv[1] == "batch":
+        sys.exit(ejecutar_lote(sys.argv[2:]))
+    
+    # Opciones de formato de salida (--formato, --calidad, --max-kb) y tamaños
+    parser_salida = argparse.ArgumentParser(add_help=False)
+    añadir_opciones_salida(parser_salida)
+    parser_salida.add_argument('--tamanos', default=None,
+                               help="Generar varios tamaños: 'todos' o lista como 1080p,720p,360p,social,800x600")
+    args_salida, argumentos = parser_salida.parse_known_args(sys.argv[1:])
+    try:
+        salida = opciones_salida(args_salida)
+        tamanos = None
+        if args_salida.tamanos:
+            if args_salida.capas:
+                raise ValueError("--capas no está disponible junto con --tamanos")
+            tamanos = resolver_tamanos(None if args_salida.tamanos == 'todos' else args_salida.tamanos)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    
     # Si se proporcionan argumentos por línea de comandos, usarlos
-    if len(sys.argv) >= 3:
+    if len(argumentos) >= 2:
         print("📌 Usando argumentos de línea de comandos...")
-        imagen_base = sys.argv[1]
-        titulo = sys.argv[2]
-        iconos = sys.argv[3:] if len(sys.argv) > 3 else []
+        imagen_base = argumentos[0]
+        titulo = argumentos[1]
+        iconos = argumentos[2:]
         ruta_salida = "thumbnail"
         
         print(f"   • Imagen: {imagen_base}")
@@ -906,7 +2587,14 @@ if __name__ == "__main__":
     
     # Generar thumbnail
     try:
-        generar_thumbnail(imagen_base, titulo, iconos, ruta_salida)
+        if tamanos:
+            salida.pop('capas')
+            generar_variantes(imagen_base, titulo, iconos, ruta_salida, tamanos, **salida)
+        else:
+            # generar_thumbnail ya ha registrado el error y sus consejos
+            if generar_thumbnail(imagen_base, titulo, iconos, ruta_salida, **salida) is None:
+                sys.exit(1)
+            esperar_exportaciones()
     except KeyboardInterrupt:
         print("\n❌ Generación cancelada por el usuario")
         sys.exit(1)
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Caché en Disco de Imágenes Remotas
+==================================
+
+Caché persistente para las imágenes descargadas por URL (iconos, logos,
+fondos). Los cuerpos se guardan direccionados por contenido (SHA-256), de modo
+que varias URLs con la misma imagen comparten un único fichero, y cada URL
+recuerda su ETag/Last-Modified para revalidar con peticiones condicionales.
+
+- Dentro del periodo de frescura no se hace ninguna petición de red
+- Pasado ese periodo se revalida (304 → se reutiliza el cuerpo guardado)
+- Si la red falla, o en modo sin conexión, se sirve la copia guardada
+- Tamaño total limitado, expulsando primero lo menos usado (LRU)
+- Varios procesos pueden compartir la caché: el índice se relee y se
+  combina bajo un bloqueo de fichero antes de cada escritura
+
+Autor: Desarrollador Senior Python
+Fecha: Agosto 2025
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+import contextlib
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos
+    fcntl = None
+
+
+logger = logging.getLogger(__name__)
+
+
+class CacheImagenesRemotas:
+    """Caché de cuerpos HTTP por URL con almacenamiento por hash de contenido."""
+
+    def __init__(self, directorio, max_bytes=256 * 1024 * 1024, frescura=24 * 3600, sin_conexion=False):
+        """
+        Args:
+            directorio (str): Carpeta raíz de la caché (se crea si no existe)
+            max_bytes (int): Tamaño máximo total de los cuerpos guardados
+            frescura (float): Segundos durante los que una entrada se usa sin revalidar
+            sin_conexion (bool): Servir siempre lo guardado sin acceder a la red
+        """
+        self.directorio = directorio
+        self.max_bytes = max_bytes
+        self.frescura = frescura
+        self.sin_conexion = sin_conexion
+
+        self._ruta_indice = os.path.join(directorio, 'indice.json')
+        self._ruta_bloqueo = os.path.join(directorio, 'indice.lock')
+        self._dir_objetos = os.path.join(directorio, 'objetos')
+        self._lock = threading.Lock()
+
+        os.makedirs(self._dir_objetos, exist_ok=True)
+        self._version_indice = None
+        self._indice = self._leer_indice()
+
+    # === ÍNDICE ===
+
+    def _firma_indice(self):
+        try:
+            info = os.stat(self._ruta_indice)
+        except OSError:
+            return None
+        return info.st_mtime_ns, info.st_size, info.st_ino
+
+    def _leer_indice(self):
+        """Carga el índice desde disco (o uno vacío si no existe o está dañado)."""
+        self._version_indice = self._firma_indice()
+        try:
+            with open(self._ruta_indice, 'r', encoding='utf-8') as f:
+                indice = json.load(f)
+            if 'urls' in indice and 'objetos' in indice:
+                return indice
+        except (OSError, ValueError):
+            pass
+        return {'urls': {}, 'objetos': {}}
+
+    def _guardar_indice(self):
+        """Escribe el índice de forma atómica (fichero temporal + rename)."""
+        temporal = f"{self._ruta_indice}.{os.getpid()}.tmp"
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(self._indice, f)
+        os.replace(temporal, self._ruta_indice)
+        self._version_indice = self._firma_indice()
+
+    def _recargar_indice(self):
+        """
+        Relee el índice si otro proceso lo ha reescrito (requiere el lock).
+
+        Los accesos de este proceso aún no guardados se conservan, para que
+        la expulsión LRU tenga en cuenta el uso de todos los procesos.
+        """
+        if self._firma_indice() == self._version_indice:
+            return
+        indice = self._leer_indice()
+        for hash_contenido, objeto in indice['objetos'].items():
+            propio = self._indice['objetos'].get(hash_contenido)
+            if propio is not None:
+                objeto['ultimo_acceso'] = max(objeto['ultimo_acceso'], propio['ultimo_acceso'])
+        self._indice = indice
+
+    @contextlib.contextmanager
+    def _bloqueo_disco(self):
+        """Bloqueo exclusivo entre procesos para leer-modificar-escribir el índice."""
+        if fcntl is None:
+            yield
+            return
+        with open(self._ruta_bloqueo, 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _ruta_objeto(self, hash_contenido):
+        return os.path.join(self._dir_objetos, hash_contenido[:2], hash_contenido)
+
+    # === LECTURA / ESCRITURA ===
+
+    def _leer_cuerpo(self, entrada):
+        """Lee el cuerpo de una entrada y marca el acceso, o None si falta el fichero."""
+        hash_contenido = entrada['hash']
+        try:
+            with open(self._ruta_objeto(hash_contenido), 'rb') as f:
+                datos = f.read()
+        except OSError:
+            return None
+
+        objeto = self._indice['objetos'].get(hash_contenido)
+        if objeto is not None:
+            objeto['ultimo_acceso'] = time.time()
+        return datos
+
+    def _guardar(self, url, datos, cabeceras):
+        """Guarda un cuerpo nuevo para la URL y aplica el límite de tamaño (requiere ambos bloqueos)."""
+        hash_contenido = hashlib.sha256(datos).hexdigest()
+        ruta = self._ruta_objeto(hash_contenido)
+
+        if not os.path.exists(ruta):
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+            temporal = f"{ruta}.{os.getpid()}.tmp"
+            with open(temporal, 'wb') as f:
+                f.write(datos)
+            os.replace(temporal, ruta)
+
+        ahora = time.time()
+        self._recargar_indice()
+        self._indice['objetos'][hash_contenido] = {'tamano': len(datos), 'ultimo_acceso': ahora}
+        self._indice['urls'][url] = {
+            'hash': hash_contenido,
+            'etag': cabeceras.get('ETag'),
+            'last_modified': cabeceras.get('Last-Modified'),
+            'validado': ahora,
+        }
+        self._expulsar()
+        self._guardar_indice()
+
+    def _expulsar(self):
+        """Elimina los objetos menos usados hasta quedar por debajo de max_bytes."""
+        objetos = self._indice['objetos']
+        total = sum(objeto['tamano'] for objeto in objetos.values())
+        if total <= self.max_bytes:
+            return
+
+        expulsados = set()
+        for hash_contenido, objeto in sorted(objetos.items(), key=lambda item: item[1]['ultimo_acceso']):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(self._ruta_objeto(hash_contenido))
+            except OSError:
+                pass
+            total -= objeto['tamano']
+            expulsados.add(hash_contenido)
+
+        for hash_contenido in expulsados:
+            del objetos[hash_contenido]
+        self._indice['urls'] = {
+            url: entrada for url, entrada in self._indice['urls'].items()
+            if entrada['hash'] not in expulsados
+        }
+
+    # === API PÚBLICA ===
+
+    def obtener(self, url, sesion, timeout=30):
+        """
+        Devuelve el cuerpo de la URL, usando la caché siempre que sea posible.
+
+        Args:
+            url (str): URL de la imagen
+            sesion (requests.Session): Sesión HTTP para descargar/revalidar
+            timeout (float): Timeout de la petición en segundos
+
+        Returns:
+            bytes: Contenido de la imagen
+
+        Raises:
+            requests.exceptions.RequestException: Si la descarga falla y no hay copia guardada
+            LookupError: En modo sin conexión, si la URL no está en caché
+        """
+        with self._lock:
+            # Puede haberla descargado (o expulsado) otro proceso
+            self._recargar_indice()
+            entrada = self._indice['urls'].get(url)
+            datos = self._leer_cuerpo(entrada) if entrada else None
+
+            if datos is not None:
+                if self.sin_conexion or time.time() - entrada['validado'] < self.frescura:
+                    return datos
+            elif self.sin_conexion:
+                raise LookupError(f"Sin conexión y sin copia en caché: {url}")
+
+        # Petición (condicional si hay copia guardada) fuera del lock
+        cabeceras = {}
+        if datos is not None:
+            if entrada.get('etag'):
+                cabeceras['If-None-Match'] = entrada['etag']
+            if entrada.get('last_modified'):
+                cabeceras['If-Modified-Since'] = entrada['last_modified']
+
+        try:
+            response = sesion.get(url, timeout=timeout, headers=cabeceras)
+            if response.status_code == 304 and datos is not None:
+                with self._lock, self._bloqueo_disco():
+                    # Solo si otro proceso no la ha expulsado o sustituido entretanto
+                    self._recargar_indice()
+                    actual = self._indice['urls'].get(url)
+                    if actual is not None and actual['hash'] == entrada['hash']:
+                        actual['validado'] = time.time()
+                        self._guardar_indice()
+                return datos
+            response.raise_for_status()
+        except Exception as e:
+            if datos is None:
+                raise
+            logger.warning(f"⚠️  Usando copia en caché de {url} (revalidación fallida: {e})")
+            return datos
+
+        with self._lock, self._bloqueo_disco():
+            self._guardar(url, response.content, response.headers)
+        return response.content
+
+    def estadisticas(self):
+        """
+        Returns:
+            dict: Número de URLs, número de objetos y bytes ocupados
+        """
+        with self._lock:
+            self._recargar_indice()
+            return {
+                'urls': len(self._indice['urls']),
+                'objetos': len(self._indice['objetos']),
+                'bytes': sum(objeto['tamano'] for objeto in self._indice['objetos'].values()),
+            }
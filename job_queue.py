@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cola de Trabajos de Render
+==========================
+
+Ejecuta los renders (CPU intensivos) en un pool acotado de procesos en lugar
+de en el hilo de la petición HTTP:
+
+- enviar() devuelve inmediatamente un identificador de trabajo
+- Los clientes consultan el estado o esperan (long-poll) con esperar()
+- La profundidad de la cola está limitada (ColaLlena cuando se supera)
+- Cada proceso se recicla tras un número máximo de tareas
+- Se registran tiempos de espera en cola y de ejecución por trabajo
+- Las métricas (render_metrics) de cada trabajo vuelven del worker al
+  proceso principal junto con el resultado
+- Un callback opcional recibe cada trabajo terminado antes de despertar a
+  quien lo espera (p. ej. para publicarlo en un almacenamiento compartido);
+  a partir de ahí la cola no conserva el resultado
+
+Autor: Desarrollador Senior Python
+Fecha: Agosto 2025
+"""
+
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from render_metrics import METRICAS
+
+
+logger = logging.getLogger(__name__)
+
+
+# Estados de un trabajo
+EN_COLA = 'en_cola'
+PROCESANDO = 'procesando'
+COMPLETADO = 'completado'
+ERROR = 'error'
+
+
+class ColaLlena(Exception):
+    """Se lanza al enviar un trabajo cuando la cola ya está al máximo."""
+
+
+def _ejecutar_medido(funcion, args, kwargs):
+    """
+    Ejecuta la función en el proceso worker y devuelve también sus tiempos y
+    las métricas que ha acumulado (también si falla, adjuntas a la excepción).
+    """
+    inicio = time.time()
+    try:
+        resultado = funcion(*args, **kwargs)
+    except Exception as e:
+        e.metricas = METRICAS.extraer()
+        raise
+    return resultado, inicio, time.time(), os.getpid(), METRICAS.extraer()
+
+
+class _Trabajo:
+    def __init__(self, trabajo_id, futuro, enviado):
+        self.id = trabajo_id
+        self.futuro = futuro
+        self.enviado = enviado
+        self.terminado = None
+        self.inicio = None
+        self.fin = None
+        self.pid = None
+        self.resultado = None
+        self.error = None
+        self.listo = threading.Event()
+
+
+class ColaRenders:
+    """Cola de trabajos respaldada por un ProcessPoolExecutor."""
+
+    def __init__(self, max_procesos=None, max_en_cola=32, max_tareas_por_proceso=50,
+                 retencion=600, inicializador=None, al_terminar_trabajo=None):
+        """
+        Args:
+            max_procesos (int): Procesos worker (por defecto, uno por núcleo)
+            max_en_cola (int): Trabajos pendientes o en curso admitidos a la vez
+            max_tareas_por_proceso (int): Tareas tras las que se recicla un worker
+            retencion (float): Segundos que se conservan los trabajos terminados
+            inicializador (callable): Función a ejecutar al arrancar cada worker
+                (p. ej. precargar fuentes)
+            al_terminar_trabajo (callable): (trabajo_id, resultado, error) → None,
+                llamada al terminar cada trabajo; error es el mensaje si falló.
+                Si termina sin errores, el resultado queda en sus manos y la
+                cola solo conserva el estado del trabajo
+        """
+        self.max_procesos = max_procesos or os.cpu_count() or 1
+        self.max_en_cola = max_en_cola
+        self.max_tareas_por_proceso = max_tareas_por_proceso
+        self.retencion = retencion
+        self.inicializador = inicializador
+        self.al_terminar_trabajo = al_terminar_trabajo
+
+        self._pool = None
+        self._lock = threading.Lock()
+        self._trabajos = {}
+
+        self.completados = 0
+        self.fallidos = 0
+
+    def _obtener_pool(self):
+        """Crea el pool de procesos la primera vez que se necesita (requiere el lock)."""
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_procesos,
+                max_tasks_per_child=self.max_tareas_por_proceso,
+                initializer=self.inicializador,
+            )
+        return self._pool
+
+    def _purgar(self):
+        """Olvida los trabajos terminados hace más de `retencion` segundos (requiere el lock)."""
+        limite = time.time() - self.retencion
+        caducados = [
+            trabajo_id for trabajo_id, trabajo in self._trabajos.items()
+            if trabajo.terminado is not None and trabajo.terminado < limite
+        ]
+        for trabajo_id in caducados:
+            del self._trabajos[trabajo_id]
+
+    def pendientes(self):
+        """
+        Returns:
+            int: Trabajos en cola o en ejecución
+        """
+        with self._lock:
+            return sum(1 for trabajo in self._trabajos.values() if trabajo.terminado is None)
+
+    def enviar(self, trabajo_id, funcion, *args, **kwargs):
+        """
+        Envía un trabajo al pool. Si ya existe un trabajo con el mismo
+        identificador (en curso o terminado), se reutiliza.
+
+        Args:
+            trabajo_id (str): Identificador del trabajo
+            funcion (callable): Función a nivel de módulo (serializable con pickle)
+            *args, **kwargs: Argumentos de la función
+
+        Returns:
+            str: Identificador del trabajo
+
+        Raises:
+            ColaLlena: Si ya hay max_en_cola trabajos pendientes
+        """
+        with self._lock:
+            self._purgar()
+            trabajo = self._trabajos.get(trabajo_id)
+            if trabajo is not None and trabajo.error is None:
+                return trabajo_id
+
+            pendientes = sum(1 for t in self._trabajos.values() if t.terminado is None)
+            if pendientes >= self.max_en_cola:
+                raise ColaLlena(f"Cola de renders llena ({pendientes} trabajos pendientes)")
+
+            # Antes de submit: el worker puede empezar antes de que vuelva
+            enviado = time.time()
+            futuro = self._obtener_pool().submit(_ejecutar_medido, funcion, args, kwargs)
+            trabajo = _Trabajo(trabajo_id, futuro, enviado)
+            self._trabajos[trabajo_id] = trabajo
+
+        futuro.add_done_callback(lambda f: self._al_terminar(trabajo))
+        return trabajo_id
+
+    def _al_terminar(self, trabajo):
+        try:
+            trabajo.resultado, trabajo.inicio, trabajo.fin, trabajo.pid, metricas = trabajo.futuro.result()
+            exito = True
+        except BaseException as e:
+            trabajo.error = str(e) or type(e).__name__
+            metricas = getattr(e, 'metricas', None)
+            exito = False
+        METRICAS.combinar(metricas)
+
+        if self.al_terminar_trabajo is not None:
+            try:
+                self.al_terminar_trabajo(trabajo.id, trabajo.resultado, trabajo.error)
+                # Ya publicado: no retenerlo también aquí durante `retencion`
+                trabajo.resultado = None
+            except Exception as e:
+                logger.warning(f"⚠️  Error notificando el trabajo {trabajo.id}: {e}")
+
+        with self._lock:
+            trabajo.terminado = time.time()
+            if exito:
+                self.completados += 1
+            else:
+                self.fallidos += 1
+        trabajo.listo.set()
+
+    def olvidar(self, trabajo_id):
+        """
+        Olvida un trabajo terminado para que el próximo enviar() con el mismo
+        identificador lo vuelva a ejecutar (p. ej. si su resultado publicado
+        ya no existe). Los trabajos en curso no se tocan.
+
+        Args:
+            trabajo_id (str): Identificador del trabajo
+
+        Returns:
+            bool: True si se olvidó
+        """
+        with self._lock:
+            trabajo = self._trabajos.get(trabajo_id)
+            if trabajo is None or trabajo.terminado is None:
+                return False
+            del self._trabajos[trabajo_id]
+            return True
+
+    def esperar(self, trabajo_id, timeout=0):
+        """
+        Devuelve el estado del trabajo, esperando hasta `timeout` segundos a
+        que termine (long-poll).
+
+        Args:
+            trabajo_id (str): Identificador del trabajo
+            timeout (float): Espera máxima en segundos (0 = consultar sin esperar)
+
+        Returns:
+            dict: Estado del trabajo, o None si no existe
+        """
+        with self._lock:
+            trabajo = self._trabajos.get(trabajo_id)
+        if trabajo is None:
+            return None
+
+        if timeout:
+            trabajo.listo.wait(timeout)
+        return self._describir(trabajo)
+
+    def _describir(self, trabajo):
+        if trabajo.terminado is not None:
+            estado = ERROR if trabajo.error is not None else COMPLETADO
+        elif trabajo.futuro.running():
+            estado = PROCESANDO
+        else:
+            estado = EN_COLA
+
+        descripcion = {'id': trabajo.id, 'estado': estado}
+        if trabajo.inicio is not None:
+            descripcion['espera_ms'] = int((trabajo.inicio - trabajo.enviado) * 1000)
+            descripcion['render_ms'] = int((trabajo.fin - trabajo.inicio) * 1000)
+            descripcion['pid'] = trabajo.pid
+        if trabajo.error is not None:
+            descripcion['error'] = trabajo.error
+        return descripcion
+
+    def resultado(self, trabajo_id):
+        """
+        Returns:
+            object: Valor devuelto por la función del trabajo (None si no ha
+                terminado o si ya se entregó a al_terminar_trabajo)
+        """
+        with self._lock:
+            trabajo = self._trabajos.get(trabajo_id)
+        return trabajo.resultado if trabajo is not None else None
+
+    def estadisticas(self):
+        """
+        Returns:
+            dict: Procesos, trabajos pendientes, completados y fallidos
+        """
+        with self._lock:
+            return {
+                'procesos': self.max_procesos,
+                'pendientes': sum(1 for t in self._trabajos.values() if t.terminado is None),
+                'max_en_cola': self.max_en_cola,
+                'completados': self.completados,
+                'fallidos': self.fallidos,
+            }
+
+    def cerrar(self, esperar=True):
+        """Detiene el pool de procesos."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=esperar, cancel_futures=not esperar)
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Exportación por Capas (OpenRaster)
+==================================
+
+Empaqueta las capas de un thumbnail en un único fichero OpenRaster (.ora):
+un zip con un PNG por capa, su posición en stack.xml, la imagen compuesta y
+una miniatura. Lo abren GIMP, Krita y MyPaint, entre otros.
+
+- Cada capa se guarda con el hash de su contenido como nombre: dos capas
+  iguales dentro del mismo fichero se almacenan una sola vez
+- Los PNG de las capas se memorizan por hash entre exportaciones, de modo que
+  un mismo fondo usado en muchos renders solo se codifica una vez
+
+Autor: Desarrollador Senior Python
+Fecha: Agosto 2025
+"""
+
+import hashlib
+import threading
+import zipfile
+from io import BytesIO
+from collections import OrderedDict
+from xml.etree import ElementTree
+from PIL import Image
+from render_metrics import medir_etapa
+
+
+TIPO_MIME_ORA = 'image/openraster'
+TAMANO_MINIATURA = (256, 256)
+MAX_BYTES_CACHE_CAPAS = 64 * 1024 * 1024
+
+_cache_capas = OrderedDict()     # hash -> PNG codificado, orden LRU
+_bytes_cache_capas = 0
+_lock_cache_capas = threading.Lock()
+
+
+def hash_capa(imagen):
+    """
+    Returns:
+        str: SHA-256 de los píxeles de la capa (incluidos modo y tamaño)
+    """
+    h = hashlib.sha256(f"{imagen.mode}:{imagen.size}:".encode())
+    h.update(imagen.tobytes())
+    return h.hexdigest()
+
+
+def codificar_capa(imagen):
+    """
+    Codifica una capa como PNG reutilizando el resultado si una capa con los
+    mismos píxeles ya se codificó antes.
+
+    Args:
+        imagen (PIL.Image): Capa RGB o RGBA
+
+    Returns:
+        tuple: (hash del contenido, bytes PNG)
+    """
+    global _bytes_cache_capas
+
+    hash_contenido = hash_capa(imagen)
+    with _lock_cache_capas:
+        datos = _cache_capas.get(hash_contenido)
+        if datos is not None:
+            _cache_capas.move_to_end(hash_contenido)
+            return hash_contenido, datos
+
+    buffer = BytesIO()
+    imagen.save(buffer, 'PNG', compress_level=1)
+    datos = buffer.getvalue()
+
+    with _lock_cache_capas:
+        if hash_contenido not in _cache_capas and len(datos) <= MAX_BYTES_CACHE_CAPAS:
+            _cache_capas[hash_contenido] = datos
+            _bytes_cache_capas += len(datos)
+            while _bytes_cache_capas > MAX_BYTES_CACHE_CAPAS:
+                _, expulsado = _cache_capas.popitem(last=False)
+                _bytes_cache_capas -= len(expulsado)
+
+    return hash_contenido, datos
+
+
+@medir_etapa('layers')
+def crear_openraster(capas, imagen_final):
+    """
+    Crea un fichero OpenRaster en memoria.
+
+    Args:
+        capas (list): Tuplas (nombre, imagen, (x, y)) de abajo arriba
+        imagen_final (PIL.Image): Imagen compuesta (mergedimage.png y miniatura)
+
+    Returns:
+        bytes: Contenido del fichero .ora
+    """
+    ancho, alto = imagen_final.size
+    raiz = ElementTree.Element('image', {'version': '0.0.5', 'w': str(ancho), 'h': str(alto)})
+    pila = ElementTree.SubElement(raiz, 'stack')
+
+    ficheros = OrderedDict()
+    # En stack.xml la primera capa es la superior
+    for nombre, imagen, (x, y) in reversed(capas):
+        hash_contenido, datos = codificar_capa(imagen)
+        ruta = f"data/{hash_contenido}.png"
+        ficheros[ruta] = datos
+        ElementTree.SubElement(pila, 'layer', {
+            'name': nombre, 'src': ruta, 'x': str(x), 'y': str(y),
+            'opacity': '1.0', 'visibility': 'visible',
+        })
+
+    miniatura = imagen_final.copy()
+    miniatura.thumbnail(TAMANO_MINIATURA, Image.Resampling.BILINEAR, reducing_gap=2.0)
+    buffer_miniatura = BytesIO()
+    miniatura.save(buffer_miniatura, 'PNG')
+
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as ora:
+        # El tipo MIME debe ser la primera entrada, sin comprimir
+        ora.writestr('mimetype', TIPO_MIME_ORA)
+        ora.writestr('stack.xml', ElementTree.tostring(raiz, encoding='UTF-8', xml_declaration=True))
+        for ruta, datos in ficheros.items():
+            ora.writestr(ruta, datos)
+        buffer_final = BytesIO()
+        imagen_final.save(buffer_final, 'PNG', compress_level=1)
+        ora.writestr('mergedimage.png', buffer_final.getvalue())
+        ora.writestr('Thumbnails/thumbnail.png', buffer_miniatura.getvalue())
+    return buffer.getvalue()
+
+
+def estadisticas():
+    """
+    Returns:
+        dict: Capas codificadas en memoria y bytes que ocupan
+    """
+    with _lock_cache_capas:
+        return {'capas': len(_cache_capas), 'bytes': _bytes_cache_capas}
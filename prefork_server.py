@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Servidor Pre-fork
+=================
+
+Sirve una aplicación WSGI con varios procesos que comparten un mismo socket
+de escucha (modo producción de la aplicación web):
+
+- El proceso principal abre el socket y crea N workers con fork; lo que ya
+  tenga cargado (módulos, fuentes) se comparte en copia-en-escritura
+- Cada worker ejecuta su inicialización (p. ej. calentar fuentes y códecs)
+  antes de empezar a aceptar conexiones; mientras tanto las conexiones
+  esperan en la cola del socket
+- Un worker que termina inesperadamente se sustituye por otro con el mismo
+  índice
+- SIGTERM o Ctrl+C detienen ordenadamente todos los workers
+
+Solo disponible en sistemas con fork (Linux, macOS).
+
+Autor: Desarrollador Senior Python
+Fecha: Agosto 2025
+"""
+
+import os
+import sys
+import time
+import signal
+import socket
+import logging
+from werkzeug.serving import make_server
+
+
+logger = logging.getLogger(__name__)
+
+
+def _salir(numero_senal, marco):
+    raise SystemExit(0)
+
+
+class ServidorPrefork:
+    """Proceso supervisor de N workers HTTP que comparten un socket."""
+
+    def __init__(self, app, host='0.0.0.0', port=5000, procesos=2,
+                 al_iniciar_worker=None, al_detener_worker=None,
+                 backlog=128, espera_cierre=10):
+        """
+        Args:
+            app (callable): Aplicación WSGI
+            host (str): Dirección de escucha
+            port (int): Puerto de escucha
+            procesos (int): Número de workers
+            al_iniciar_worker (callable): (índice) → None, se ejecuta en cada
+                worker antes de aceptar conexiones
+            al_detener_worker (callable): Función sin argumentos que se
+                ejecuta en cada worker al terminar
+            backlog (int): Conexiones que esperan en la cola del socket
+            espera_cierre (float): Segundos que se espera a los workers al
+                detener antes de forzar su cierre
+        """
+        self.app = app
+        self.host = host
+        self.port = port
+        self.procesos = max(1, procesos)
+        self.al_iniciar_worker = al_iniciar_worker
+        self.al_detener_worker = al_detener_worker
+        self.backlog = backlog
+        self.espera_cierre = espera_cierre
+
+        self._socket = None
+        self._workers = {}          # pid -> índice
+        self._arranques = {}        # índice -> momento del último arranque
+
+    # === WORKERS ===
+
+    def _lanzar(self, indice):
+        """Crea el worker con el índice dado (en el proceso principal)."""
+        pid = os.fork()
+        if pid == 0:
+            self._ejecutar_worker(indice)
+        self._workers[pid] = indice
+        self._arranques[indice] = time.time()
+        logger.info(f"👷 Worker {indice} iniciado (pid {pid})")
+
+    def _ejecutar_worker(self, indice):
+        """Cuerpo de un worker: inicializa, sirve peticiones y termina el proceso."""
+        codigo = 0
+        try:
+            if self.al_iniciar_worker is not None:
+                self.al_iniciar_worker(indice)
+            servidor = make_server(self.host, self.port, self.app, threaded=True,
+                                   fd=self._socket.fileno())
+            servidor.serve_forever()
+        except (KeyboardInterrupt, SystemExit):
+            pass
+        except Exception:
+            logger.exception(f"❌ Error en el worker {indice}")
+            codigo = 1
+        finally:
+            try:
+                if self.al_detener_worker is not None:
+                    self.al_detener_worker()
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(codigo)
+
+    def _detener_workers(self):
+        """Envía SIGTERM a los workers y fuerza el cierre de los que no terminan a tiempo."""
+        for pid in self._workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError:
+                pass
+
+        limite = time.time() + self.espera_cierre
+        while self._workers and time.time() < limite:
+            for pid in list(self._workers):
+                try:
+                    terminado, _ = os.waitpid(pid, os.WNOHANG)
+                except ChildProcessError:
+                    terminado = pid
+                if terminado:
+                    del self._workers[pid]
+            time.sleep(0.05)
+
+        for pid in self._workers:
+            logger.warning(f"⚠️  El worker {pid} no terminó a tiempo, se fuerza su cierre")
+            try:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+            except OSError:
+                pass
+        self._workers.clear()
+
+    # === API PÚBLICA ===
+
+    def ejecutar(self):
+        """
+        Abre el socket, lanza los workers y los supervisa hasta recibir
+        SIGTERM o Ctrl+C.
+
+        Raises:
+            RuntimeError: Si el sistema no dispone de fork
+        """
+        if not hasattr(os, 'fork'):
+            raise RuntimeError("El servidor pre-fork necesita fork (Linux o macOS)")
+
+        self._socket = socket.create_server((self.host, self.port), backlog=self.backlog)
+        signal.signal(signal.SIGTERM, _salir)
+
+        try:
+            for indice in range(self.procesos):
+                self._lanzar(indice)
+
+            while True:
+                pid, estado = os.wait()
+                indice = self._workers.pop(pid, None)
+                if indice is None:
+                    continue
+                logger.warning(f"⚠️  El worker {indice} (pid {pid}) terminó con estado {estado}, se reinicia")
+                # Evitar un bucle de reinicios si el worker falla al arrancar
+                if time.time() - self._arranques[indice] < 1:
+                    time.sleep(1)
+                self._lanzar(indice)
+        except (KeyboardInterrupt, SystemExit):
+            pass
+        finally:
+            self._detener_workers()
+            self._socket.close()
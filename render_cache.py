@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Caché de Renders para la Aplicación Web
+=======================================
+
+Guarda el resultado codificado de cada render bajo una huella de sus entradas
+(contenido de los ficheros + parámetros), en dos niveles:
+
+- Memoria: acceso inmediato, limitado en bytes
+- Disco: sobrevive a la expulsión de memoria, limitado en bytes
+
+Ambos niveles expulsan por antigüedad (max_edad) y por tamaño (LRU). Las
+peticiones idénticas que llegan mientras un render está en curso esperan a ese
+mismo render en lugar de lanzar otro (single-flight).
+
+Varios procesos pueden compartir el directorio del nivel de disco: un render
+guardado por otro proceso se encuentra en el primer fallo de su clave, y cada
+purga vuelve a sincronizar el índice con el contenido del directorio.
+
+Autor: Desarrollador Senior Python
+Fecha: Agosto 2025
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+def hash_fichero(ruta, bloque=1024 * 1024):
+    """
+    Calcula el SHA-256 del contenido de un fichero leyendo por bloques.
+
+    Args:
+        ruta (str): Ruta del fichero
+        bloque (int): Tamaño de lectura en bytes
+
+    Returns:
+        str: Hash hexadecimal
+    """
+    h = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for trozo in iter(lambda: f.read(bloque), b''):
+            h.update(trozo)
+    return h.hexdigest()
+
+
+class CacheRenders:
+    """Caché de renders en memoria y disco con single-flight por clave."""
+
+    def __init__(self, directorio, max_bytes_memoria=64 * 1024 * 1024,
+                 max_bytes_disco=512 * 1024 * 1024, max_edad=3600):
+        """
+        Args:
+            directorio (str): Carpeta del nivel de disco (se crea si no existe)
+            max_bytes_memoria (int): Bytes máximos en el nivel de memoria
+            max_bytes_disco (int): Bytes máximos en el nivel de disco
+            max_edad (float): Segundos tras los que un render se descarta
+        """
+        self.directorio = directorio
+        self.max_bytes_memoria = max_bytes_memoria
+        self.max_bytes_disco = max_bytes_disco
+        self.max_edad = max_edad
+
+        self._lock = threading.Lock()
+        self._memoria = OrderedDict()   # clave -> (datos, creado)
+        self._bytes_memoria = 0
+        self._disco = OrderedDict()     # clave -> (tamaño, creado), orden LRU
+        self._bytes_disco = 0
+        self._en_curso = {}             # clave -> Future del render en curso
+        self._hashes = {}               # (ruta, tamaño, mtime) -> hash del contenido
+
+        self.aciertos = 0
+        self.fallos = 0
+        self.esperas_compartidas = 0
+
+        os.makedirs(directorio, exist_ok=True)
+        self._cargar_disco()
+
+    # === HUELLA ===
+
+    def huella(self, rutas_entrada, parametros):
+        """
+        Calcula la clave de un render a partir del contenido de sus entradas.
+
+        Args:
+            rutas_entrada (list): Rutas de los ficheros de entrada (en orden)
+            parametros (dict): Parámetros del render serializables a JSON
+
+        Returns:
+            str: Clave hexadecimal de 32 caracteres
+        """
+        h = hashlib.sha256()
+        for ruta in rutas_entrada:
+            h.update(self._hash_entrada(ruta).encode())
+            h.update(b'\0')
+        h.update(json.dumps(parametros, sort_keys=True, ensure_ascii=False).encode('utf-8'))
+        return h.hexdigest()[:32]
+
+    def _hash_entrada(self, ruta):
+        """Hash del contenido de una entrada, memorizado por (ruta, tamaño, mtime)."""
+        info = os.stat(ruta)
+        clave = (ruta, info.st_size, info.st_mtime_ns)
+        with self._lock:
+            valor = self._hashes.get(clave)
+        if valor is None:
+            valor = hash_fichero(ruta)
+            with self._lock:
+                if len(self._hashes) > 4096:
+                    self._hashes.clear()
+                self._hashes[clave] = valor
+        return valor
+
+    # === NIVELES ===
+
+    def _ruta_disco(self, clave):
+        return os.path.join(self.directorio, f"{clave}.bin")
+
+    def _cargar_disco(self):
+        """Reconstruye el índice del nivel de disco a partir del directorio."""
+        entradas = []
+        for nombre in os.listdir(self.directorio):
+            if nombre.endswith('.bin'):
+                try:
+                    info = os.stat(os.path.join(self.directorio, nombre))
+                except OSError:
+                    continue
+                entradas.append((info.st_atime, nombre[:-4], info.st_size, info.st_mtime))
+        for _, clave, tamano, creado in sorted(entradas):
+            self._disco[clave] = (tamano, creado)
+            self._bytes_disco += tamano
+
+    def _adoptar_disco(self, clave):
+        """Añade al índice un render escrito por otro proceso (requiere el lock)."""
+        try:
+            info = os.stat(self._ruta_disco(clave))
+        except OSError:
+            return None
+        self._disco[clave] = (info.st_size, info.st_mtime)
+        self._bytes_disco += info.st_size
+        return self._disco[clave]
+
+    def _sincronizar_disco(self):
+        """
+        Ajusta el índice del disco al directorio: olvida los renders que otro
+        proceso ha borrado y añade los que ha escrito (requiere el lock).
+        """
+        en_disco = {nombre[:-4] for nombre in os.listdir(self.directorio) if nombre.endswith('.bin')}
+        for clave in [c for c in self._disco if c not in en_disco]:
+            self._bytes_disco -= self._disco.pop(clave)[0]
+        for clave in en_disco.difference(self._disco):
+            self._adoptar_disco(clave)
+
+    def _obtener(self, clave):
+        """Busca en memoria y luego en disco (requiere el lock)."""
+        ahora = time.time()
+
+        entrada = self._memoria.get(clave)
+        if entrada is not None:
+            datos, creado = entrada
+            if ahora - creado <= self.max_edad:
+                self._memoria.move_to_end(clave)
+                return datos
+            self._quitar_memoria(clave)
+
+        entrada = self._disco.get(clave) or self._adoptar_disco(clave)
+        if entrada is not None:
+            tamano, creado = entrada
+            if ahora - creado <= self.max_edad:
+                try:
+                    with open(self._ruta_disco(clave), 'rb') as f:
+                        datos = f.read()
+                except OSError:
+                    datos = None
+                if datos is not None:
+                    self._disco.move_to_end(clave)
+                    self._guardar_memoria(clave, datos, creado)
+                    return datos
+            self._quitar_disco(clave)
+
+        return None
+
+    def _guardar_memoria(self, clave, datos, creado):
+        if clave in self._memoria:
+            self._quitar_memoria(clave)
+        if len(datos) > self.max_bytes_memoria:
+            return
+        self._memoria[clave] = (datos, creado)
+        self._bytes_memoria += len(datos)
+        while self._bytes_memoria > self.max_bytes_memoria:
+            self._quitar_memoria(next(iter(self._memoria)))
+
+    def _guardar_disco(self, clave, datos, creado):
+        if len(datos) > self.max_bytes_disco:
+            return
+        ruta = self._ruta_disco(clave)
+        temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporal, 'wb') as f:
+            f.write(datos)
+        os.replace(temporal, ruta)
+
+        if clave in self._disco:
+            self._bytes_disco -= self._disco.pop(clave)[0]
+        self._disco[clave] = (len(datos), creado)
+        self._bytes_disco += len(datos)
+        while self._bytes_disco > self.max_bytes_disco:
+            self._quitar_disco(next(iter(self._disco)))
+
+    def _quitar_memoria(self, clave):
+        datos, _ = self._memoria.pop(clave)
+        self._bytes_memoria -= len(datos)
+
+    def _quitar_disco(self, clave):
+        tamano, _ = self._disco.pop(clave)
+        self._bytes_disco -= tamano
+        try:
+            os.remove(self._ruta_disco(clave))
+        except OSError:
+            pass
+
+    def purgar_caducados(self):
+        """
+        Elimina de ambos niveles los renders más antiguos que max_edad.
+
+        Returns:
+            tuple: (renders eliminados del disco, bytes de disco liberados)
+        """
+        limite = time.time() - self.max_edad
+        with self._lock:
+            self._sincronizar_disco()
+            for clave in [c for c, (_, creado) in self._memoria.items() if creado < limite]:
+                self._quitar_memoria(clave)
+            caducados = [c for c, (_, creado) in self._disco.items() if creado < limite]
+            liberados = sum(self._disco[clave][0] for clave in caducados)
+            for clave in caducados:
+                self._quitar_disco(clave)
+        return len(caducados), liberados
+
+    # === API PÚBLICA ===
+
+    def obtener(self, clave):
+        """
+        Args:
+            clave (str): Clave del render
+
+        Returns:
+            bytes: Render guardado, o None si no está en caché
+        """
+        with self._lock:
+            return self._obtener(clave)
+
+    def contiene(self, clave):
+        """
+        Comprueba si hay un render vigente para la clave sin leer sus bytes
+        (p. ej. para responder 304 o decidir si hay que generarlo).
+
+        Args:
+            clave (str): Clave del render
+
+        Returns:
+            bool: True si obtener(clave) lo devolvería
+        """
+        ahora = time.time()
+        with self._lock:
+            entrada = self._memoria.get(clave)
+            if entrada is not None and ahora - entrada[1] <= self.max_edad:
+                return True
+            entrada = self._disco.get(clave) or self._adoptar_disco(clave)
+            if entrada is None or ahora - entrada[1] > self.max_edad:
+                return False
+            return os.path.exists(self._ruta_disco(clave))
+
+    def obtener_o_generar(self, clave, generar):
+        """
+        Devuelve el render de la clave, generándolo una sola vez si falta.
+
+        Si otra petición ya está generando la misma clave, se espera a su
+        resultado (o a su excepción) en lugar de repetir el render.
+
+        Args:
+            clave (str): Clave del render (ver huella)
+            generar (callable): Función sin argumentos que devuelve los bytes
+
+        Returns:
+            bytes: Render codificado
+        """
+        with self._lock:
+            datos = self._obtener(clave)
+            if datos is not None:
+                self.aciertos += 1
+                return datos
+
+            vuelo = self._en_curso.get(clave)
+            propio = vuelo is None
+            if propio:
+                vuelo = self._en_curso[clave] = Future()
+                self.fallos += 1
+            else:
+                self.esperas_compartidas += 1
+
+        if not propio:
+            return vuelo.result()
+
+        try:
+            datos = generar()
+            with self._lock:
+                creado = time.time()
+                self._guardar_memoria(clave, datos, creado)
+                self._guardar_disco(clave, datos, creado)
+            vuelo.set_result(datos)
+            return datos
+        except BaseException as e:
+            vuelo.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._en_curso.pop(clave, None)
+
+    def estadisticas(self):
+        """
+        Returns:
+            dict: Contadores de aciertos/fallos y ocupación de cada nivel
+        """
+        with self._lock:
+            return {
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'esperas_compartidas': self.esperas_compartidas,
+                'renders_memoria': len(self._memoria),
+                'bytes_memoria': self._bytes_memoria,
+                'renders_disco': len(self._disco),
+                'bytes_disco': self._bytes_disco,
+            }
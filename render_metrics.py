@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Métricas del Pipeline de Renderizado
+====================================
+
+Contadores e histogramas en memoria del proceso para instrumentar el
+pipeline sin depender de la salida por consola:
+
+- medir_etapa('title') mide una etapa (como bloque with o decorador) y la
+  acumula en el histograma thumbnail_stage_seconds{stage="title"}
+- medir_render() cuenta renders, fallos y su duración total
+- Ganchos opcionales (añadir_gancho) reciben cada medición de etapa
+- exportar_prometheus() genera el formato de texto de Prometheus
+- extraer()/combinar() trasladan las métricas de un proceso worker al
+  proceso principal
+- volcar()/combinar_volcados() reúnen las de varios procesos servidor que
+  comparten un directorio
+
+Autor: Desarrollador Senior Python
+Fecha: Agosto 2025
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+import contextlib
+
+
+logger = logging.getLogger(__name__)
+
+# Límites (en segundos) de los buckets de los histogramas de duración
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Métricas conocidas: nombre → (tipo, ayuda)
+DESCRIPCIONES = {
+    'thumbnail_stage_seconds': ('histogram', 'Duración de cada etapa del render'),
+    'thumbnail_render_seconds': ('histogram', 'Duración total de cada render'),
+    'thumbnail_renders_total': ('counter', 'Thumbnails renderizados'),
+    'thumbnail_render_failures_total': ('counter', 'Renders que terminaron con error'),
+    'thumbnail_cache_hits_total': ('counter', 'Aciertos de las cachés de etapas'),
+    'thumbnail_cache_misses_total': ('counter', 'Fallos de las cachés de etapas'),
+    'thumbnail_input_bytes_total': ('counter', 'Bytes de entrada leídos (fondos e iconos)'),
+    'thumbnail_output_bytes_total': ('counter', 'Bytes de salida codificados'),
+}
+
+
+def _clave(nombre, etiquetas):
+    return nombre, tuple(sorted(etiquetas.items()))
+
+
+class RegistroMetricas:
+    """Contadores e histogramas con etiquetas, seguros entre hilos."""
+
+    def __init__(self, buckets=BUCKETS_SEGUNDOS):
+        self.buckets = tuple(buckets)
+        self._contadores = {}       # (nombre, etiquetas) → valor
+        self._histogramas = {}      # (nombre, etiquetas) → [cuentas por bucket..., suma, total]
+        self._lock = threading.Lock()
+
+    def incrementar(self, nombre, valor=1, **etiquetas):
+        """Suma valor al contador nombre{etiquetas}."""
+        clave = _clave(nombre, etiquetas)
+        with self._lock:
+            self._contadores[clave] = self._contadores.get(clave, 0) + valor
+
+    def observar(self, nombre, valor, **etiquetas):
+        """Añade una observación (p. ej. una duración en segundos) al histograma nombre{etiquetas}."""
+        clave = _clave(nombre, etiquetas)
+        with self._lock:
+            datos = self._histogramas.get(clave)
+            if datos is None:
+                datos = self._histogramas[clave] = [0] * len(self.buckets) + [0.0, 0]
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    datos[i] += 1
+            datos[-2] += valor
+            datos[-1] += 1
+
+    def instantanea(self):
+        """
+        Returns:
+            dict: Copia de contadores e histogramas (serializable con pickle)
+        """
+        with self._lock:
+            return {
+                'contadores': dict(self._contadores),
+                'histogramas': {clave: list(datos) for clave, datos in self._histogramas.items()},
+            }
+
+    def extraer(self):
+        """
+        Devuelve las métricas acumuladas y las pone a cero (para enviarlas a
+        otro proceso con combinar sin contarlas dos veces).
+
+        Returns:
+            dict: Ver instantanea
+        """
+        with self._lock:
+            datos = {'contadores': self._contadores, 'histogramas': self._histogramas}
+            self._contadores = {}
+            self._histogramas = {}
+            return datos
+
+    def combinar(self, datos):
+        """Suma a este registro las métricas de instantanea/extraer de otro."""
+        if not datos:
+            return
+        with self._lock:
+            for clave, valor in datos['contadores'].items():
+                self._contadores[clave] = self._contadores.get(clave, 0) + valor
+            for clave, otros in datos['histogramas'].items():
+                propios = self._histogramas.setdefault(clave, [0] * len(self.buckets) + [0.0, 0])
+                for i, valor in enumerate(otros):
+                    propios[i] += valor
+
+    def vaciar(self):
+        with self._lock:
+            self._contadores.clear()
+            self._histogramas.clear()
+
+    def exportar_prometheus(self, adicionales=()):
+        """
+        Genera las métricas en el formato de texto de Prometheus (0.0.4).
+
+        Args:
+            adicionales (iterable): Métricas calculadas en el momento, como
+                tuplas (nombre, tipo, ayuda, [(etiquetas, valor), ...])
+
+        Returns:
+            str: Texto listo para servir con Content-Type
+                'text/plain; version=0.0.4'
+        """
+        datos = self.instantanea()
+
+        por_nombre = {}
+        for (nombre, etiquetas), valor in datos['contadores'].items():
+            por_nombre.setdefault(nombre, []).append((dict(etiquetas), valor))
+
+        lineas = []
+        for nombre in sorted(por_nombre):
+            tipo, ayuda = DESCRIPCIONES.get(nombre, ('counter', nombre))
+            lineas += _cabecera(nombre, tipo, ayuda)
+            for etiquetas, valor in sorted(por_nombre[nombre], key=lambda m: sorted(m[0].items())):
+                lineas.append(f"{nombre}{_etiquetas(etiquetas)} {_numero(valor)}")
+
+        histogramas = {}
+        for (nombre, etiquetas), valores in datos['histogramas'].items():
+            histogramas.setdefault(nombre, []).append((dict(etiquetas), valores))
+
+        for nombre in sorted(histogramas):
+            _, ayuda = DESCRIPCIONES.get(nombre, ('histogram', nombre))
+            lineas += _cabecera(nombre, 'histogram', ayuda)
+            for etiquetas, valores in sorted(histogramas[nombre], key=lambda m: sorted(m[0].items())):
+                for limite, cuenta in zip(self.buckets, valores):
+                    lineas.append(f"{nombre}_bucket{_etiquetas(etiquetas, le=_numero(limite))} {cuenta}")
+                lineas.append(f"{nombre}_bucket{_etiquetas(etiquetas, le='+Inf')} {valores[-1]}")
+                lineas.append(f"{nombre}_sum{_etiquetas(etiquetas)} {_numero(valores[-2])}")
+                lineas.append(f"{nombre}_count{_etiquetas(etiquetas)} {valores[-1]}")
+
+        for nombre, tipo, ayuda, muestras in adicionales:
+            lineas += _cabecera(nombre, tipo, ayuda)
+            for etiquetas, valor in muestras:
+                lineas.append(f"{nombre}{_etiquetas(etiquetas)} {_numero(valor)}")
+
+        return '\n'.join(lineas) + '\n'
+
+
+def _cabecera(nombre, tipo, ayuda):
+    ayuda = ayuda.replace('\\', '\\\\').replace('\n', '\\n')
+    return [f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} {tipo}"]
+
+
+def _etiquetas(etiquetas, **extra):
+    todas = dict(etiquetas, **extra)
+    if not todas:
+        return ''
+    pares = []
+    for clave, valor in todas.items():
+        valor = str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pares.append(f'{clave}="{valor}"')
+    return '{' + ','.join(pares) + '}'
+
+
+def _numero(valor):
+    if isinstance(valor, float):
+        return str(int(valor)) if valor.is_integer() else repr(valor)
+    return str(valor)
+
+
+# Registro del proceso
+METRICAS = RegistroMetricas()
+
+
+def volcar(directorio, adicionales=()):
+    """
+    Escribe las métricas de este proceso en directorio/<pid>.json para que
+    otro proceso las combine con combinar_volcados.
+
+    Args:
+        directorio (str): Carpeta compartida entre los procesos
+        adicionales (iterable): Métricas calculadas del proceso (ver
+            exportar_prometheus)
+    """
+    datos = METRICAS.instantanea()
+    volcado = {
+        'pid': os.getpid(),
+        'contadores': [[nombre, dict(etiquetas), valor]
+                       for (nombre, etiquetas), valor in datos['contadores'].items()],
+        'histogramas': [[nombre, dict(etiquetas), valores]
+                        for (nombre, etiquetas), valores in datos['histogramas'].items()],
+        'adicionales': [list(metrica) for metrica in adicionales],
+    }
+    ruta = os.path.join(directorio, f"{os.getpid()}.json")
+    temporal = f"{ruta}.tmp"
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump(volcado, f)
+    os.replace(temporal, ruta)
+
+
+def _proceso_vivo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass
+    return True
+
+
+def combinar_volcados(directorio):
+    """
+    Suma los contadores e histogramas volcados por todos los procesos (también
+    los que ya han terminado, para que los contadores no retrocedan) y reúne
+    las métricas adicionales de los procesos vivos con la etiqueta pid.
+
+    Args:
+        directorio (str): Carpeta en la que escriben los procesos con volcar
+
+    Returns:
+        tuple: (RegistroMetricas combinado, lista de métricas adicionales)
+    """
+    registro = RegistroMetricas(METRICAS.buckets)
+    adicionales = {}
+
+    for nombre_fichero in sorted(os.listdir(directorio)):
+        if not nombre_fichero.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(directorio, nombre_fichero), 'r', encoding='utf-8') as f:
+                volcado = json.load(f)
+        except (OSError, ValueError):
+            continue
+
+        registro.combinar({
+            'contadores': {_clave(nombre, etiquetas): valor
+                           for nombre, etiquetas, valor in volcado['contadores']},
+            'histogramas': {_clave(nombre, etiquetas): valores
+                            for nombre, etiquetas, valores in volcado['histogramas']},
+        })
+
+        if _proceso_vivo(volcado['pid']):
+            for nombre, tipo, ayuda, muestras in volcado['adicionales']:
+                metrica = adicionales.setdefault(nombre, (nombre, tipo, ayuda, []))
+                metrica[3].extend((dict(etiquetas, pid=volcado['pid']), valor) for etiquetas, valor in muestras)
+
+    return registro, list(adicionales.values())
+
+_ganchos = []
+
+
+def añadir_gancho(funcion):
+    """
+    Registra una función que recibe cada medición de etapa.
+
+    Args:
+        funcion (callable): (etapa, segundos, error) → None; error es la
+            excepción si la etapa falló, o None
+    """
+    _ganchos.append(funcion)
+
+
+def quitar_gancho(funcion):
+    """Elimina un gancho registrado con añadir_gancho."""
+    if funcion in _ganchos:
+        _ganchos.remove(funcion)
+
+
+@contextlib.contextmanager
+def medir_etapa(etapa):
+    """
+    Mide la duración de una etapa del render (bloque with o decorador).
+
+    Args:
+        etapa (str): download, decode, background, title, icons, encode o layers
+    """
+    inicio = time.perf_counter()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        segundos = time.perf_counter() - inicio
+        METRICAS.observar('thumbnail_stage_seconds', segundos, stage=etapa)
+        for gancho in list(_ganchos):
+            try:
+                gancho(etapa, segundos, error)
+            except Exception as e:
+                logger.warning("⚠️  Error en un gancho de métricas: %s", e)
+
+
+@contextlib.contextmanager
+def medir_render(cantidad=1):
+    """
+    Cuenta un render completo (o cantidad, p. ej. varios tamaños a la vez) y
+    su duración; si el bloque lanza una excepción se cuenta como fallo.
+    """
+    inicio = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        METRICAS.incrementar('thumbnail_render_failures_total', cantidad)
+        raise
+    METRICAS.incrementar('thumbnail_renders_total', cantidad)
+    METRICAS.observar('thumbnail_render_seconds', time.perf_counter() - inicio)
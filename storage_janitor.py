@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Mantenimiento del Almacenamiento en Segundo Plano
+=================================================
+
+Ejecuta periódicamente, en un hilo aparte, las tareas de limpieza de los
+almacenes de la aplicación web (subidas, renders...) en lugar de hacerlo en
+el hilo de una petición:
+
+- Cada tarea aplica su propia edad máxima y cuota de bytes
+- Se acumulan contadores de pasadas, expulsiones y bytes recuperados
+- Un fallo en una tarea se registra y no detiene al resto
+
+Autor: Desarrollador Senior Python
+Fecha: Agosto 2025
+"""
+
+import time
+import logging
+import threading
+
+
+logger = logging.getLogger(__name__)
+
+
+class ConserjeAlmacenamiento:
+    """Hilo de mantenimiento que ejecuta tareas de limpieza cada cierto intervalo."""
+
+    def __init__(self, intervalo=60):
+        """
+        Args:
+            intervalo (float): Segundos entre pasadas de mantenimiento
+        """
+        self.intervalo = intervalo
+
+        self._tareas = []               # (nombre, función)
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+        self._hilo = None
+
+        self.pasadas = 0
+        self.errores = 0
+        self.ultima_pasada = None
+        self.duracion_ultima_pasada = 0.0
+        self._por_tarea = {}            # nombre -> {'expulsiones', 'bytes_recuperados'}
+
+    def registrar(self, nombre, funcion):
+        """
+        Añade una tarea de limpieza.
+
+        Args:
+            nombre (str): Nombre de la tarea (para los contadores)
+            funcion (callable): Función sin argumentos que devuelve
+                (elementos expulsados, bytes liberados)
+        """
+        with self._lock:
+            self._tareas.append((nombre, funcion))
+            self._por_tarea[nombre] = {'expulsiones': 0, 'bytes_recuperados': 0}
+
+    def ejecutar(self):
+        """Ejecuta una pasada de todas las tareas en el hilo actual."""
+        inicio = time.time()
+        with self._lock:
+            tareas = list(self._tareas)
+
+        for nombre, funcion in tareas:
+            try:
+                expulsados, liberados = funcion()
+            except Exception as e:
+                logger.warning(f"⚠️  Error en el mantenimiento '{nombre}': {e}")
+                with self._lock:
+                    self.errores += 1
+                continue
+
+            with self._lock:
+                contadores = self._por_tarea[nombre]
+                contadores['expulsiones'] += expulsados
+                contadores['bytes_recuperados'] += liberados
+
+        with self._lock:
+            self.pasadas += 1
+            self.ultima_pasada = time.time()
+            self.duracion_ultima_pasada = self.ultima_pasada - inicio
+
+    def _bucle(self):
+        while not self._detener.wait(self.intervalo):
+            self.ejecutar()
+
+    def iniciar(self):
+        """Arranca el hilo de mantenimiento (si no estaba ya en marcha)."""
+        with self._lock:
+            if self._hilo is not None:
+                return
+            self._detener.clear()
+            self._hilo = threading.Thread(target=self._bucle, name='mantenimiento', daemon=True)
+            self._hilo.start()
+
+    def detener(self):
+        """Detiene el hilo de mantenimiento y espera a que termine."""
+        with self._lock:
+            hilo, self._hilo = self._hilo, None
+        if hilo is not None:
+            self._detener.set()
+            hilo.join()
+
+    def estadisticas(self):
+        """
+        Returns:
+            dict: Pasadas, errores, duración de la última pasada y, por tarea,
+                expulsiones y bytes recuperados
+        """
+        with self._lock:
+            return {
+                'pasadas': self.pasadas,
+                'errores': self.errores,
+                'ultima_pasada': self.ultima_pasada,
+                'duracion_ultima_pasada_ms': int(self.duracion_ultima_pasada * 1000),
+                'expulsiones': sum(c['expulsiones'] for c in self._por_tarea.values()),
+                'bytes_recuperados': sum(c['bytes_recuperados'] for c in self._por_tarea.values()),
+                'tareas': {nombre: dict(c) for nombre, c in self._por_tarea.items()},
+            }
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pruebas del almacén de subidas
+==============================
+
+- Subir el mismo contenido dos veces guarda un solo objeto (y calcula sus
+  derivados una vez), con una referencia por subida
+- mantener() borra los objetos sin referencias vigentes y expulsa por cuota
+
+Varias instancias de AlmacenSubidas sobre el mismo directorio hacen de
+procesos servidor que lo comparten:
+
+- La expulsión por cuota empieza por los objetos usados hace más tiempo,
+  también cuando el uso lo ha hecho otro proceso
+- Releer el índice escrito por otro proceso no pierde los accesos propios
+
+Autor: Desarrollador Senior Python
+Fecha: Agosto 2025
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from upload_store import AlmacenSubidas
+
+
+TAMANO = 1000
+
+
+def _datos(n):
+    return bytes([n]) * TAMANO
+
+
+class PruebasAlmacenSubidas(unittest.TestCase):
+
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directorio, ignore_errors=True)
+
+    def test_mismo_contenido_un_objeto(self):
+        almacen = AlmacenSubidas(self.directorio)
+        calculados = []
+
+        def derivado(datos):
+            calculados.append(datos)
+            return datos[:10]
+
+        primera = almacen.guardar(_datos(1), 'PNG', {'fondo': derivado})
+        segunda = almacen.guardar(_datos(1), 'png', {'fondo': derivado})
+
+        self.assertEqual(primera, segunda)
+        self.assertEqual(len(calculados), 1)
+        estadisticas = almacen.estadisticas()
+        self.assertEqual((estadisticas['objetos'], estadisticas['referencias']), (1, 2))
+        self.assertEqual(estadisticas['bytes'], TAMANO + 10)
+        self.assertEqual((estadisticas['subidas'], estadisticas['duplicadas']), (2, 1))
+        self.assertTrue(almacen.ruta(primera, 'fondo').endswith('.fondo'))
+
+    def test_mantener_por_edad_y_por_cuota(self):
+        almacen = AlmacenSubidas(self.directorio)
+        claves = [almacen.guardar(_datos(n), 'png') for n in range(3)]
+
+        # Dentro de la cuota no se expulsa nada
+        self.assertEqual(almacen.mantener(3600, max_bytes=3 * TAMANO), (0, 0))
+
+        self.assertEqual(almacen.mantener(3600, max_bytes=2 * TAMANO), (1, TAMANO))
+        self.assertIsNone(almacen.ruta(claves[0]))
+        self.assertEqual(almacen.estadisticas()['bytes'], 2 * TAMANO)
+
+        # Referencias caducadas: se borra todo
+        self.assertEqual(almacen.mantener(-1), (2, 2 * TAMANO))
+        self.assertEqual(almacen.estadisticas()['objetos'], 0)
+
+    def test_cuota_expulsa_el_menos_usado_por_cualquier_proceso(self):
+        conserje = AlmacenSubidas(self.directorio)
+        servidor = AlmacenSubidas(self.directorio, intervalo_acceso=0)
+        antigua = conserje.guardar(_datos(1), 'png')
+        reciente = conserje.guardar(_datos(2), 'png')
+
+        # La subida más antigua es la que está en uso, en otro proceso
+        self.assertIsNotNone(servidor.ruta(antigua))
+        conserje.mantener(3600, max_bytes=TAMANO)
+
+        self.assertIsNotNone(conserje.ruta(antigua))
+        self.assertIsNone(conserje.ruta(reciente))
+
+    def test_recarga_conserva_los_accesos_propios(self):
+        almacen = AlmacenSubidas(self.directorio)
+        otro = AlmacenSubidas(self.directorio)
+        antigua = almacen.guardar(_datos(1), 'png')
+        reciente = almacen.guardar(_datos(2), 'png')
+
+        # Acceso solo en memoria (dentro del intervalo); el otro proceso
+        # reescribe después el índice con una subida nueva
+        self.assertIsNotNone(almacen.ruta(antigua))
+        otro.guardar(_datos(3), 'png')
+        almacen.mantener(3600, max_bytes=2 * TAMANO)
+
+        self.assertIsNotNone(almacen.ruta(antigua))
+        self.assertIsNone(almacen.ruta(reciente))
+
+
+if __name__ == '__main__':
+    unittest.main()
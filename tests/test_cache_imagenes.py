@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pruebas de la caché de imágenes remotas
+=======================================
+
+Ejercita CacheImagenesRemotas contra un servidor HTTP local con ETag:
+
+- Dentro del periodo de frescura no se hace ninguna petición
+- Una revalidación con 304 reutiliza el cuerpo guardado
+- Si la revalidación falla se sirve la copia guardada (y sin copia, el
+  error se propaga)
+
+Autor: Desarrollador Senior Python
+Fecha: Agosto 2025
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import unittest
+import http.server
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from image_cache import CacheImagenesRemotas
+
+
+CUERPO = b'\x89PNG contenido de prueba'
+ETAG = '"v1"'
+
+
+class _Manejador(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        servidor = self.server
+        servidor.peticiones.append(self.headers.get('If-None-Match'))
+        if servidor.fallar:
+            self.responder(500)
+        elif self.headers.get('If-None-Match') == ETAG:
+            self.responder(304)
+        else:
+            self.responder(200, CUERPO)
+
+    def responder(self, estado, cuerpo=b''):
+        self.send_response(estado)
+        self.send_header('ETag', ETAG)
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, formato, *args):
+        pass
+
+
+class PruebasCacheImagenes(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.servidor = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _Manejador)
+        cls.servidor.daemon_threads = True
+        threading.Thread(target=cls.servidor.serve_forever, daemon=True).start()
+        cls.url = f"http://127.0.0.1:{cls.servidor.server_port}/icono.png"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.servidor.shutdown()
+        cls.servidor.server_close()
+
+    def setUp(self):
+        self.servidor.peticiones = []
+        self.servidor.fallar = False
+        self.directorio = tempfile.mkdtemp()
+        self.sesion = requests.Session()
+
+    def tearDown(self):
+        self.sesion.close()
+        shutil.rmtree(self.directorio, ignore_errors=True)
+
+    def test_fresca_sin_peticion(self):
+        cache = CacheImagenesRemotas(self.directorio)
+        self.assertEqual(cache.obtener(self.url, self.sesion), CUERPO)
+        self.assertEqual(cache.obtener(self.url, self.sesion), CUERPO)
+
+        self.assertEqual(len(self.servidor.peticiones), 1)
+
+    def test_revalidacion_304_reutiliza_cuerpo(self):
+        cache = CacheImagenesRemotas(self.directorio, frescura=0)
+        cache.obtener(self.url, self.sesion)
+
+        # Otra instancia (otro proceso) revalida con el ETag guardado
+        otra = CacheImagenesRemotas(self.directorio, frescura=0)
+        self.assertEqual(otra.obtener(self.url, self.sesion), CUERPO)
+
+        self.assertEqual(self.servidor.peticiones, [None, ETAG])
+        self.assertEqual(otra.estadisticas()['objetos'], 1)
+
+    def test_revalidacion_fallida_sirve_copia(self):
+        cache = CacheImagenesRemotas(self.directorio, frescura=0)
+        cache.obtener(self.url, self.sesion)
+
+        self.servidor.fallar = True
+        self.assertEqual(cache.obtener(self.url, self.sesion), CUERPO)
+
+        # Sin copia guardada el error llega a quien llama
+        with self.assertRaises(requests.exceptions.HTTPError):
+            cache.obtener(f"{self.url}?otra", self.sesion)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pruebas de la caché de renders
+==============================
+
+- Varias peticiones simultáneas de la misma clave ejecutan el render una
+  sola vez (single-flight), también cuando falla
+- contiene() responde sin leer los bytes, también para renders que solo
+  están en disco o que ha escrito otro proceso, y no da por vigentes los
+  caducados
+
+Autor: Desarrollador Senior Python
+Fecha: Agosto 2025
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import time
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from render_cache import CacheRenders
+
+
+PETICIONES = 8
+
+
+class PruebasCacheRenders(unittest.TestCase):
+
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        self.cache = CacheRenders(self.directorio)
+
+    def tearDown(self):
+        shutil.rmtree(self.directorio, ignore_errors=True)
+
+    def simultaneas(self, generar):
+        """Lanza PETICIONES llamadas a la vez y deja terminar el render cuando todas esperan."""
+        liberar = threading.Event()
+        llamadas = []
+
+        def render():
+            llamadas.append(1)
+            liberar.wait(10)
+            return generar()
+
+        with ThreadPoolExecutor(PETICIONES) as pool:
+            futuros = [pool.submit(self.cache.obtener_o_generar, 'clave', render) for _ in range(PETICIONES)]
+            while self.cache.esperas_compartidas < PETICIONES - 1 and not futuros[0].done():
+                time.sleep(0.01)
+            liberar.set()
+            resultados = []
+            for futuro in futuros:
+                try:
+                    resultados.append(futuro.result(timeout=10))
+                except Exception as e:
+                    resultados.append(e)
+        return len(llamadas), resultados
+
+    def test_un_solo_render_por_clave(self):
+        llamadas, resultados = self.simultaneas(lambda: b'render')
+
+        self.assertEqual(llamadas, 1)
+        self.assertEqual(resultados, [b'render'] * PETICIONES)
+        self.assertEqual(self.cache.esperas_compartidas, PETICIONES - 1)
+
+    def test_error_compartido_y_reintento(self):
+        def fallar():
+            raise RuntimeError('render roto')
+
+        llamadas, resultados = self.simultaneas(fallar)
+        self.assertEqual(llamadas, 1)
+        self.assertTrue(all(isinstance(resultado, RuntimeError) for resultado in resultados))
+
+        # El fallo no se guarda: la siguiente petición vuelve a renderizar
+        self.assertEqual(self.cache.obtener_o_generar('clave', lambda: b'bien'), b'bien')
+
+    def test_contiene(self):
+        self.assertFalse(self.cache.contiene('a'))
+        self.cache.obtener_o_generar('a', lambda: b'render')
+        self.assertTrue(self.cache.contiene('a'))
+
+        # Escrito por otro proceso: solo está en disco
+        otro = CacheRenders(self.directorio)
+        self.cache.obtener_o_generar('b', lambda: b'otro render')
+        self.assertTrue(otro.contiene('b'))
+
+        # Caducado
+        otro.max_edad = -1
+        self.assertFalse(otro.contiene('a'))
+
+
+if __name__ == '__main__':
+    unittest.main()
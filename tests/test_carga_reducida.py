@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pruebas de la reducción al cargar
+=================================
+
+- Las imágenes que superan el presupuesto de píxeles se rechazan con solo
+  leer la cabecera, sin decodificarlas
+- Un JPEG grande se decodifica escalado (draft) y un PNG grande se reduce
+  con reduce(), quedando entre el tamaño pedido y el doble
+
+Autor: Desarrollador Senior Python
+Fecha: Agosto 2025
+"""
+
+import os
+import sys
+import zlib
+import struct
+import unittest
+from io import BytesIO
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import generate_thumbnail as gt
+
+
+def _cabecera_png(ancho, alto):
+    """PNG con solo la cabecera (IHDR) y sin datos de píxeles."""
+    def bloque(tipo, datos):
+        return struct.pack('>I', len(datos)) + tipo + datos + struct.pack('>I', zlib.crc32(tipo + datos))
+    ihdr = struct.pack('>IIBBBBB', ancho, alto, 8, 2, 0, 0, 0)
+    return b'\x89PNG\r\n\x1a\n' + bloque(b'IHDR', ihdr) + bloque(b'IEND', b'')
+
+
+def _codificar(imagen, formato):
+    buffer = BytesIO()
+    imagen.save(buffer, formato)
+    return buffer.getvalue()
+
+
+class PruebasCargaReducida(unittest.TestCase):
+
+    def test_rechaza_antes_de_decodificar(self):
+        # 63 MP: por encima del presupuesto, por debajo del aviso de Pillow
+        datos = _cabecera_png(9000, 7000)
+        self.assertGreater(9000 * 7000, gt.MAX_PIXELES_ENTRADA)
+
+        # Sin datos de píxeles: decodificar fallaría con otro error
+        with self.assertRaisesRegex(ValueError, 'demasiado grande'):
+            gt.abrir_entrada(datos, (1920, 1080))
+
+    def test_presupuesto_configurable(self):
+        datos = _codificar(Image.new('RGB', (200, 100)), 'PNG')
+
+        with self.assertRaisesRegex(ValueError, 'demasiado grande'):
+            gt.abrir_entrada(datos, max_pixeles=10_000)
+        self.assertEqual(gt.abrir_entrada(datos, max_pixeles=None).size, (200, 100))
+
+    def test_jpeg_grande_reducido_con_draft(self):
+        datos = _codificar(Image.new('RGB', (6000, 4000), (120, 80, 40)), 'JPEG')
+
+        fondo = gt.abrir_entrada(datos, (1920, 1080), ajuste='cubrir')
+        self.assertEqual(fondo.size, (3000, 2000))
+
+        icono = gt.abrir_entrada(datos, (384, 384), ajuste='contener')
+        self.assertGreaterEqual(icono.width, 384)
+        self.assertLess(icono.width, 2 * 384)
+        self.assertEqual(icono.mode, 'RGB')
+
+    def test_png_grande_reducido(self):
+        datos = _codificar(Image.new('RGBA', (4000, 4000), (30, 120, 220, 200)), 'PNG')
+
+        icono = gt.abrir_entrada(datos, (384, 384), ajuste='contener')
+
+        self.assertEqual(icono.size, (400, 400))
+        self.assertEqual(icono.mode, 'RGBA')
+
+
+if __name__ == '__main__':
+    unittest.main()
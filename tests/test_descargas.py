@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pruebas de las descargas HTTP
+=============================
+
+Ejercita el descargador contra un servidor HTTP local (sin red externa),
+sustituyendo la sesión compartida con configurar_sesion_http:
+
+- Los iconos que fallan (404) se omiten sin abortar el resto
+- La espera de los iconos tiene un límite total, no uno por icono
+- La sesión compartida reutiliza conexiones y no abre más de
+  CONEXIONES_POR_HOST a la vez contra un mismo host
+- Un render con fondo e iconos remotos termina de principio a fin
+
+Autor: Desarrollador Senior Python
+Fecha: Agosto 2025
+"""
+
+import os
+import sys
+import time
+import threading
+import unittest
+import http.server
+from io import BytesIO
+from urllib.parse import urlsplit
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import generate_thumbnail as gt
+
+
+def _png(tamano, color):
+    buffer = BytesIO()
+    Image.new('RGBA', tamano, color).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+# Contenido servido por ruta
+RECURSOS = {
+    '/fondo.png': _png((800, 450), (40, 90, 160, 255)),
+    '/icono_a.png': _png((300, 300), (220, 30, 30, 255)),
+    '/icono_b.png': _png((200, 100), (30, 200, 30, 180)),
+}
+RETARDO_LENTO = 1.5     # Segundos que tarda en responder /lento.png
+
+
+class _Manejador(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'     # Keep-alive: conexiones reutilizables
+
+    def do_GET(self):
+        self.server.conexiones.add(self.client_address)
+        ruta = urlsplit(self.path).path
+        if ruta == '/lento.png':
+            time.sleep(RETARDO_LENTO)
+            datos = RECURSOS['/icono_a.png']
+        else:
+            datos = RECURSOS.get(ruta)
+
+        if datos is None:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/png')
+        self.send_header('Content-Length', str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def log_message(self, formato, *args):
+        pass
+
+
+class PruebasDescargas(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.servidor = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _Manejador)
+        cls.servidor.daemon_threads = True
+        cls.servidor.conexiones = set()
+        threading.Thread(target=cls.servidor.serve_forever, daemon=True).start()
+        cls.base = f"http://127.0.0.1:{cls.servidor.server_port}"
+
+        # Sin caché en disco: cada prueba descarga de verdad del servidor local
+        cls.cache_anterior = (gt._cache_remoto, gt._cache_remoto_configurado)
+        gt.configurar_cache_remoto(None)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.servidor.shutdown()
+        cls.servidor.server_close()
+        gt._cache_remoto, gt._cache_remoto_configurado = cls.cache_anterior
+        gt.configurar_sesion_http(None)
+
+    def setUp(self):
+        # Sesión nueva (mismo pool que la compartida) para contar sus conexiones
+        gt.configurar_sesion_http(None)
+        gt.CACHE_ICONOS.vaciar()
+        self.servidor.conexiones.clear()
+
+    def test_icono_fallido_se_omite(self):
+        iconos = gt.procesar_iconos([
+            f"{self.base}/icono_a.png", f"{self.base}/no_existe.png", f"{self.base}/icono_b.png",
+        ], gt.ANCHO_MAX_ICONO)
+
+        self.assertEqual([icono.size for icono in iconos], [(300, 300), (200, 100)])
+
+    def test_limite_total_de_espera(self):
+        descargas = gt.iniciar_descarga_iconos(
+            [f"{self.base}/lento.png?{i}" for i in range(4)], gt.ANCHO_MAX_ICONO
+        )
+        inicio = time.monotonic()
+        iconos = gt.recoger_iconos(descargas, timeout=0.3)
+        transcurrido = time.monotonic() - inicio
+
+        self.assertEqual(iconos, [])
+        # Un límite por icono esperaría 4 × 0.3 s
+        self.assertLess(transcurrido, 0.8)
+
+    def test_sesion_reutiliza_conexiones(self):
+        urls = [f"{self.base}/icono_a.png?{i}" for i in range(12)]
+        futuros = [gt.obtener_pool_descargas().submit(gt.descargar_bytes, url) for url in urls]
+        for futuro in futuros:
+            self.assertEqual(futuro.result(timeout=10), RECURSOS['/icono_a.png'])
+
+        self.assertLessEqual(len(self.servidor.conexiones), gt.CONEXIONES_POR_HOST)
+
+    def test_render_remoto_completo(self):
+        imagen = gt.renderizar_thumbnail(
+            f"{self.base}/fondo.png", 'Hola', [f"{self.base}/icono_a.png", f"{self.base}/no_existe.png"]
+        )
+
+        self.assertEqual(imagen.size, (gt.ANCHO_REFERENCIA, gt.ALTO_REFERENCIA))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pruebas del modo rápido de fondo
+================================
+
+El modo rápido (desenfoque a resolución reducida, el de la aplicación web)
+debe quedar dentro del umbral medido frente al modo completo, documentado
+junto a FACTOR_FONDO_RAPIDO, con imágenes sintéticas de alta frecuencia:
+
+- Ruido de banda ancha, reducido (más grande que el lienzo) y ampliado
+  (más pequeño)
+- Degradados con ruido, como una foto de tamaño de cámara
+
+Autor: Desarrollador Senior Python
+Fecha: Agosto 2025
+"""
+
+import os
+import sys
+import random
+import unittest
+from PIL import Image, ImageChops, ImageStat
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import generate_thumbnail as gt
+
+
+# Umbral frente al modo completo (niveles de 0-255 por canal)
+MAX_ERROR_MEDIO = 0.4
+MAX_ERROR = 20
+
+
+def _ruido(ancho, alto, semilla):
+    """Ruido RGB uniforme (determinista)."""
+    return Image.frombytes('RGB', (ancho, alto), random.Random(semilla).randbytes(ancho * alto * 3))
+
+
+def _degradado_con_ruido(ancho, alto, semilla):
+    """Degradados lineal y radial mezclados con ruido."""
+    lineal = Image.linear_gradient('L').resize((ancho, alto))
+    radial = Image.radial_gradient('L').resize((ancho, alto))
+    degradado = Image.merge('RGB', (lineal, radial, ImageChops.invert(lineal)))
+    return Image.blend(degradado, _ruido(ancho, alto, semilla), 0.5)
+
+
+class PruebasFondoRapido(unittest.TestCase):
+
+    def comparar(self, imagen):
+        completo = gt.procesar_imagen_base(imagen)
+        rapido = gt.procesar_imagen_base(imagen, rapido=True)
+
+        self.assertEqual(rapido.size, completo.size)
+        diferencia = ImageChops.difference(rapido, completo)
+        maximo = max(extremos[1] for extremos in diferencia.getextrema())
+        medio = sum(ImageStat.Stat(diferencia).mean) / 3
+        self.assertLess(maximo, MAX_ERROR)
+        self.assertLess(medio, MAX_ERROR_MEDIO)
+
+    def test_ruido_reducido(self):
+        self.comparar(_ruido(3000, 2000, 1))
+
+    def test_ruido_ampliado(self):
+        self.comparar(_ruido(1000, 700, 3))
+
+    def test_degradado_con_ruido(self):
+        self.comparar(_degradado_con_ruido(4000, 3000, 5))
+
+
+if __name__ == '__main__':
+    unittest.main()
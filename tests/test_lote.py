@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pruebas del modo por lotes
+==========================
+
+- La extensión de la salida del manifiesto la pone el formato del lote
+- Al reanudar, una fila solo se omite si existen todas sus salidas
+- generar_thumbnail registra los errores y devuelve None (como siempre),
+  pero el lote los cuenta como fallos
+
+Autor: Desarrollador Senior Python
+Fecha: Agosto 2025
+"""
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import generate_thumbnail as gt
+
+
+class PruebasLote(unittest.TestCase):
+
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directorio, ignore_errors=True)
+
+    def ruta(self, nombre):
+        return os.path.join(self.directorio, nombre)
+
+    def test_quita_extensiones_de_formato(self):
+        manifiesto = self.ruta('lote.jsonl')
+        with open(manifiesto, 'w', encoding='utf-8') as f:
+            for salida in ('a.png', 'b.JPG', 'c.jpeg', 'd.webp', 'e.v2', 'f'):
+                f.write(json.dumps({'background': 'x.jpg', 'title': 't', 'output': salida}) + '\n')
+
+        salidas = [fila['output'] for fila in gt.cargar_manifiesto(manifiesto)]
+
+        self.assertEqual(salidas, ['a', 'b', 'c', 'd', 'e.v2', 'f'])
+
+    def test_reanudar_comprueba_todas_las_salidas(self):
+        fondo = self.ruta('fondo.png')
+        Image.new('RGB', (320, 180), (40, 90, 160)).save(fondo)
+        fila = {'background': fondo, 'title': 'Capas', 'icons': [], 'output': self.ruta('hecho')}
+        Image.new('RGB', (8, 8)).save(self.ruta('hecho.jpg'))
+
+        resumen = gt.generar_lote([fila], procesos=1, formato='jpeg')
+        self.assertEqual((resumen['omitidos'], resumen['generados']), (1, 0))
+
+        # Con capas falta el .ora: hay que volver a generarla
+        resumen = gt.generar_lote([fila], procesos=1, formato='jpeg', capas=True)
+        self.assertEqual((resumen['omitidos'], resumen['generados']), (0, 1))
+        self.assertTrue(os.path.exists(self.ruta('hecho.ora')))
+
+    def test_errores_sin_propagar_pero_contados(self):
+        fila = {'background': self.ruta('no_existe.png'), 'title': 'Error', 'icons': [],
+                'output': self.ruta('fallida')}
+
+        self.assertIsNone(gt.generar_thumbnail(fila['background'], fila['title'], [], fila['output']))
+
+        resumen = gt.generar_lote([fila], procesos=1)
+        self.assertEqual(resumen['generados'], 0)
+        self.assertEqual([salida for salida, _ in resumen['fallos']], [fila['output']])
+
+
+if __name__ == '__main__':
+    unittest.main()
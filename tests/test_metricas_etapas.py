@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pruebas de las métricas por etapa
+=================================
+
+- Cada etapa se mide en un único sitio: un render con varios iconos deja
+  una sola muestra de 'icons', y la decodificación de los iconos cuenta
+  como 'decode'
+
+Autor: Desarrollador Senior Python
+Fecha: Agosto 2025
+"""
+
+import os
+import sys
+import unittest
+from collections import Counter
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import generate_thumbnail as gt
+from render_metrics import añadir_gancho, quitar_gancho
+
+
+class PruebasMetricasEtapas(unittest.TestCase):
+
+    def setUp(self):
+        self.etapas = Counter()
+        self.gancho = lambda etapa, segundos, error: self.etapas.update([etapa])
+        añadir_gancho(self.gancho)
+        for cache in (gt.CACHE_FONDOS, gt.CACHE_ICONOS, gt.CACHE_SPRITES_ICONOS, gt.CACHE_CAPAS_ICONOS):
+            cache.vaciar()
+
+    def tearDown(self):
+        quitar_gancho(self.gancho)
+
+    def test_una_muestra_de_iconos_por_render(self):
+        iconos = [Image.new('RGBA', (300, 300), (200, 30, 30, 255)) for _ in range(3)]
+        gt.renderizar_thumbnail(Image.new('RGB', (800, 450), (40, 90, 160)), 'Etapas', iconos)
+
+        self.assertEqual(self.etapas['icons'], 1)
+        self.assertEqual(self.etapas['background'], 1)
+        self.assertEqual(self.etapas['title'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
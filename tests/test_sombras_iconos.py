@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pruebas de las sombras de iconos
+================================
+
+Compara el motor de sombras de iconos (banda alpha, sprites ya desenfocados)
+con el bucle original de getpixel/putpixel, que se conserva aquí como
+referencia:
+
+- crear_sombra_icono produce exactamente el mismo alpha que el bucle
+- añadir_iconos queda dentro de una tolerancia de píxel frente al render
+  original (redondeos del desenfoque por sprite y de la composición)
+
+Autor: Desarrollador Senior Python
+Fecha: Agosto 2025
+"""
+
+import os
+import sys
+import unittest
+from PIL import Image, ImageChops, ImageDraw, ImageFilter, ImageStat
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import generate_thumbnail as gt
+
+
+# Tolerancia frente al render original (niveles de 0-255 por canal)
+MAX_DIFERENCIA = 4
+MAX_DIFERENCIA_MEDIA = 0.05
+
+
+def _icono_prueba(tamano, color, semilla):
+    """Icono RGBA con bordes suavizados y zonas semitransparentes."""
+    grande = Image.new('RGBA', (tamano * 4, tamano * 4), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(grande)
+    draw.ellipse((8, 8, tamano * 4 - 8, tamano * 4 - 8), fill=color + (255,))
+    draw.rectangle((tamano, tamano, tamano * 3, tamano * 3), fill=(255, 255, 255, 90 + semilla * 40))
+    return grande.resize((tamano, tamano), Image.Resampling.LANCZOS)
+
+
+def _fondo_prueba(ancho, alto):
+    """Fondo opaco con gradientes (determinista)."""
+    lineal = Image.linear_gradient('L').resize((ancho, alto))
+    radial = Image.radial_gradient('L').resize((ancho, alto))
+    return Image.merge('RGB', (lineal, radial, ImageChops.invert(lineal)))
+
+
+def _sombra_referencia(icono, opacidad):
+    """Alpha de la sombra con el bucle original de getpixel."""
+    alpha = Image.new('L', icono.size, 0)
+    for y in range(icono.height):
+        for x in range(icono.width):
+            r, g, b, a = icono.getpixel((x, y))
+            if a > 0:
+                alpha.putpixel((x, y), int(opacidad * (a / 255)))
+    return alpha
+
+
+def _añadir_iconos_referencia(imagen, iconos, ancho=1920, alto=1080):
+    """añadir_iconos original (lienzo de 1920x1080, sombras con getpixel)."""
+    img_final = imagen.copy().convert('RGBA')
+
+    if len(iconos) == 1:
+        tamano_max_icono = int(ancho * 0.18)
+    elif len(iconos) <= 3:
+        tamano_max_icono = int(ancho * 0.14)
+    else:
+        tamano_max_icono = int(ancho * 0.10)
+    tamano_max_icono = max(100, min(tamano_max_icono, 250))
+
+    iconos_redimensionados = []
+    for icono in iconos:
+        ratio = min(tamano_max_icono / icono.width, tamano_max_icono / icono.height)
+        nuevo_ancho = int(icono.width * ratio)
+        nuevo_alto = int(icono.height * ratio)
+        iconos_redimensionados.append(icono.resize((nuevo_ancho, nuevo_alto), Image.Resampling.LANCZOS))
+
+    espaciado_base = max(15, int(ancho * 0.015))
+    ancho_total_iconos = sum(icono.width for icono in iconos_redimensionados)
+    ancho_total_con_espacios = ancho_total_iconos + (espaciado_base * (len(iconos_redimensionados) - 1))
+    if ancho_total_con_espacios > ancho * 0.9:
+        espaciado = max(10, int((ancho * 0.9 - ancho_total_iconos) / (len(iconos_redimensionados) - 1)))
+        ancho_total_con_espacios = ancho_total_iconos + (espaciado * (len(iconos_redimensionados) - 1))
+    else:
+        espaciado = espaciado_base
+
+    x_inicial = max(0, (ancho - ancho_total_con_espacios) // 2)
+    alto_max_icono = max(icono.height for icono in iconos_redimensionados)
+    y_iconos = min(int(alto * 0.68), alto - alto_max_icono - 20)
+
+    x_actual = x_inicial
+    for icono in iconos_redimensionados:
+        y_centrado = y_iconos + (alto_max_icono - icono.height) // 2
+        if x_actual + icono.width <= ancho and y_centrado + icono.height <= alto:
+            opacidad_sombra = int(255 * 0.85)
+            for desplazamiento in [12, 9, 6]:
+                temp_sombra_icono = Image.new('RGBA', (ancho, alto), (0, 0, 0, 0))
+                for y in range(icono.height):
+                    for x in range(icono.width):
+                        r, g, b, a = icono.getpixel((x, y))
+                        if a > 0:
+                            sombra_x = x_actual + x + desplazamiento
+                            sombra_y = y_centrado + y + desplazamiento
+                            if 0 <= sombra_x < ancho and 0 <= sombra_y < alto:
+                                alpha_capa = int(opacidad_sombra * (desplazamiento / 12) * (a / 255))
+                                temp_sombra_icono.putpixel((sombra_x, sombra_y), (0, 0, 0, alpha_capa))
+                blur_nivel = int(40 * (desplazamiento / 12))
+                temp_sombra_icono = temp_sombra_icono.filter(ImageFilter.GaussianBlur(radius=blur_nivel))
+                img_final = Image.alpha_composite(img_final, temp_sombra_icono)
+        x_actual += icono.width + espaciado
+
+    x_actual = x_inicial
+    for icono in iconos_redimensionados:
+        y_centrado = y_iconos + (alto_max_icono - icono.height) // 2
+        if x_actual + icono.width <= ancho and y_centrado + icono.height <= alto:
+            img_final.paste(icono, (x_actual, y_centrado), icono)
+        x_actual += icono.width + espaciado
+
+    return img_final.convert('RGB')
+
+
+class PruebasSombrasIconos(unittest.TestCase):
+
+    def setUp(self):
+        gt.CACHE_SPRITES_ICONOS.vaciar()
+
+    def comparar(self, iconos):
+        fondo = _fondo_prueba(gt.ANCHO_REFERENCIA, gt.ALTO_REFERENCIA)
+        esperado = _añadir_iconos_referencia(fondo, iconos)
+        obtenido = gt.añadir_iconos(fondo, iconos)
+
+        self.assertEqual(obtenido.size, esperado.size)
+        diferencia = ImageChops.difference(obtenido.convert('RGB'), esperado)
+        maxima = max(extremos[1] for extremos in diferencia.getextrema())
+        media = sum(ImageStat.Stat(diferencia).mean) / 3
+        self.assertLessEqual(maxima, MAX_DIFERENCIA)
+        self.assertLessEqual(media, MAX_DIFERENCIA_MEDIA)
+
+    def test_alpha_igual_al_bucle_original(self):
+        icono = _icono_prueba(120, (200, 30, 40), 1)
+        for opacidad in (217, 217 * 0.75, 217 * 0.5, 0, 255):
+            esperado = _sombra_referencia(icono, opacidad)
+            obtenido = gt.crear_sombra_icono(icono, opacidad)
+            self.assertEqual(obtenido.mode, 'L')
+            self.assertIsNone(ImageChops.difference(obtenido, esperado).getbbox())
+
+    def test_un_icono(self):
+        # Al tamaño final (250px): la comparación no depende del redimensionado
+        self.comparar([_icono_prueba(250, (30, 120, 220), 0)])
+
+    def test_varios_iconos(self):
+        self.comparar([
+            _icono_prueba(250, (30, 120, 220), 0),
+            _icono_prueba(250, (240, 180, 20), 1),
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
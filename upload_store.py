@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Almacén de Subidas por Contenido
+================================
+
+Guarda los ficheros subidos a la aplicación web direccionados por su hash
+(SHA-256), de modo que subir la misma imagen varias veces solo la almacena una:
+
+- Cada subida añade una referencia (con su fecha) al objeto existente
+- Un objeto se borra cuando caducan todas sus referencias, o antes si el
+  almacén supera su cuota de bytes (primero los menos usados)
+- Junto al original se guardan derivados normalizados (p. ej. el fondo ya
+  recortado a 1920x1080) que se calculan una única vez por contenido
+- Varios procesos pueden compartir el mismo directorio: el índice se
+  relee cuando otro proceso lo cambia (conservando los accesos propios) y
+  sus modificaciones se hacen bajo un bloqueo de fichero; los accesos de
+  lectura se guardan como mucho una vez por intervalo_acceso y objeto
+
+Autor: Desarrollador Senior Python
+Fecha: Agosto 2025
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+import contextlib
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos
+    fcntl = None
+
+
+logger = logging.getLogger(__name__)
+
+
+class AlmacenSubidas:
+    """Ficheros subidos direccionados por contenido con recuento de referencias."""
+
+    def __init__(self, directorio, intervalo_acceso=60):
+        """
+        Args:
+            directorio (str): Carpeta raíz del almacén (se crea si no existe)
+            intervalo_acceso (float): Segundos tras los que un nuevo acceso de
+                lectura a un objeto se guarda en el índice compartido
+        """
+        self.directorio = directorio
+        self.intervalo_acceso = intervalo_acceso
+        self._ruta_indice = os.path.join(directorio, 'indice.json')
+        self._ruta_bloqueo = os.path.join(directorio, 'indice.lock')
+        self._dir_objetos = os.path.join(directorio, 'objetos')
+        self._lock = threading.Lock()
+
+        self.subidas = 0
+        self.duplicadas = 0
+
+        os.makedirs(self._dir_objetos, exist_ok=True)
+        self._version_indice = None
+        self._indice = self._leer_indice()
+
+    # === ÍNDICE ===
+
+    def _firma_indice(self):
+        try:
+            info = os.stat(self._ruta_indice)
+        except OSError:
+            return None
+        return info.st_mtime_ns, info.st_size, info.st_ino
+
+    def _leer_indice(self):
+        """Carga el índice desde disco (o uno vacío si no existe o está dañado)."""
+        self._version_indice = self._firma_indice()
+        try:
+            with open(self._ruta_indice, 'r', encoding='utf-8') as f:
+                indice = json.load(f)
+            if 'objetos' in indice:
+                return indice
+        except (OSError, ValueError):
+            pass
+        return {'objetos': {}}
+
+    def _guardar_indice(self):
+        """Escribe el índice de forma atómica (fichero temporal + rename)."""
+        temporal = f"{self._ruta_indice}.{os.getpid()}.tmp"
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(self._indice, f)
+        os.replace(temporal, self._ruta_indice)
+        self._version_indice = self._firma_indice()
+
+    def _recargar_indice(self):
+        """
+        Relee el índice si otro proceso lo ha reescrito (requiere el lock).
+
+        Los accesos de este proceso aún no guardados se conservan, para que
+        la expulsión por cuota tenga en cuenta el uso de todos los procesos.
+        """
+        if self._firma_indice() == self._version_indice:
+            return
+        indice = self._leer_indice()
+        for clave, objeto in indice['objetos'].items():
+            propio = self._indice['objetos'].get(clave)
+            if propio is not None:
+                objeto['ultimo_acceso'] = max(objeto.get('ultimo_acceso', 0), propio.get('ultimo_acceso', 0))
+        self._indice = indice
+
+    @contextlib.contextmanager
+    def _bloqueo_disco(self):
+        """Bloqueo exclusivo entre procesos para leer-modificar-escribir el índice."""
+        if fcntl is None:
+            yield
+            return
+        with open(self._ruta_bloqueo, 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _tocar(objeto):
+        """Marca el acceso al objeto (requiere el lock)."""
+        objeto['ultimo_acceso'] = time.time()
+
+    def _ruta_objeto(self, clave, derivado=None):
+        nombre = clave if derivado is None else f"{clave}.{derivado}"
+        return os.path.join(self._dir_objetos, clave[:2], nombre)
+
+    @staticmethod
+    def _escribir(ruta, datos):
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporal, 'wb') as f:
+            f.write(datos)
+        os.replace(temporal, ruta)
+
+    # === API PÚBLICA ===
+
+    def guardar(self, datos, extension, derivados=None):
+        """
+        Guarda un fichero subido (o añade una referencia si ya existía).
+
+        Args:
+            datos (bytes): Contenido del fichero
+            extension (str): Extensión original (sin punto)
+            derivados (dict): Nombre → función (bytes → bytes) de cada
+                derivado normalizado. Solo se calculan los que falten; si uno
+                falla se guarda el original sin él.
+
+        Returns:
+            str: Clave del fichero ("<sha256>.<extension>")
+        """
+        clave = f"{hashlib.sha256(datos).hexdigest()}.{extension.lower()}"
+
+        with self._lock, self._bloqueo_disco():
+            self._recargar_indice()
+            objeto = self._indice['objetos'].get(clave)
+            existente = objeto is not None and os.path.exists(self._ruta_objeto(clave))
+            if not existente:
+                self._indice['objetos'].pop(clave, None)
+                self._escribir(self._ruta_objeto(clave), datos)
+                objeto = {'tamano': len(datos), 'referencias': [], 'derivados': {}}
+            faltan = [
+                nombre for nombre in (derivados or {})
+                if nombre not in objeto['derivados']
+            ]
+
+        # Los derivados (decodificar + redimensionar) se calculan fuera del lock
+        nuevos = {}
+        for nombre in faltan:
+            try:
+                contenido = derivados[nombre](datos)
+            except Exception as e:
+                logger.warning(f"⚠️  No se pudo crear el derivado '{nombre}' de {clave}: {e}")
+                continue
+            self._escribir(self._ruta_objeto(clave, nombre), contenido)
+            nuevos[nombre] = len(contenido)
+
+        with self._lock, self._bloqueo_disco():
+            self._recargar_indice()
+            objeto = self._indice['objetos'].setdefault(clave, objeto)
+            objeto['derivados'].update(nuevos)
+            objeto['referencias'].append(time.time())
+            self._tocar(objeto)
+            self.subidas += 1
+            if existente:
+                self.duplicadas += 1
+            self._guardar_indice()
+
+        return clave
+
+    def ruta(self, clave, derivado=None):
+        """
+        Args:
+            clave (str): Clave devuelta por guardar
+            derivado (str): Nombre del derivado preferido; si no existe se
+                devuelve el original
+
+        Returns:
+            str: Ruta del fichero, o None si la clave no está en el almacén
+        """
+        with self._lock:
+            objeto = self._indice['objetos'].get(clave)
+            if objeto is None:
+                # Puede haberla guardado otro proceso que comparte el directorio
+                self._recargar_indice()
+                objeto = self._indice['objetos'].get(clave)
+            if objeto is None:
+                return None
+            guardar = time.time() - objeto.get('ultimo_acceso', 0) >= self.intervalo_acceso
+            self._tocar(objeto)
+
+        # Solo en memoria no lo vería el proceso que aplica la cuota
+        if guardar:
+            with self._lock, self._bloqueo_disco():
+                self._recargar_indice()
+                if clave in self._indice['objetos']:
+                    self._guardar_indice()
+
+        if derivado is not None and derivado in objeto['derivados']:
+            ruta = self._ruta_objeto(clave, derivado)
+            if os.path.exists(ruta):
+                return ruta
+
+        ruta = self._ruta_objeto(clave)
+        return ruta if os.path.exists(ruta) else None
+
+    def mantener(self, max_edad, max_bytes=None):
+        """
+        Descarta las referencias más antiguas que max_edad, borra los objetos
+        que se quedan sin ninguna y, si aún se supera max_bytes, expulsa los
+        objetos usados hace más tiempo.
+
+        Args:
+            max_edad (float): Segundos que dura cada referencia
+            max_bytes (int): Bytes máximos del almacén (None = sin límite)
+
+        Returns:
+            tuple: (objetos expulsados, bytes liberados)
+        """
+        limite = time.time() - max_edad
+        expulsados = 0
+        liberados = 0
+
+        with self._lock, self._bloqueo_disco():
+            self._recargar_indice()
+            objetos = self._indice['objetos']
+            total = 0
+            sin_referencias = []
+            for clave, objeto in objetos.items():
+                objeto['referencias'] = [t for t in objeto['referencias'] if t >= limite]
+                if objeto['referencias']:
+                    total += self._tamano(objeto)
+                else:
+                    sin_referencias.append(clave)
+
+            # Por cuota: primero los usados hace más tiempo
+            por_cuota = []
+            if max_bytes is not None:
+                por_antiguedad = sorted(objetos.items(), key=lambda item: item[1].get('ultimo_acceso', 0))
+                for clave, objeto in por_antiguedad:
+                    if total <= max_bytes:
+                        break
+                    if objeto['referencias']:
+                        por_cuota.append(clave)
+                        total -= self._tamano(objeto)
+
+            for clave in sin_referencias + por_cuota:
+                objeto = objetos.pop(clave)
+                for derivado, tamano in objeto['derivados'].items():
+                    liberados += self._borrar(self._ruta_objeto(clave, derivado), tamano)
+                liberados += self._borrar(self._ruta_objeto(clave), objeto['tamano'])
+                expulsados += 1
+
+            self._guardar_indice()
+
+        return expulsados, liberados
+
+    @staticmethod
+    def _tamano(objeto):
+        return objeto['tamano'] + sum(objeto['derivados'].values())
+
+    @staticmethod
+    def _borrar(ruta, tamano):
+        try:
+            os.remove(ruta)
+            return tamano
+        except OSError:
+            return 0
+
+    def estadisticas(self):
+        """
+        Returns:
+            dict: Objetos, referencias vivas, bytes ocupados y subidas deduplicadas
+        """
+        with self._lock:
+            self._recargar_indice()
+            objetos = self._indice['objetos'].values()
+            return {
+                'objetos': len(objetos),
+                'referencias': sum(len(objeto['referencias']) for objeto in objetos),
+                'bytes': sum(self._tamano(objeto) for objeto in objetos),
+                'subidas': self.subidas,
+                'duplicadas': self.duplicadas,
+            }
@@ -5,60 +5,146 @@ Interfaz Web para Generador de Thumbnails
 ==========================================
 
 Aplicación Flask que proporciona una interfaz web moderna para generar thumbnails.
-Compatible con empaquetado como aplicación de escritorio.
+Compatible con empaquetado como aplicación de escritorio, y con un modo de
+producción de varios procesos pre-fork (--prefork N) que comparten una misma
+raíz de almacenamiento.
 
 Autor: Desarrollador Senior Python
 Fecha: Agosto 2025
 """
 
 import os
-import base64
+import shutil
+import logging
 import tempfile
-import uuid
 from io import BytesIO
 from flask import Flask, render_template, request, jsonify, send_file
 from werkzeug.utils import secure_filename
-from generate_thumbnail import generar_thumbnail
+from PIL import Image
+from generate_thumbnail import (
+    renderizar_thumbnail, exportar_capas, precargar_fuentes, normalizar_fondo, normalizar_icono
+)
+from render_cache import CacheRenders
+from output_encoders import obtener_codificador, detectar_codificador, validar_opciones
+from upload_store import AlmacenSubidas
+from storage_janitor import ConserjeAlmacenamiento
+from job_queue import ColaRenders, ColaLlena, EN_COLA, COMPLETADO, ERROR
+from layered_export import TIPO_MIME_ORA
+from output_encoders import CODIFICADORES
+from render_metrics import METRICAS, volcar, combinar_volcados
+from prefork_server import ServidorPrefork
+from concurrent.futures import ThreadPoolExecutor
 import webbrowser
 import threading
 import time
 
+logger = logging.getLogger(__name__)
+
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'thumbnail_generator_2025'
 app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50MB máximo
 
-# Directorio temporal para archivos subidos
-UPLOAD_FOLDER = tempfile.mkdtemp(prefix='thumbnail_uploads_')
-RESULTS_FOLDER = tempfile.mkdtemp(prefix='thumbnail_results_')
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
-app.config['RESULTS_FOLDER'] = RESULTS_FOLDER
+app.config['UPLOAD_MAX_AGE'] = 3600                   # Segundos que dura cada subida
+app.config['UPLOAD_MAX_BYTES'] = 1024 * 1024 * 1024   # Cuota del almacén de subidas
+
+# Raíz de almacenamiento (subidas, renders, estado de trabajos y métricas).
+# Con THUMBNAIL_STORAGE o --almacenamiento se comparte entre procesos y
+# reinicios; si no, es una carpeta temporal propia de esta ejecución.
+STORAGE_ROOT = None
+STORAGE_ROOT_TEMPORAL = False
+
+def configurar_almacenamiento(raiz=None):
+    """
+    Crea (o abre) los almacenes de la aplicación bajo una raíz.
+    
+    Args:
+        raiz (str): Carpeta raíz; None para una carpeta temporal nueva
+    """
+    global STORAGE_ROOT, STORAGE_ROOT_TEMPORAL, UPLOAD_FOLDER, RESULTS_FOLDER
+    global JOBS_FOLDER, METRICS_FOLDER, UPLOAD_STORE, RENDER_CACHE
+    
+    anterior = STORAGE_ROOT if STORAGE_ROOT_TEMPORAL else None
+    
+    STORAGE_ROOT_TEMPORAL = raiz is None
+    STORAGE_ROOT = os.path.abspath(raiz) if raiz else tempfile.mkdtemp(prefix='thumbnail_')
+    UPLOAD_FOLDER = os.path.join(STORAGE_ROOT, 'subidas')
+    RESULTS_FOLDER = os.path.join(STORAGE_ROOT, 'resultados')
+    JOBS_FOLDER = os.path.join(STORAGE_ROOT, 'trabajos')
+    METRICS_FOLDER = os.path.join(STORAGE_ROOT, 'metricas')
+    for carpeta in (JOBS_FOLDER, METRICS_FOLDER):
+        os.makedirs(carpeta, exist_ok=True)
+    app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+    app.config['RESULTS_FOLDER'] = RESULTS_FOLDER
+    
+    # Subidas direccionadas por contenido: la misma imagen se guarda una sola vez,
+    # junto a su versión normalizada (fondo a 1920x1080, icono RGBA a tamaño máximo)
+    UPLOAD_STORE = AlmacenSubidas(UPLOAD_FOLDER)
+    
+    # Caché de renders: mismas entradas y parámetros → mismo PNG sin volver a generar
+    RENDER_CACHE = CacheRenders(os.path.join(RESULTS_FOLDER, 'renders'))
+    
+    if anterior is not None:
+        shutil.rmtree(anterior, ignore_errors=True)
+
+# Los workers de la cola de renders (spawn) importan de nuevo este script como
+# __mp_main__: no usan el almacenamiento y no deben crear otra raíz temporal
+if __name__ != '__mp_main__':
+    configurar_almacenamiento(os.environ.get('THUMBNAIL_STORAGE'))
+
+# Vista previa: versión reducida servida aparte del PNG completo
+PREVIEW_SIZE = (960, 540)
+PREVIEW_QUALITY = 80
+PREVIEW_MAX_AGE = 3600
+
+# Cola de trabajos de render en procesos (se crea en la primera petición a /jobs)
+app.config['JOB_WORKERS'] = os.cpu_count() or 1       # Procesos worker
+app.config['JOB_MAX_QUEUE'] = 32                      # Trabajos pendientes máximos
+app.config['JOB_MAX_TASKS_PER_WORKER'] = 50           # Renders antes de reciclar un worker
+app.config['JOB_MAX_WAIT'] = 30                       # Segundos máximos de long-poll
+app.config['JOB_RETENTION'] = 600                     # Segundos que se recuerda un trabajo terminado
+RENDER_QUEUE = None
+RENDER_QUEUE_LOCK = threading.Lock()
+
+# Exportación por capas (.ora): solo si se pide, y en segundo plano tras responder
+LAYER_EXPORTS = ThreadPoolExecutor(max_workers=1, thread_name_prefix='capas')
+LAYER_EXPORTS_PENDING = {}                            # result_id -> Future
+LAYER_EXPORTS_LOCK = threading.Lock()
+
+# Mantenimiento del almacenamiento en segundo plano (edad máxima + cuota, LRU)
+app.config['MAINTENANCE_INTERVAL'] = 60               # Segundos entre pasadas
+STORAGE_JANITOR = ConserjeAlmacenamiento(app.config['MAINTENANCE_INTERVAL'])
+STORAGE_JANITOR.registrar('subidas', lambda: UPLOAD_STORE.mantener(
+    app.config['UPLOAD_MAX_AGE'], app.config['UPLOAD_MAX_BYTES']
+))
+STORAGE_JANITOR.registrar('renders', lambda: RENDER_CACHE.purgar_caducados())
+STORAGE_JANITOR.registrar('trabajos', lambda: purgar_marcas_trabajos(app.config['JOB_RETENTION']))
+
+# Capacidad de cada proceso servidor: renders síncronos (/generate) a la vez
+# antes de declararse no disponible en /ready; también es el tamaño del pool
+# de hilos que los ejecuta fuera del hilo de la petición
+app.config['MAX_CONCURRENT_RENDERS'] = os.cpu_count() or 1
+RENDER_EXECUTOR = None
+RENDER_EXECUTOR_LOCK = threading.Lock()
+app.config['SHARED_METRICS'] = False                  # Combinar métricas de varios procesos
+app.config['METRICS_DUMP_INTERVAL'] = 5               # Segundos entre volcados de métricas
+WORKER_STATE = {'indice': 0, 'pid': os.getpid(), 'listo': False, 'inicio': None, 'renders_en_curso': 0}
+WORKER_STATE_LOCK = threading.Lock()
+METRICS_DUMP_STOP = threading.Event()
 
 # Extensiones permitidas
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'bmp', 'webp', 'svg'}
 
+def extension_archivo(filename):
+    """Extensión (en minúsculas) del nombre original, o '' si no tiene."""
+    return filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
+
 def allowed_file(filename):
     """Verifica si el archivo tiene una extensión permitida."""
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
-
-def cleanup_old_files():
-    """Limpia archivos temporales antiguos (más de 1 hora)."""
-    try:
-        current_time = time.time()
-        for folder in [UPLOAD_FOLDER, RESULTS_FOLDER]:
-            if os.path.exists(folder):
-                for filename in os.listdir(folder):
-                    file_path = os.path.join(folder, filename)
-                    if os.path.isfile(file_path):
-                        file_age = current_time - os.path.getctime(file_path)
-                        if file_age > 3600:  # 1 hora
-                            os.remove(file_path)
-    except Exception as e:
-        print(f"Error limpiando archivos temporales: {e}")
+    return extension_archivo(filename) in ALLOWED_EXTENSIONS
 
 @app.route('/')
 def index():
     """Página principal de la aplicación."""
-    cleanup_old_files()
     return render_template('index.html')
 
 @app.route('/upload', methods=['POST'])
@@ -71,12 +157,10 @@ def upload_file():
         if 'background_image' in request.files:
             file = request.files['background_image']
             if file and file.filename and allowed_file(file.filename):
-                filename = secure_filename(file.filename)
-                unique_filename = f"{uuid.uuid4().hex}_{filename}"
-                file_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-                file.save(file_path)
-                response['files']['background'] = unique_filename
-                print(f"✅ Imagen de fondo guardada: {unique_filename}")
+                extension = extension_archivo(file.filename)
+                stored_name = UPLOAD_STORE.guardar(file.read(), extension, {'fondo': normalizar_fondo})
+                response['files']['background'] = stored_name
+                logger.info(f"✅ Imagen de fondo guardada: {stored_name}")
         
         # Procesar iconos
         icons = []
@@ -84,12 +168,10 @@ def upload_file():
             if key.startswith('icon_'):
                 file = request.files[key]
                 if file and file.filename and allowed_file(file.filename):
-                    filename = secure_filename(file.filename)
-                    unique_filename = f"{uuid.uuid4().hex}_{filename}"
-                    file_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-                    file.save(file_path)
-                    icons.append(unique_filename)
-                    print(f"✅ Icono guardado: {unique_filename}")
+                    extension = extension_archivo(file.filename)
+                    stored_name = UPLOAD_STORE.guardar(file.read(), extension, {'icono': normalizar_icono})
+                    icons.append(stored_name)
+                    logger.info(f"✅ Icono guardado: {stored_name}")
         
         if icons:
             response['files']['icons'] = icons
@@ -102,106 +184,630 @@ def upload_file():
     except Exception as e:
         return jsonify({'success': False, 'message': f'Error: {str(e)}'})
 
+def preparar_rutas_entrada(data):
+    """
+    Valida los datos de una petición de render y resuelve las rutas subidas.
+    
+    Returns:
+        tuple: (ruta del fondo, lista de rutas de iconos)
+        
+    Raises:
+        ValueError: Con el mensaje para el usuario si faltan datos
+    """
+    # Validar datos requeridos
+    if not data.get('title'):
+        raise ValueError('El título es obligatorio')
+    
+    if not data.get('background_file'):
+        raise ValueError('La imagen de fondo es obligatoria')
+    
+    # Preparar rutas de archivos (versión normalizada si existe)
+    background_path = UPLOAD_STORE.ruta(data['background_file'], 'fondo')
+    if background_path is None:
+        raise ValueError('Imagen de fondo no encontrada')
+    
+    # Preparar iconos
+    icon_paths = []
+    if data.get('icon_files'):
+        for icon_file in data['icon_files']:
+            icon_path = UPLOAD_STORE.ruta(icon_file, 'icono')
+            if icon_path is not None:
+                icon_paths.append(icon_path)
+    
+    return background_path, icon_paths
+
+def preparar_opciones_salida(data):
+    """
+    Lee y valida las opciones de codificación de una petición de render
+    (format, quality, max_kb).
+    
+    Returns:
+        dict: formato, calidad y max_bytes para renderizar_thumbnail
+        
+    Raises:
+        ValueError: Con el mensaje para el usuario si alguna opción no es válida
+    """
+    try:
+        calidad = int(data['quality']) if data.get('quality') not in (None, '') else None
+        max_kb = int(data['max_kb']) if data.get('max_kb') not in (None, '') else None
+    except (TypeError, ValueError):
+        raise ValueError('La calidad y el tamaño objetivo deben ser números enteros')
+    
+    return validar_opciones(data.get('format') or 'png', calidad, max_kb)
+
+def obtener_ejecutor_renders():
+    """
+    Pool acotado (MAX_CONCURRENT_RENDERS hilos) para los renders de
+    /generate, creado en la primera petición (--prefork ajusta antes el límite).
+    """
+    global RENDER_EXECUTOR
+    with RENDER_EXECUTOR_LOCK:
+        if RENDER_EXECUTOR is None:
+            RENDER_EXECUTOR = ThreadPoolExecutor(
+                max_workers=app.config['MAX_CONCURRENT_RENDERS'], thread_name_prefix='render'
+            )
+        return RENDER_EXECUTOR
+
 @app.route('/generate', methods=['POST'])
 def generate_thumbnail():
     """Genera el thumbnail con los parámetros especificados."""
     try:
         data = request.get_json()
         
-        # Validar datos requeridos
-        if not data.get('title'):
-            return jsonify({'success': False, 'message': 'El título es obligatorio'})
-        
-        if not data.get('background_file'):
-            return jsonify({'success': False, 'message': 'La imagen de fondo es obligatoria'})
-        
-        # Preparar rutas de archivos
-        background_path = os.path.join(app.config['UPLOAD_FOLDER'], data['background_file'])
-        if not os.path.exists(background_path):
-            return jsonify({'success': False, 'message': 'Imagen de fondo no encontrada'})
-        
-        # Preparar iconos
-        icon_paths = []
-        if data.get('icon_files'):
-            for icon_file in data['icon_files']:
-                icon_path = os.path.join(app.config['UPLOAD_FOLDER'], icon_file)
-                if os.path.exists(icon_path):
-                    icon_paths.append(icon_path)
-        
-        # Generar nombre único para el resultado
-        result_id = uuid.uuid4().hex
-        result_name = f"thumbnail_{result_id}"
-        result_path = os.path.join(app.config['RESULTS_FOLDER'], result_name)
-        
-        # Generar thumbnail usando la función existente
-        print(f"🎨 Generando thumbnail:")
-        print(f"   📸 Fondo: {background_path}")
-        print(f"   📝 Título: {data['title']}")
-        print(f"   🎯 Iconos: {len(icon_paths)}")
-        
-        generar_thumbnail(
-            imagen_base=background_path,
-            titulo=data['title'],
-            iconos=icon_paths,
-            ruta_salida=result_path
-        )
+        try:
+            background_path, icon_paths = preparar_rutas_entrada(data)
+            salida = preparar_opciones_salida(data)
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)})
         
-        # Verificar que se generó correctamente
-        png_path = f"{result_path}.png"
-        if os.path.exists(png_path):
-            # Convertir imagen a base64 para preview
-            with open(png_path, 'rb') as img_file:
-                img_base64 = base64.b64encode(img_file.read()).decode('utf-8')
+        # El identificador del resultado es la huella de entradas y parámetros
+        parametros = {'title': data['title'], 'fondo_rapido': True, 'salida': salida}
+        result_id = RENDER_CACHE.huella([background_path] + icon_paths, parametros)
+        
+        def renderizar():
+            logger.info(f"🎨 Generando thumbnail: fondo={background_path} título={data['title']!r} "
+                        f"iconos={len(icon_paths)} formato={salida['formato']}")
             
-            return jsonify({
+            with WORKER_STATE_LOCK:
+                WORKER_STATE['renders_en_curso'] += 1
+            try:
+                # Render y codificación en memoria, sin escribir ni releer el fichero
+                return renderizar_thumbnail(
+                    imagen_base=background_path,
+                    titulo=data['title'],
+                    iconos=icon_paths,
+                    fondo_rapido=True,
+                    **salida
+                )
+            finally:
+                with WORKER_STATE_LOCK:
+                    WORKER_STATE['renders_en_curso'] -= 1
+        
+        try:
+            # Render y codificación (incluida la búsqueda del tamaño objetivo)
+            # en el pool acotado: los renders que superan la capacidad esperan
+            # turno en lugar de competir por la CPU, y los codificadores de
+            # Pillow liberan el GIL mientras comprimen. Comparte las cachés de
+            # etapas del proceso, a diferencia de la cola de /jobs
+            png_bytes = RENDER_CACHE.obtener_o_generar(
+                result_id, lambda: obtener_ejecutor_renders().submit(renderizar).result()
+            )
+        except OSError:
+            png_bytes = None
+        
+        # Verificar que se generó correctamente
+        if png_bytes:
+            # Solo identificadores y URLs: la vista previa se pide aparte, reducida
+            response = {
                 'success': True,
                 'message': '🎉 Thumbnail generado exitosamente',
                 'result_id': result_id,
-                'preview': f"data:image/png;base64,{img_base64}",
+                'preview_url': f"/preview/{result_id}",
                 'download_url': f"/download/{result_id}"
-            })
+            }
+            if data.get('layers'):
+                programar_exportacion_capas(result_id, background_path, data['title'], icon_paths)
+                response['layers_url'] = f"/layers/{result_id}"
+            return jsonify(response)
         else:
             return jsonify({'success': False, 'message': 'Error al generar el thumbnail'})
             
     except Exception as e:
-        print(f"❌ Error generando thumbnail: {e}")
+        logger.error(f"❌ Error generando thumbnail: {e}")
         return jsonify({'success': False, 'message': f'Error interno: {str(e)}'})
 
+def programar_exportacion_capas(result_id, background_path, title, icon_paths):
+    """
+    Lanza en segundo plano la exportación OpenRaster de un render. Las cachés
+    de etapas del proceso ya tienen el fondo y los iconos, así que solo se
+    repite la composición del título y la codificación de las capas nuevas.
+    """
+    clave = f"{result_id}-capas"
+    if RENDER_CACHE.contiene(clave):
+        return
+    
+    with LAYER_EXPORTS_LOCK:
+        if result_id in LAYER_EXPORTS_PENDING:
+            return
+        futuro = LAYER_EXPORTS.submit(
+            RENDER_CACHE.obtener_o_generar, clave,
+            lambda: exportar_capas(background_path, title, icon_paths, fondo_rapido=True)
+        )
+        LAYER_EXPORTS_PENDING[result_id] = futuro
+    
+    def terminada(futuro):
+        with LAYER_EXPORTS_LOCK:
+            LAYER_EXPORTS_PENDING.pop(result_id, None)
+        if futuro.exception() is not None:
+            logger.error(f"❌ Error exportando capas de {result_id}: {futuro.exception()}")
+    
+    futuro.add_done_callback(terminada)
+
+@app.route('/layers/<result_id>')
+def download_layers(result_id):
+    """Descarga el fichero OpenRaster (.ora) con las capas, o 202 si aún se está creando."""
+    ora_bytes = RENDER_CACHE.obtener(f"{result_id}-capas")
+    if ora_bytes is not None:
+        return send_file(
+            BytesIO(ora_bytes),
+            as_attachment=True,
+            download_name=f"thumbnail_{result_id}.ora",
+            mimetype=TIPO_MIME_ORA
+        )
+    
+    with LAYER_EXPORTS_LOCK:
+        pendiente = result_id in LAYER_EXPORTS_PENDING
+    if pendiente:
+        return jsonify({'success': True, 'status': 'pending', 'layers_url': f"/layers/{result_id}"}), 202
+    return jsonify({'success': False, 'message': 'Capas no encontradas'}), 404
+
+def _ruta_marca_trabajo(job_id):
+    return os.path.join(JOBS_FOLDER, secure_filename(job_id))
+
+def marcar_trabajo(job_id, error=None):
+    """
+    Deja constancia en la raíz de almacenamiento de un trabajo pendiente (o
+    de su error) para que cualquier proceso servidor pueda informar de él.
+    """
+    ruta = _ruta_marca_trabajo(job_id)
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, 'w', encoding='utf-8') as f:
+        f.write(error or '')
+    os.replace(temporal, ruta)
+
+def trabajo_terminado(job_id, png_bytes, error):
+    """Publica el resultado de un trabajo en la caché de renders compartida."""
+    if error is not None:
+        marcar_trabajo(job_id, error)
+        return
+    if not RENDER_CACHE.contiene(job_id):
+        RENDER_CACHE.obtener_o_generar(job_id, lambda: png_bytes)
+    try:
+        os.remove(_ruta_marca_trabajo(job_id))
+    except OSError:
+        pass
+
+def estado_trabajo_compartido(job_id):
+    """
+    Estado de un trabajo que no está en la cola de este proceso (enviado a
+    otro proceso servidor, o ya olvidado).
+    
+    Returns:
+        dict: Estado del trabajo, o None si no se conoce
+    """
+    if RENDER_CACHE.contiene(job_id):
+        return {'id': job_id, 'estado': COMPLETADO}
+    try:
+        with open(_ruta_marca_trabajo(job_id), 'r', encoding='utf-8') as f:
+            error = f.read()
+    except OSError:
+        return None
+    if error:
+        return {'id': job_id, 'estado': ERROR, 'error': error}
+    return {'id': job_id, 'estado': EN_COLA}
+
+def purgar_marcas_trabajos(max_edad):
+    """
+    Borra las marcas de trabajos más antiguas que max_edad (p. ej. de un
+    proceso que terminó sin completarlos).
+    
+    Returns:
+        tuple: (marcas borradas, bytes liberados)
+    """
+    limite = time.time() - max_edad
+    borradas = 0
+    liberados = 0
+    for nombre in os.listdir(JOBS_FOLDER):
+        ruta = os.path.join(JOBS_FOLDER, nombre)
+        try:
+            info = os.stat(ruta)
+            if info.st_mtime < limite:
+                os.remove(ruta)
+                borradas += 1
+                liberados += info.st_size
+        except OSError:
+            pass
+    return borradas, liberados
+
+def obtener_cola_renders():
+    """Devuelve la cola de trabajos de render, creándola en la primera petición."""
+    global RENDER_QUEUE
+    with RENDER_QUEUE_LOCK:
+        if RENDER_QUEUE is None:
+            RENDER_QUEUE = ColaRenders(
+                max_procesos=app.config['JOB_WORKERS'],
+                max_en_cola=app.config['JOB_MAX_QUEUE'],
+                max_tareas_por_proceso=app.config['JOB_MAX_TASKS_PER_WORKER'],
+                retencion=app.config['JOB_RETENTION'],
+                inicializador=precargar_fuentes,
+                al_terminar_trabajo=trabajo_terminado
+            )
+        return RENDER_QUEUE
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """Encola un render y devuelve inmediatamente el identificador del trabajo."""
+    try:
+        data = request.get_json()
+        
+        try:
+            background_path, icon_paths = preparar_rutas_entrada(data)
+            salida = preparar_opciones_salida(data)
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        
+        parametros = {'title': data['title'], 'fondo_rapido': True, 'salida': salida}
+        job_id = RENDER_CACHE.huella([background_path] + icon_paths, parametros)
+        
+        # Si ya está renderizado no hace falta encolarlo
+        if RENDER_CACHE.contiene(job_id):
+            return jsonify({
+                'success': True,
+                'job_id': job_id,
+                'status': COMPLETADO,
+                'status_url': f"/jobs/{job_id}",
+                'preview_url': f"/preview/{job_id}",
+                'download_url': f"/download/{job_id}"
+            })
+        
+        # No está en la caché: un trabajo terminado con este id (cuyo render
+        # ya se ha expulsado) no vale, hay que volver a ejecutarlo
+        cola = obtener_cola_renders()
+        cola.olvidar(job_id)
+        
+        # Visible para los demás procesos servidor hasta que termine
+        marcar_trabajo(job_id)
+        try:
+            # El worker renderiza y codifica (incluida la búsqueda de tamaño
+            # objetivo) y devuelve los bytes, sin pasar por disco
+            cola.enviar(
+                job_id, renderizar_thumbnail,
+                background_path, data['title'], icon_paths, fondo_rapido=True, **salida
+            )
+        except ColaLlena as e:
+            os.remove(_ruta_marca_trabajo(job_id))
+            return jsonify({'success': False, 'message': str(e)}), 503
+        
+        return jsonify({
+            'success': True,
+            'job_id': job_id,
+            'status': EN_COLA,
+            'status_url': f"/jobs/{job_id}"
+        }), 202
+        
+    except Exception as e:
+        logger.error(f"❌ Error encolando thumbnail: {e}")
+        return jsonify({'success': False, 'message': f'Error interno: {str(e)}'}), 500
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """Estado de un trabajo; con ?wait=N espera hasta N segundos a que termine."""
+    try:
+        espera = min(float(request.args.get('wait', 0)), app.config['JOB_MAX_WAIT'])
+    except ValueError:
+        espera = 0
+    
+    estado = obtener_cola_renders().esperar(job_id, timeout=max(0, espera))
+    if estado is None:
+        # Enviado a otro proceso servidor: solo se conoce por la raíz compartida
+        estado = estado_trabajo_compartido(job_id)
+        limite = time.time() + max(0, espera)
+        while estado is not None and estado['estado'] == EN_COLA and time.time() < limite:
+            time.sleep(0.1)
+            estado = estado_trabajo_compartido(job_id)
+        if estado is None:
+            return jsonify({'success': False, 'message': 'Trabajo no encontrado'}), 404
+    
+    response = {'success': True, 'job_id': job_id, 'status': estado['estado']}
+    for clave in ('espera_ms', 'render_ms'):
+        if clave in estado:
+            response[clave] = estado[clave]
+    
+    if estado['estado'] == COMPLETADO:
+        # La cola ya ha publicado el resultado en la caché de renders
+        response['preview_url'] = f"/preview/{job_id}"
+        response['download_url'] = f"/download/{job_id}"
+    elif estado['estado'] == ERROR:
+        response['success'] = False
+        response['message'] = f"Error generando thumbnail: {estado.get('error')}"
+    
+    return jsonify(response)
+
 @app.route('/download/<result_id>')
 def download_thumbnail(result_id):
     """Descarga el thumbnail generado."""
     try:
-        png_path = os.path.join(app.config['RESULTS_FOLDER'], f"thumbnail_{result_id}.png")
-        if os.path.exists(png_path):
+        image_bytes = RENDER_CACHE.obtener(result_id)
+        if image_bytes:
+            codificador = detectar_codificador(image_bytes) or obtener_codificador('png')
             return send_file(
-                png_path,
+                BytesIO(image_bytes),
                 as_attachment=True,
-                download_name=f"thumbnail_{result_id}.png",
-                mimetype='image/png'
+                download_name=f"thumbnail_{result_id}.{codificador.extension}",
+                mimetype=codificador.tipo_mime
             )
         else:
             return "Archivo no encontrado", 404
     except Exception as e:
         return f"Error: {str(e)}", 500
 
+def crear_preview(png_bytes, formato):
+    """
+    Crea una versión reducida del thumbnail para la vista previa.
+    
+    Args:
+        png_bytes (bytes): PNG completo del thumbnail
+        formato (str): 'WEBP' o 'JPEG'
+        
+    Returns:
+        bytes: Imagen reducida codificada
+    """
+    imagen = Image.open(BytesIO(png_bytes)).convert('RGB')
+    imagen.thumbnail(PREVIEW_SIZE, Image.Resampling.BILINEAR, reducing_gap=2.0)
+    
+    salida = BytesIO()
+    if formato == 'WEBP':
+        imagen.save(salida, 'WEBP', quality=PREVIEW_QUALITY, method=4)
+    else:
+        imagen.save(salida, 'JPEG', quality=PREVIEW_QUALITY, optimize=True, progressive=True)
+    return salida.getvalue()
+
+@app.route('/preview/<result_id>')
+def preview_thumbnail(result_id):
+    """Sirve una vista previa reducida (WebP o JPEG) cacheable por el navegador."""
+    formato = 'WEBP' if 'image/webp' in request.headers.get('Accept', '') else 'JPEG'
+    etag = f"{result_id}-{formato.lower()}"
+    
+    # Un render caducado o inexistente no se valida aunque el ETag coincida
+    # (basta con saber que existe: un 304 no necesita leer el PNG)
+    if not RENDER_CACHE.contiene(result_id):
+        return "Archivo no encontrado", 404
+    
+    # El identificador es la huella del render: mismo id → misma imagen
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        # El PNG completo solo se lee si la vista previa no está ya en caché
+        def generar_preview():
+            png_bytes = RENDER_CACHE.obtener(result_id)
+            if png_bytes is None:
+                raise FileNotFoundError(result_id)
+            return crear_preview(png_bytes, formato)
+        
+        try:
+            preview_bytes = RENDER_CACHE.obtener_o_generar(
+                f"{result_id}-preview-{formato.lower()}", generar_preview
+            )
+        except FileNotFoundError:
+            return "Archivo no encontrado", 404
+        response = app.response_class(preview_bytes, mimetype=f"image/{formato.lower()}")
+    
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = f"public, max-age={PREVIEW_MAX_AGE}"
+    response.headers['Vary'] = 'Accept'
+    return response
+
+@app.route('/storage')
+def storage_stats():
+    """Ocupación de los almacenes y contadores del mantenimiento en segundo plano."""
+    return jsonify({
+        'maintenance': STORAGE_JANITOR.estadisticas(),
+        'uploads': UPLOAD_STORE.estadisticas(),
+        'renders': RENDER_CACHE.estadisticas()
+    })
+
+def metricas_aplicacion():
+    """
+    Métricas de la aplicación que se leen en el momento de la consulta
+    (caché de renders, almacenes, mantenimiento y cola de trabajos).
+    
+    Returns:
+        list: Tuplas (nombre, tipo, ayuda, [(etiquetas, valor), ...])
+    """
+    renders = RENDER_CACHE.estadisticas()
+    subidas = UPLOAD_STORE.estadisticas()
+    mantenimiento = STORAGE_JANITOR.estadisticas()
+    
+    metricas = [
+        ('thumbnail_render_cache_hits_total', 'counter', 'Aciertos de la caché de renders',
+         [({}, renders['aciertos'])]),
+        ('thumbnail_render_cache_misses_total', 'counter', 'Fallos de la caché de renders',
+         [({}, renders['fallos'])]),
+        ('thumbnail_render_cache_bytes', 'gauge', 'Bytes ocupados por la caché de renders',
+         [({'tier': 'memoria'}, renders['bytes_memoria']), ({'tier': 'disco'}, renders['bytes_disco'])]),
+        ('thumbnail_uploads_total', 'counter', 'Ficheros subidos',
+         [({}, subidas['subidas'])]),
+        ('thumbnail_uploads_deduplicated_total', 'counter', 'Subidas cuyo contenido ya estaba almacenado',
+         [({}, subidas['duplicadas'])]),
+        ('thumbnail_uploads_bytes', 'gauge', 'Bytes ocupados por el almacén de subidas',
+         [({}, subidas['bytes'])]),
+        ('thumbnail_storage_evictions_total', 'counter', 'Objetos expulsados por el mantenimiento',
+         [({'task': nombre}, tarea['expulsiones']) for nombre, tarea in mantenimiento['tareas'].items()]),
+        ('thumbnail_storage_reclaimed_bytes_total', 'counter', 'Bytes liberados por el mantenimiento',
+         [({'task': nombre}, tarea['bytes_recuperados']) for nombre, tarea in mantenimiento['tareas'].items()]),
+    ]
+    
+    if RENDER_QUEUE is not None:
+        cola = RENDER_QUEUE.estadisticas()
+        metricas += [
+            ('thumbnail_jobs_pending', 'gauge', 'Trabajos en cola o en ejecución',
+             [({}, cola['pendientes'])]),
+            ('thumbnail_jobs_completed_total', 'counter', 'Trabajos completados',
+             [({}, cola['completados'])]),
+            ('thumbnail_jobs_failed_total', 'counter', 'Trabajos fallidos',
+             [({}, cola['fallidos'])]),
+        ]
+    
+    return metricas
+
+def volcar_metricas():
+    """Publica las métricas de este proceso para los demás procesos servidor."""
+    volcar(METRICS_FOLDER, metricas_aplicacion())
+
+@app.route('/metrics')
+def metrics():
+    """Métricas en formato de texto de Prometheus."""
+    if app.config['SHARED_METRICS']:
+        # Varios procesos servidor: se suman las métricas de todos, y las de
+        # cada proceso (cachés, cola) se distinguen con la etiqueta pid
+        volcar_metricas()
+        registro, adicionales = combinar_volcados(METRICS_FOLDER)
+        texto = registro.exportar_prometheus(adicionales)
+    else:
+        texto = METRICAS.exportar_prometheus(metricas_aplicacion())
+    return app.response_class(texto, mimetype='text/plain; version=0.0.4')
+
+def estado_capacidad():
+    """
+    Comprueba si este proceso servidor puede aceptar renders ahora mismo.
+    
+    Returns:
+        tuple: (listo, dict con cada comprobación y los datos de capacidad)
+    """
+    with WORKER_STATE_LOCK:
+        estado = dict(WORKER_STATE)
+    
+    capacidad = {
+        'renders_en_curso': estado['renders_en_curso'],
+        'max_renders': app.config['MAX_CONCURRENT_RENDERS'],
+    }
+    comprobaciones = {
+        'calentado': estado['listo'],
+        'almacenamiento': all(os.access(carpeta, os.W_OK) for carpeta in (UPLOAD_FOLDER, RESULTS_FOLDER)),
+        'renders': estado['renders_en_curso'] < app.config['MAX_CONCURRENT_RENDERS'],
+    }
+    if RENDER_QUEUE is not None:
+        cola = RENDER_QUEUE.estadisticas()
+        capacidad['trabajos_pendientes'] = cola['pendientes']
+        capacidad['max_trabajos'] = cola['max_en_cola']
+        comprobaciones['cola'] = cola['pendientes'] < cola['max_en_cola']
+    
+    return all(comprobaciones.values()), {
+        'worker': estado['indice'],
+        'pid': estado['pid'],
+        'uptime_s': int(time.time() - estado['inicio']) if estado['inicio'] else None,
+        'checks': comprobaciones,
+        'capacity': capacidad,
+    }
+
 @app.route('/health')
 def health_check():
-    """Endpoint para verificar el estado de la aplicación."""
-    return jsonify({'status': 'ok', 'message': 'Thumbnail Generator Web App funcionando correctamente'})
+    """Estado del proceso (vivo) con su capacidad de render actual."""
+    listo, detalle = estado_capacidad()
+    return jsonify(dict(detalle, status='ok', ready=listo,
+                        message='Thumbnail Generator Web App funcionando correctamente'))
+
+@app.route('/ready')
+def readiness_check():
+    """200 si el proceso puede aceptar renders ahora; 503 si no (arrancando, saturado o sin disco)."""
+    listo, detalle = estado_capacidad()
+    return jsonify(dict(detalle, status='ready' if listo else 'not_ready')), 200 if listo else 503
+
+def calentar():
+    """
+    Carga las fuentes y los códecs de Pillow antes de aceptar peticiones, para
+    que el primer render no pague la inicialización.
+    """
+    precargar_fuentes()
+    
+    Image.init()
+    muestra = Image.new('RGB', (16, 16), (128, 128, 128))
+    for codificador in CODIFICADORES.values():
+        Image.open(BytesIO(codificador.codificar(muestra))).load()
+
+def _volcar_metricas_periodicamente():
+    while not METRICS_DUMP_STOP.wait(app.config['METRICS_DUMP_INTERVAL']):
+        try:
+            volcar_metricas()
+        except OSError as e:
+            logger.warning(f"⚠️  No se pudieron volcar las métricas: {e}")
+
+def iniciar_worker(indice=0):
+    """
+    Prepara un proceso servidor antes de aceptar peticiones: calienta fuentes
+    y códecs y arranca sus hilos de fondo. El mantenimiento del almacenamiento
+    solo se ejecuta en el proceso de índice 0.
+    
+    Args:
+        indice (int): Índice del proceso servidor (0 en modo de un proceso)
+    """
+    with WORKER_STATE_LOCK:
+        WORKER_STATE.update(indice=indice, pid=os.getpid(), listo=False, inicio=time.time())
+    
+    calentar()
+    
+    # Limpieza de subidas y renders caducados fuera de las peticiones
+    if indice == 0:
+        STORAGE_JANITOR.intervalo = app.config['MAINTENANCE_INTERVAL']
+        STORAGE_JANITOR.iniciar()
+    
+    if app.config['SHARED_METRICS']:
+        volcar_metricas()
+        threading.Thread(target=_volcar_metricas_periodicamente, name='metricas', daemon=True).start()
+    
+    with WORKER_STATE_LOCK:
+        WORKER_STATE['listo'] = True
+    logger.info(f"✅ Worker {indice} listo (pid {os.getpid()})")
+
+def detener_worker():
+    """Detiene los hilos y procesos de fondo de un proceso servidor."""
+    with WORKER_STATE_LOCK:
+        WORKER_STATE['listo'] = False
+    
+    if RENDER_QUEUE is not None:
+        RENDER_QUEUE.cerrar(esperar=True)
+    LAYER_EXPORTS.shutdown(wait=False, cancel_futures=True)
+    if RENDER_EXECUTOR is not None:
+        RENDER_EXECUTOR.shutdown(wait=True)
+    
+    if WORKER_STATE['indice'] == 0:
+        STORAGE_JANITOR.detener()
+        STORAGE_JANITOR.ejecutar()
+    
+    if app.config['SHARED_METRICS']:
+        METRICS_DUMP_STOP.set()
+        volcar_metricas()
 
 def open_browser():
     """Abre el navegador automáticamente tras iniciar el servidor."""
     time.sleep(1.5)  # Esperar a que el servidor esté listo
     webbrowser.open('http://localhost:5000')
 
-def run_app(debug=False, port=5000):
+def run_app(debug=False, port=5000, verbose=False):
     """Ejecuta la aplicación Flask."""
+    # Solo avisos y errores por defecto: el progreso de cada render con --verbose
+    logging.basicConfig(level=logging.INFO if verbose or debug else logging.WARNING,
+                        format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    
     print("\n🚀 INICIANDO THUMBNAIL GENERATOR WEB APP")
     print("═" * 60)
     print(f"📱 Interfaz web disponible en: http://localhost:{port}")
     print("🔧 Presiona Ctrl+C para detener el servidor")
     print("═" * 60)
     
+    # Fuentes y códecs cargados, y mantenimiento en marcha, antes de aceptar peticiones
+    iniciar_worker()
+    
     # Abrir navegador automáticamente en modo producción
     if not debug:
         threading.Thread(target=open_browser, daemon=True).start()
@@ -216,14 +822,61 @@ def run_app(debug=False, port=5000):
     except KeyboardInterrupt:
         print("\n👋 Cerrando aplicación...")
     finally:
-        cleanup_old_files()
+        detener_worker()
+
+def run_production(port=5000, host='0.0.0.0', procesos=2, verbose=False):
+    """
+    Sirve la aplicación con varios procesos pre-fork que comparten el socket
+    y la raíz de almacenamiento (sin navegador ni servidor de desarrollo).
+    
+    Args:
+        port (int): Puerto de escucha
+        host (str): Dirección de escucha
+        procesos (int): Procesos servidor
+        verbose (bool): Mostrar el progreso de cada render en el log
+    """
+    logging.basicConfig(level=logging.INFO if verbose else logging.WARNING,
+                        format='%(asctime)s %(levelname)s %(name)s[%(process)d]: %(message)s')
+    # Una línea por petición solo con --verbose
+    logging.getLogger('werkzeug').setLevel(logging.INFO if verbose else logging.WARNING)
+    
+    # Los procesos de la cola de trabajos y la capacidad de render se reparten
+    # entre los procesos servidor para no sobrecargar la máquina
+    app.config['JOB_WORKERS'] = max(1, app.config['JOB_WORKERS'] // procesos)
+    app.config['MAX_CONCURRENT_RENDERS'] = max(1, app.config['MAX_CONCURRENT_RENDERS'] // procesos)
+    
+    # Las métricas de una ejecución anterior no se suman a las de esta
+    app.config['SHARED_METRICS'] = True
+    for nombre in os.listdir(METRICS_FOLDER):
+        os.remove(os.path.join(METRICS_FOLDER, nombre))
+    
+    print("\n🚀 INICIANDO THUMBNAIL GENERATOR (PRODUCCIÓN)")
+    print("═" * 60)
+    print(f"📡 Escuchando en: http://{host}:{port}")
+    print(f"👷 Procesos servidor: {procesos} (trabajos: {app.config['JOB_WORKERS']} por proceso)")
+    print(f"💾 Almacenamiento: {STORAGE_ROOT}{' (temporal)' if STORAGE_ROOT_TEMPORAL else ''}")
+    print("═" * 60)
+    
+    # Precarga en el proceso principal: los workers la heredan con fork
+    precargar_fuentes()
+    
+    try:
+        ServidorPrefork(
+            app, host=host, port=port, procesos=procesos,
+            al_iniciar_worker=iniciar_worker, al_detener_worker=detener_worker
+        ).ejecutar()
+    finally:
+        print("\n👋 Cerrando aplicación...")
 
 if __name__ == '__main__':
     import sys
     
     # Argumentos de línea de comandos
     debug_mode = '--debug' in sys.argv
+    verbose = '--verbose' in sys.argv
     port = 5000
+    host = '0.0.0.0'
+    prefork = 0
     
     if '--port' in sys.argv:
         try:
@@ -232,4 +885,34 @@ if __name__ == '__main__':
         except (IndexError, ValueError):
             print("⚠️  Puerto inválido, usando 5000 por defecto")
     
-    run_app(debug=debug_mode, port=port)
+    if '--workers' in sys.argv:
+        try:
+            workers_index = sys.argv.index('--workers') + 1
+            app.config['JOB_WORKERS'] = max(1, int(sys.argv[workers_index]))
+        except (IndexError, ValueError):
+            print("⚠️  Número de workers inválido, usando uno por núcleo")
+    
+    if '--host' in sys.argv:
+        try:
+            host = sys.argv[sys.argv.index('--host') + 1]
+        except IndexError:
+            print("⚠️  Host no indicado, usando 0.0.0.0")
+    
+    if '--almacenamiento' in sys.argv:
+        try:
+            configurar_almacenamiento(sys.argv[sys.argv.index('--almacenamiento') + 1])
+        except IndexError:
+            print("⚠️  Ruta de almacenamiento no indicada, usando una carpeta temporal")
+    
+    if '--prefork' in sys.argv:
+        try:
+            prefork_index = sys.argv.index('--prefork') + 1
+            prefork = max(1, int(sys.argv[prefork_index]))
+        except (IndexError, ValueError):
+            prefork = os.cpu_count() or 1
+            print(f"⚠️  Número de procesos inválido, usando {prefork} (uno por núcleo)")
+    
+    if prefork:
+        run_production(port=port, host=host, procesos=prefork, verbose=verbose)
+    else:
+        run_app(debug=debug_mode, port=port, verbose=verbose)